@@ -4,23 +4,24 @@ KCSE Examination Participation Analysis
 Research Question: How do KCSE examination participation rates vary by gender, age group, and county in Kenya, and what trends emerge over time?
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
 from pathlib import Path
 import warnings
-warnings.filterwarnings('ignore')
+# openpyxl's style notices are noise; everything else (pandas, NumPy) should surface
+warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl')
 
-# Set style for better plots
-plt.style.use('seaborn-v0_8')
-sns.set_palette("husl")
+from kcse_workbook import read_workbook, read_sheet
+from kcse_schema import locate_data_start
+from kcse_panel import align_sheet
+from kcse_charts import ChartJob, render_figures
+from kcse_instrument import StageRecorder, stage
 
 class KCSEAnalyzer:
     def __init__(self):
         self.data = {}
         self.cleaned_data = {}
+        self.recorder = StageRecorder()
         
+    @stage('load')
     def load_data(self):
         """Load and initially examine all Excel files"""
         files = {
@@ -35,17 +36,17 @@ class KCSEAnalyzer:
                 print(f"Loading {filename}...")
                 # Load all sheets for multi-sheet files
                 if key == 'gender_region':
-                    xl = pd.ExcelFile(filename)
-                    self.data[key] = {}
-                    for sheet in xl.sheet_names:
-                        self.data[key][sheet] = pd.read_excel(filename, sheet_name=sheet)
-                        print(f"  - Sheet '{sheet}': {self.data[key][sheet].shape}")
+                    self.data[key] = read_workbook(filename)
+                    for sheet, df in self.data[key].items():
+                        print(f"  - Sheet '{sheet}': {df.shape}")
                 else:
-                    self.data[key] = pd.read_excel(filename)
+                    # Header-less, so the panel aligner can see the two header rows
+                    self.data[key] = read_sheet(filename, header=None if key == 'registered_vs_sat' else 0)
                     print(f"  - Shape: {self.data[key].shape}")
             else:
                 print(f"Warning: {filename} not found")
     
+    @stage('clean_time_trends')
     def clean_registered_vs_sat_data(self):
         """Clean the time series data showing registered vs sat trends"""
         print("\nCleaning Registered vs Sat data...")
@@ -55,27 +56,17 @@ class KCSEAnalyzer:
         print("Original structure:")
         print(df.head(10))
         
-        # The data appears to start from row 1, with headers in row 0
-        # Clean column names and extract meaningful data
-        df_clean = df.iloc[1:].copy()  # Skip the header row
-        df_clean.columns = ['Year', 'Total_Registered', 'Female_Registered', 'Male_Registered', 
-                           'Females', 'Female_Sat', 'Female_Percentage', 'Males', 'Male_Sat', 'Male_Percentage']
-        
-        # Convert numeric columns
-        numeric_cols = ['Year', 'Total_Registered', 'Female_Registered', 'Male_Registered', 
-                       'Female_Sat', 'Male_Sat']
-        for col in numeric_cols:
-            if col in df_clean.columns:
-                df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
-        
-        # Remove rows with missing years
-        df_clean = df_clean.dropna(subset=['Year'])
+        # Registered/Sat/Change triples for Total, Female and Male, mapped onto the
+        # canonical national panel columns (see kcse_panel)
+        df_clean = align_sheet(df)
         
         self.cleaned_data['time_trends'] = df_clean
         print(f"Cleaned time trends data: {df_clean.shape}")
         print("\nCleaned data preview:")
         print(df_clean.head())
+        return df_clean
         
+    @stage('clean_gender_region')
     def clean_gender_region_data(self):
         """Clean the gender and region distribution data"""
         print("\nCleaning Gender + Region data...")
@@ -96,11 +87,7 @@ class KCSEAnalyzer:
             df_clean = df.copy()
             
             # Find the row where actual data starts (usually after headers)
-            data_start_idx = 0
-            for i in range(min(5, len(df))):
-                if pd.notna(df.iloc[i, 0]) and str(df.iloc[i, 0]).isdigit():
-                    data_start_idx = i
-                    break
+            data_start_idx = locate_data_start(df, limit=5) or 0
             
             if data_start_idx > 0:
                 df_clean = df.iloc[data_start_idx:].copy()
@@ -108,6 +95,7 @@ class KCSEAnalyzer:
             
             self.cleaned_data[f'gender_region_{sheet_name}'] = df_clean
             
+    @stage('clean_age_region')
     def clean_age_region_data(self):
         """Clean the age and region distribution data"""
         print("\nCleaning Age + Region data...")
@@ -118,11 +106,7 @@ class KCSEAnalyzer:
         print(f"Columns: {df.columns.tolist()}")
         
         # Similar approach - find where actual data starts
-        data_start_idx = 0
-        for i in range(min(10, len(df))):
-            if pd.notna(df.iloc[i, 0]) and str(df.iloc[i, 0]).strip().isdigit():
-                data_start_idx = i
-                break
+        data_start_idx = locate_data_start(df, limit=10) or 0
         
         if data_start_idx > 0:
             df_clean = df.iloc[data_start_idx:].copy()
@@ -132,7 +116,9 @@ class KCSEAnalyzer:
             
         self.cleaned_data['age_region'] = df_clean
         print(f"Cleaned age region data: {df_clean.shape}")
+        return df_clean
         
+    @stage('analyze_time_trends')
     def analyze_time_trends(self):
         """Analyze trends over time (2020-2024)"""
         if 'time_trends' not in self.cleaned_data:
@@ -162,47 +148,10 @@ class KCSEAnalyzer:
         print(f"\nGender Gap Analysis:")
         print(f"Average gender gap (Female - Male): {df['Gender_Gap'].mean():.2f} percentage points")
         
-        # Create visualizations
-        fig, axes = plt.subplots(2, 2, figsize=(15, 12))
-        fig.suptitle('KCSE Participation Trends (2020-2024)', fontsize=16, fontweight='bold')
-        
-        # Plot 1: Overall participation rates
-        axes[0,0].plot(df['Year'], df['Participation_Rate'], marker='o', linewidth=2, markersize=8)
-        axes[0,0].set_title('Overall Participation Rate Over Time')
-        axes[0,0].set_xlabel('Year')
-        axes[0,0].set_ylabel('Participation Rate (%)')
-        axes[0,0].grid(True, alpha=0.3)
-        
-        # Plot 2: Gender comparison
-        axes[0,1].plot(df['Year'], df['Female_Participation_Rate'], marker='o', label='Female', linewidth=2)
-        axes[0,1].plot(df['Year'], df['Male_Participation_Rate'], marker='s', label='Male', linewidth=2)
-        axes[0,1].set_title('Participation Rate by Gender')
-        axes[0,1].set_xlabel('Year')
-        axes[0,1].set_ylabel('Participation Rate (%)')
-        axes[0,1].legend()
-        axes[0,1].grid(True, alpha=0.3)
-        
-        # Plot 3: Total candidates
-        axes[1,0].bar(df['Year'], df['Total_Sat'], alpha=0.7, color='skyblue')
-        axes[1,0].set_title('Total KCSE Candidates')
-        axes[1,0].set_xlabel('Year')
-        axes[1,0].set_ylabel('Number of Candidates')
-        axes[1,0].grid(True, alpha=0.3)
-        
-        # Plot 4: Gender gap
-        colors = ['red' if x > 0 else 'blue' for x in df['Gender_Gap']]
-        axes[1,1].bar(df['Year'], df['Gender_Gap'], color=colors, alpha=0.7)
-        axes[1,1].axhline(y=0, color='black', linestyle='-', alpha=0.5)
-        axes[1,1].set_title('Gender Gap in Participation\n(Positive = Female advantage)')
-        axes[1,1].set_xlabel('Year')
-        axes[1,1].set_ylabel('Gender Gap (percentage points)')
-        axes[1,1].grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        plt.savefig('kcse_time_trends.png', dpi=300, bbox_inches='tight')
-        print(f"\nVisualization saved as 'kcse_time_trends.png'")
-        plt.show()
+        # Render the figure headlessly (see kcse_charts)
+        render_figures([ChartJob('kcse_time_trends', 'time_trends', df, title='Visualization')])
         
+    @stage('analyze_regions')
     def analyze_regional_patterns(self):
         """Analyze regional and county-level patterns"""
         print("\n" + "="*50)
@@ -222,6 +171,7 @@ class KCSEAnalyzer:
             print("Sample data:")
             print(df.head())
     
+    @stage('insights_report')
     def generate_insights_report(self):
         """Generate key insights and recommendations"""
         print("\n" + "="*60)
@@ -289,6 +239,7 @@ class KCSEAnalyzer:
         
         # Generate report
         self.generate_insights_report()
+        self.recorder.print_summary()
         
         print(f"\n✅ Analysis complete! Check the generated visualizations and insights above.")
 
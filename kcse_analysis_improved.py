@@ -4,275 +4,648 @@ KCSE Examination Participation Analysis - Improved Version
 Research Question: How do KCSE examination participation rates vary by gender, age group, and county in Kenya, and what trends emerge over time?
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import functools
+import io
+import os
 import warnings
-warnings.filterwarnings('ignore')
+# openpyxl's style notices are noise; everything else (pandas, NumPy) should surface
+warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl')
+
+from kcse_cache import KCSEDataCache, DEFAULT_CACHE_DIR
+from kcse_compact import compact_frame, compaction_report
+from kcse_schema import SCHEMAS, REFERENCE_SHEETS
+from kcse_tidy import build_fact_table, memory_report
+from kcse_cube import ParticipationCube
+from kcse_charts import ChartJob, render_figures, DEFAULT_DPI, DEFAULT_FORMATS
+from kcse_reports import generate_county_reports
+from kcse_incremental import TrendAccumulator
+from kcse_instrument import StageRecorder, stage
+from kcse_lazy import lazy_dataset, invalidate
+from kcse_stream import ingest_extracts, DEFAULT_BATCH_SIZE
+from kcse_stats import county_disparity_table, national_rate_intervals, PARITY_BAND
+from kcse_bootstrap import bootstrap_national, bootstrap_counties, DEFAULT_RESAMPLES
+from kcse_dashboard import build_payload, write_dashboard, DASHBOARD_NAME
+from kcse_store import write_store, STORE_NAME
+from kcse_panel import NationalPanel
+from kcse_validate import validate, VALIDATION_NAME
+from kcse_forecast import (cube_series, forecast_series, forecast_national, backtest, print_forecast_report,
+                           FORECAST_NAME, DEFAULT_MODEL, MODELS)
+from kcse_publish import publish, build_artifacts, target_from_uri, PUBLISH_DIR, PUBLISH_FORMATS, DEFAULT_CONCURRENCY
+from kcse_fingerprint import (FingerprintState, fingerprint_datasets, diff_fingerprints, print_change_report,
+                              source_key, STATE_NAME, CHANGES_NAME)
+from kcse_workbook import read_workbook
+
+
+def _clean_in_worker(key, source):
+    """Process-pool entry point: run one dataset's cleaner, capturing its console output"""
+    buffer = io.StringIO()
+    df_clean = getattr(KCSEAnalyzerImproved, KCSEAnalyzerImproved.CLEANERS[key])(
+        source, log=functools.partial(print, file=buffer))
+    return KCSEAnalyzerImproved.compact(df_clean), buffer.getvalue()
+
+
+def _silent(*args, **kwargs):
+    """Stands in for print on a quiet analyzer"""
 
-# Set style for better plots
-plt.style.use('seaborn-v0_8')
-sns.set_palette("husl")
 
 class KCSEAnalyzerImproved:
-    def __init__(self):
+    SOURCE_FILES = {
+        'time_series': 'Registered vs Sat.xlsx',
+        'county_gender': 'Gender + Region.xlsx',
+        'county_age': 'Age + Region.xlsx',
+        'reference': 'normalised data.xlsx',
+    }
+    CLEANERS = {
+        'time_series': '_clean_time_series',
+        'county_gender': '_clean_county_gender',
+        'county_age': '_clean_county_age',
+        'reference': '_clean_reference',
+    }
+    # Analysis stages selectable from the CLI, in run order, and the workbooks each one reads
+    STAGES = ('changes', 'validate', 'trends', 'counties', 'uncertainty', 'forecast', 'insights', 'charts', 'dashboard', 'store', 'panel', 'reports', 'publish')
+    DEFAULT_STAGES = ('changes', 'validate', 'trends', 'counties', 'insights', 'charts')
+    STAGE_SOURCES = {
+        'changes': ('time_series', 'county_gender', 'county_age', 'reference'),
+        'validate': ('time_series', 'county_gender', 'county_age'),
+        'trends': ('time_series',),
+        'counties': ('county_gender', 'county_age', 'reference'),
+        'uncertainty': ('time_series', 'county_gender', 'county_age', 'reference'),
+        'forecast': ('county_gender', 'county_age', 'reference'),
+        'insights': ('time_series',),
+        'charts': ('time_series',),
+        'dashboard': ('time_series', 'county_gender', 'county_age', 'reference'),
+        'store': ('time_series', 'county_gender', 'county_age', 'reference'),
+        'panel': (),  # reads every sheet of every workbook itself
+        'reports': ('county_gender', 'county_age', 'reference'),
+        'publish': ('time_series', 'county_gender', 'county_age', 'reference'),
+    }
+
+    def __init__(self, data_dir='.', use_cache=True, cache_dir=DEFAULT_CACHE_DIR, load_workers=None,
+                 output_dir='.', chart_formats=DEFAULT_FORMATS, dpi=DEFAULT_DPI, render_workers=None,
+                 show_charts=False, trend_state_dir=None, recorder=None, sources=None, quiet=False):
         self.data = {}
         self.cleaned_data = {}
-        
+        self.data_dir = Path(data_dir)
+        self.sources = {key: Path(path) for key, path in (sources or {}).items()}
+        self.cache = KCSEDataCache(cache_dir, enabled=use_cache)
+        self.load_workers = load_workers or os.cpu_count() or 1
+        self.derived = {}
+        self.output_dir = Path(output_dir)
+        self.chart_formats = tuple(chart_formats)
+        self.dpi = dpi
+        self.render_workers = render_workers or os.cpu_count() or 1
+        self.show_charts = show_charts
+        self.chart_jobs = []
+        self.trends = TrendAccumulator(trend_state_dir)
+        self.recorder = recorder or StageRecorder()
+        self.fingerprints = FingerprintState(Path(cache_dir) / STATE_NAME)
+        # The analyzer's own console output; quiet analyzers (e.g. the query server's) say nothing
+        self.log = _silent if quiet else print
+
+    def source_path(self, key):
+        """Resolve the workbook path backing a cleaned dataset (explicit paths override data_dir)"""
+        if key in self.sources:
+            return self.sources[key]
+        return self.data_dir / self.SOURCE_FILES[key]
+
+    def is_loaded(self, key):
+        """Whether a source dataset is already in cleaned_data (reference means all four sheets)"""
+        if key == 'reference':
+            return all(name in self.cleaned_data for name in REFERENCE_SHEETS)
+        return key in self.cleaned_data
+
+    @staticmethod
+    def compact(result):
+        """Compact a cleaner's result (one frame or a dict of frames) before it is cached or stored"""
+        if isinstance(result, dict):
+            return {name: compact_frame(df) for name, df in result.items()}
+        return compact_frame(result)
+
+    def _store(self, key, result):
+        """Put a cleaner's result into cleaned_data; multi-sheet cleaners return a dict of frames"""
+        if isinstance(result, dict):
+            self.cleaned_data.update(result)
+        else:
+            self.cleaned_data[key] = result
+
+    def _read_source(self, key):
+        """Cleaned frame(s) for key from the on-disk cache, or clean the workbook and cache it"""
+        source = self.source_path(key)
+        df_clean = self.cache.get(key, source)
+        if df_clean is None:
+            df_clean = self.compact(getattr(self, self.CLEANERS[key])(source, log=self.log))
+            self.cache.put(key, source, df_clean)
+        else:
+            self.log(f"  (cached) {source.name}")
+        return df_clean
+
+    def _load_cached(self, key):
+        """Return cleaned_data[key], read through the on-disk cache"""
+        df_clean = self._read_source(key)
+        self._store(key, df_clean)
+        return df_clean
+
+    @stage('load')
+    def load_all_data(self, workers=None, keys=None):
+        """Load the source workbooks (all, or just keys) concurrently in a process pool and fill cleaned_data"""
+        workers = workers or self.load_workers
+        keys = [key for key in self.SOURCE_FILES
+                if (keys is None or key in keys) and not self.is_loaded(key)]
+        self.log("Loading source workbooks...")
+
+        loaded = {}
+        pending = {}
+        for key in keys:
+            source = self.source_path(key)
+            df_clean = self.cache.get(key, source)
+            if df_clean is None:
+                pending[key] = source
+            else:
+                loaded[key] = (df_clean, f"  (cached) {source.name}\n")
+
+        # xlsx parsing is CPU-bound, so fan out to processes rather than threads
+        if workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+                futures = {key: pool.submit(_clean_in_worker, key, source) for key, source in pending.items()}
+                for key, future in futures.items():
+                    loaded[key] = future.result()
+        else:
+            for key, source in pending.items():
+                loaded[key] = _clean_in_worker(key, source)
+
+        # Fill cleaned_data in a fixed order regardless of which worker finished first
+        for key in keys:
+            df_clean, output = loaded[key]
+            self.log(output, end='')
+            if key in pending:
+                self.cache.put(key, pending[key], df_clean)
+            self._store(key, df_clean)
+            frames = df_clean if isinstance(df_clean, dict) else {key: df_clean}
+            for name, frame in frames.items():
+                self.log(f"Loaded {name}: {frame.shape}")
+        return self.cleaned_data
+        
+    @stage('load_time_series')
     def load_and_clean_time_series_data(self):
         """Load and clean the time series data from both Excel files"""
-        print("Loading and cleaning time series data...")
-        
-        # Load from Registered vs Sat.xlsx
-        df_main = pd.read_excel('Registered vs Sat.xlsx')
-        
-        # Create proper column names based on the structure we observed
-        df_clean = df_main.iloc[1:].copy()  # Skip header row
-        df_clean.columns = [
-            'Year', 'Total_Registered', 'Total_Sat', 'Total_Change',
-            'Female_Registered', 'Female_Sat', 'Female_Change', 
-            'Male_Registered', 'Male_Sat', 'Male_Change'
-        ]
-        
-        # Convert to numeric
-        numeric_cols = ['Year', 'Total_Registered', 'Total_Sat', 'Total_Change',
-                       'Female_Registered', 'Female_Sat', 'Female_Change',
-                       'Male_Registered', 'Male_Sat', 'Male_Change']
-        
-        for col in numeric_cols:
-            df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
-        
-        # Remove any rows with missing years
-        df_clean = df_clean.dropna(subset=['Year'])
-        df_clean = df_clean.sort_values('Year')
-        
-        self.cleaned_data['time_series'] = df_clean
-        print(f"Cleaned time series data: {df_clean.shape[0]} years of data")
+        self.log("Loading and cleaning time series data...")
+        df_clean = self._load_cached('time_series')
+        self.log(f"Cleaned time series data: {df_clean.shape[0]} years of data")
         return df_clean
+
+    @staticmethod
+    def _clean_time_series(source, log=print):
+        # Registered vs Sat.xlsx: Registered/Sat/Change triples for Total, Female and Male
+        df_clean = SCHEMAS['registered_vs_sat'].load(source)
+        return df_clean.sort_values('Year').reset_index(drop=True)
     
+    @stage('load_county_gender')
     def load_county_gender_data(self):
         """Load and clean county-level gender distribution data"""
-        print("Loading county-level gender data...")
-        
-        # Load from Gender + Region sheet
-        df = pd.read_excel('Gender + Region.xlsx', sheet_name='Gender + Region')
-        
-        # Find where the actual data starts (after headers)
-        data_start = 2  # Based on our examination
-        df_clean = df.iloc[data_start:].copy()
-        
-        # Set proper column names - need to examine the actual structure
-        print("Sample of gender+region data:")
-        print(df_clean.head())
-        
-        self.cleaned_data['county_gender'] = df_clean
+        self.log("Loading county-level gender data...")
+        return self._load_cached('county_gender')
+
+    @staticmethod
+    def _clean_county_gender(source, log=print):
+        # Gender + Region sheet: Female/Male/Total per county for each year
+        df_clean = SCHEMAS['gender_region'].load(source)
+        log("Sample of gender+region data:")
+        log(df_clean.head())
         return df_clean
     
+    @stage('load_county_age')
     def load_county_age_data(self):
         """Load and clean county-level age distribution data"""
-        print("Loading county-level age data...")
-        
-        df = pd.read_excel('Age + Region.xlsx')
-        
-        # Find where actual data starts
-        data_start = 3  # Based on our examination
-        df_clean = df.iloc[data_start:].copy()
-        
-        print("Sample of age+region data:")
-        print(df_clean.head())
-        
-        self.cleaned_data['county_age'] = df_clean
+        self.log("Loading county-level age data...")
+        return self._load_cached('county_age')
+
+    @staticmethod
+    def _clean_county_age(source, log=print):
+        # Age + Region: seven age bands plus Total per county for each year
+        df_clean = SCHEMAS['age_region'].load(source)
+        log("Sample of age+region data:")
+        log(df_clean.head())
         return df_clean
     
+    @stage('load_reference')
+    def load_reference_data(self):
+        """Load the county, region, gender and age-group lookup sheets of normalised data.xlsx"""
+        self.log("Loading reference tables...")
+        return self._load_cached('reference')
+
+    @staticmethod
+    def _clean_reference(source, log=print):
+        # One pass over normalised data.xlsx for all four lookup sheets
+        raw = read_workbook(source, [SCHEMAS[name].sheet for name in REFERENCE_SHEETS], header=None)
+        return {name: SCHEMAS[name].apply(raw[SCHEMAS[name].sheet]) for name in REFERENCE_SHEETS}
+
+    # Datasets and derived metrics are loaded/computed on first access and memoised, so an
+    # analysis only opens the workbooks it actually reads. invalidate() drops a dataset
+    # together with everything computed from it.
+
+    @lazy_dataset()
+    def time_series(self):
+        """Cleaned national Registered/Sat series by gender (Registered vs Sat.xlsx)"""
+        return self.load_and_clean_time_series_data()
+
+    @lazy_dataset()
+    def county_gender(self):
+        """Female/Male/Total candidates per county and year (Gender + Region.xlsx)"""
+        return self.load_county_gender_data()
+
+    @lazy_dataset()
+    def county_age(self):
+        """Candidates per age band per county and year (Age + Region.xlsx)"""
+        return self.load_county_age_data()
+
+    @lazy_dataset(store='derived')
+    def reference(self):
+        """County, region, gender and age-group lookup tables (normalised data.xlsx)"""
+        if not self.is_loaded('reference'):
+            self.load_reference_data()
+        return {name: self.cleaned_data[name] for name in REFERENCE_SHEETS}
+
+    @lazy_dataset('county_gender', 'county_age', 'reference')
+    def county_facts(self):
+        """Long county × year × gender × age-band fact table"""
+        return self.build_county_facts()
+
+    @lazy_dataset('county_facts', store='derived')
+    def cube(self):
+        """ParticipationCube over county_facts"""
+        return self.build_participation_cube()
+
+    @lazy_dataset('time_series')
+    def trend_metrics(self):
+        """Per-year participation rates, gender gap and year-over-year change"""
+        return self.compute_trends()
+
+    @lazy_dataset('trend_metrics', store='derived')
+    def trend_summary(self):
+        """Means and first-to-last changes of trend_metrics"""
+        self.trend_metrics  # the summary reads the trend state this folds the series into
+        return self.trends.summary()
+
+    @lazy_dataset(store='derived')
+    def national_panel(self):
+        """Canonical national panel merged from every workbook sheet with a registered layout"""
+        return self.align_national_sources()
+
+    @lazy_dataset('time_series')
+    def national_rates(self):
+        """Per-year Sat/Registered rates with 95% Wilson intervals and the gender-gap test"""
+        return national_rate_intervals(self.time_series)
+
+    @lazy_dataset('cube')
+    def county_stats(self):
+        """Per-county female share CI, parity index, candidate trend significance and outlier flags"""
+        return county_disparity_table(self.cube)
+
+    def invalidate(self, *names):
+        """Forget datasets (e.g. after a workbook changed) and everything derived from them"""
+        if 'reference' in names:
+            for name in REFERENCE_SHEETS:
+                self.cleaned_data.pop(name, None)
+        return invalidate(self, *names)
+
+    def source_frames(self, keys=None):
+        """The loaded source frames by fingerprinted dataset name (reference split into its sheets)"""
+        names = [name for key in self.SOURCE_FILES if keys is None or key in keys
+                 for name in (REFERENCE_SHEETS if key == 'reference' else [key])]
+        return {name: self.cleaned_data[name] for name in names if name in self.cleaned_data}
+
+    def clone(self):
+        """Copy sharing the loaded frames, so one copy can refresh while the other keeps serving"""
+        twin = copy.copy(self)
+        twin.cleaned_data = dict(self.cleaned_data)
+        twin.derived = dict(self.derived)
+        twin.trends = copy.deepcopy(self.trends)
+        twin.chart_jobs = []
+        return twin
+
+    def refresh(self):
+        """Re-read every loaded source and invalidate only the datasets whose contents changed;
+        returns (status per dataset, changed cells)"""
+        keys = [key for key in self.SOURCE_FILES if self.is_loaded(key)]
+        before = fingerprint_datasets(self.source_frames(keys))
+        fresh = {}
+        for key in keys:
+            result = self._read_source(key)
+            fresh.update(result if isinstance(result, dict) else {key: result})
+        status, changes = diff_fingerprints(before, fingerprint_datasets(fresh))
+        changed = {source_key(name) for name, state in status.items() if state != 'unchanged'}
+        for key in changed:
+            self.invalidate(key)
+        for name in status:
+            if source_key(name) in changed:
+                self.cleaned_data[name] = fresh[name]
+        return status, changes
+
+    @stage('changes')
+    def detect_source_changes(self):
+        """Fingerprint the source sheets and diff them against the last run's fingerprints"""
+        current = fingerprint_datasets(self.source_frames())
+        previous = self.fingerprints.load()
+        if previous is None:
+            status, changes = {name: 'added' for name in current}, None
+            self.log(f"\n🔏 No previous fingerprints: recording a baseline of "
+                  f"{sum(len(fp['blocks']) for fp in current.values()):,} blocks in {self.fingerprints.path}")
+        else:
+            status, changes = diff_fingerprints(previous, current)
+            print_change_report(status, changes)
+            if len(changes):
+                path = self.output_dir / CHANGES_NAME
+                path.parent.mkdir(parents=True, exist_ok=True)
+                changes.to_csv(path, index=False)
+                self.log(f"Change report saved as '{path}'")
+        self.derived['changes'] = {'status': status, 'changes': changes, 'fingerprints': current}
+        return self.derived['changes']
+
+    def changed_sources(self):
+        """Source keys whose sheets differ from the last run (every key on a first run)"""
+        status = self.derived['changes']['status']
+        return {source_key(name) for name, state in status.items() if state != 'unchanged'}
+
+    def stage_inputs(self, name):
+        """Sheet hashes of the datasets a stage reads, as recorded in its baseline"""
+        current = self.derived['changes']['fingerprints']
+        return {dataset: fp['sheet'] for dataset, fp in current.items()
+                if source_key(dataset) in self.STAGE_SOURCES[name]}
+
+    def stale_stages(self, stages):
+        """Stages whose sheets differ from the ones they last ran successfully against
+        (stages that never ran included), so a change is not lost to a run that skipped them"""
+        baselines = self.fingerprints.load_stages()
+        return [name for name in stages if name == 'changes' or baselines.get(name) != self.stage_inputs(name)]
+
+    @stage('validate')
+    def validate_data(self):
+        """Check the loaded tables' invariants and cross-workbook reconciliation; writes a JSON report"""
+        report = validate(self.time_series, self.cleaned_data.get('county_gender'), self.cleaned_data.get('county_age'))
+        report.print_report()
+        path = report.write(self.output_dir / VALIDATION_NAME)
+        self.log(f"Validation report saved as '{path}' ({report.errors} errors, {report.warnings} warnings)")
+        self.derived['validation'] = report
+        return report
+
+    @stage('ingest_candidates')
+    def ingest_candidate_extracts(self, paths, columns=None, batch_size=DEFAULT_BATCH_SIZE, workers=None):
+        """Stream candidate-level extracts into the time_series/county_gender/county_age datasets,
+        in place of the summary workbooks (the county lookup still comes from normalised data.xlsx)"""
+        aggregator = ingest_extracts(paths, self.reference['counties'], columns=columns,
+                                     batch_size=batch_size, workers=workers or self.load_workers)
+        frames = self.compact(aggregator.cleaned_frames())
+        self.invalidate(*frames)
+        self.cleaned_data.update(frames)
+        return frames
+
+    @stage('align_panel')
+    def align_national_sources(self):
+        """Align every national Registered/Sat layout found in the source workbooks into one panel"""
+        paths = list(dict.fromkeys(self.source_path(key) for key in self.SOURCE_FILES))
+        return NationalPanel.from_workbooks([path for path in paths if path.exists()])
+
+    @stage('build_facts')
+    def build_county_facts(self):
+        """Melt the county gender/age frames into the long county_facts table"""
+        return build_fact_table(self.county_gender, self.county_age, self.reference)
+
+    @stage('build_cube')
+    def build_participation_cube(self):
+        """Materialise county/region/national rollups of county_facts for fast slice queries"""
+        return ParticipationCube(self.county_facts)
+    
+    @stage('compute_trends')
+    def compute_trends(self):
+        """Fold the time series into the trend state, without reporting"""
+        # Only years not already folded into the trend state are computed
+        self.trends.update(self.time_series)
+        return self.trends.rows()
+
+    @stage('analyze_trends')
     def analyze_participation_trends(self):
         """Analyze participation trends over time"""
-        df = self.cleaned_data['time_series']
-        
-        print("\n" + "="*60)
-        print("KCSE PARTICIPATION TRENDS ANALYSIS (2020-2024)")
-        print("="*60)
-        
-        # Calculate participation rates
-        df['Total_Participation_Rate'] = (df['Total_Sat'] / df['Total_Registered']) * 100
-        df['Female_Participation_Rate'] = (df['Female_Sat'] / df['Female_Registered']) * 100
-        df['Male_Participation_Rate'] = (df['Male_Sat'] / df['Male_Registered']) * 100
-        df['Gender_Gap'] = df['Female_Participation_Rate'] - df['Male_Participation_Rate']
+        df = self.trend_metrics
+        summary = self.trend_summary
+        means, rate_change, growth = summary['means'], summary['rate_change'], summary['growth']
+        period = f"{summary['first_year']}-{summary['last_year']}"
+        
+        self.log("\n" + "="*60)
+        self.log(f"KCSE PARTICIPATION TRENDS ANALYSIS ({period})")
+        self.log("="*60)
+        if self.trends.state_dir is not None:
+            self.log(f"Incremental trend state: {self.trends.state_dir} "
+                  f"(newly computed years: {self.trends.appended_years or 'none'})")
         
         # Print key statistics
-        print(f"\n📊 OVERALL STATISTICS:")
-        print(f"Years analyzed: {int(df['Year'].min())} - {int(df['Year'].max())}")
-        print(f"Average total participation rate: {df['Total_Participation_Rate'].mean():.2f}%")
-        print(f"Average female participation rate: {df['Female_Participation_Rate'].mean():.2f}%")
-        print(f"Average male participation rate: {df['Male_Participation_Rate'].mean():.2f}%")
+        self.log(f"\n📊 OVERALL STATISTICS:")
+        self.log(f"Years analyzed: {summary['first_year']} - {summary['last_year']}")
+        self.log(f"Average total participation rate: {means['Total_Participation_Rate']:.2f}%")
+        self.log(f"Average female participation rate: {means['Female_Participation_Rate']:.2f}%")
+        self.log(f"Average male participation rate: {means['Male_Participation_Rate']:.2f}%")
         
         # Trend analysis
-        total_rate_change = df['Total_Participation_Rate'].iloc[-1] - df['Total_Participation_Rate'].iloc[0]
-        female_rate_change = df['Female_Participation_Rate'].iloc[-1] - df['Female_Participation_Rate'].iloc[0]
-        male_rate_change = df['Male_Participation_Rate'].iloc[-1] - df['Male_Participation_Rate'].iloc[0]
-        
-        print(f"\n📈 TREND ANALYSIS (2020 to 2024):")
-        print(f"Total participation rate change: {total_rate_change:+.2f} percentage points")
-        print(f"Female participation rate change: {female_rate_change:+.2f} percentage points")
-        print(f"Male participation rate change: {male_rate_change:+.2f} percentage points")
+        self.log(f"\n📈 TREND ANALYSIS ({summary['first_year']} to {summary['last_year']}):")
+        self.log(f"Total participation rate change: {rate_change['Total_Participation_Rate']:+.2f} percentage points")
+        self.log(f"Female participation rate change: {rate_change['Female_Participation_Rate']:+.2f} percentage points")
+        self.log(f"Male participation rate change: {rate_change['Male_Participation_Rate']:+.2f} percentage points")
         
         # Gender equity analysis
-        avg_gender_gap = df['Gender_Gap'].mean()
-        print(f"\n⚖️ GENDER EQUITY ANALYSIS:")
-        print(f"Average gender gap (Female - Male): {avg_gender_gap:+.2f} percentage points")
+        avg_gender_gap = means['Gender_Gap']
+        self.log(f"\n⚖️ GENDER EQUITY ANALYSIS:")
+        self.log(f"Average gender gap (Female - Male): {avg_gender_gap:+.2f} percentage points")
         if abs(avg_gender_gap) < 1:
-            print("✅ Gender parity is well maintained")
+            self.log("✅ Gender parity is well maintained")
         elif avg_gender_gap > 1:
-            print("⚠️ Females have higher participation rates")
+            self.log("⚠️ Females have higher participation rates")
         else:
-            print("⚠️ Males have higher participation rates")
+            self.log("⚠️ Males have higher participation rates")
         
         # Candidate numbers growth
-        total_growth = ((df['Total_Sat'].iloc[-1] / df['Total_Sat'].iloc[0]) - 1) * 100
-        female_growth = ((df['Female_Sat'].iloc[-1] / df['Female_Sat'].iloc[0]) - 1) * 100
-        male_growth = ((df['Male_Sat'].iloc[-1] / df['Male_Sat'].iloc[0]) - 1) * 100
-        
-        print(f"\n📊 CANDIDATE NUMBERS GROWTH:")
-        print(f"Total candidates: {total_growth:+.1f}%")
-        print(f"Female candidates: {female_growth:+.1f}%")
-        print(f"Male candidates: {male_growth:+.1f}%")
-        
-        # Create comprehensive visualizations
-        self.create_trend_visualizations(df)
+        self.log(f"\n📊 CANDIDATE NUMBERS GROWTH:")
+        self.log(f"Total candidates: {growth['Total']:+.1f}%")
+        self.log(f"Female candidates: {growth['Female']:+.1f}%")
+        self.log(f"Male candidates: {growth['Male']:+.1f}%")
         
         return df
     
     def create_trend_visualizations(self, df):
-        """Create comprehensive visualizations"""
-        
-        # Create a comprehensive dashboard
-        fig = plt.figure(figsize=(18, 14))
-        gs = fig.add_gridspec(3, 3, hspace=0.3, wspace=0.3)
-        
-        # 1. Participation rates over time
-        ax1 = fig.add_subplot(gs[0, :2])
-        ax1.plot(df['Year'], df['Total_Participation_Rate'], 'o-', linewidth=3, markersize=8, label='Total', color='purple')
-        ax1.plot(df['Year'], df['Female_Participation_Rate'], 's-', linewidth=2, markersize=6, label='Female', color='red')
-        ax1.plot(df['Year'], df['Male_Participation_Rate'], '^-', linewidth=2, markersize=6, label='Male', color='blue')
-        ax1.set_title('KCSE Participation Rates by Gender (2020-2024)', fontsize=14, fontweight='bold')
-        ax1.set_xlabel('Year')
-        ax1.set_ylabel('Participation Rate (%)')
-        ax1.legend()
-        ax1.grid(True, alpha=0.3)
-        ax1.set_ylim(95, 101)  # Focus on the relevant range
-        
-        # 2. Gender gap over time
-        ax2 = fig.add_subplot(gs[0, 2])
-        colors = ['red' if x > 0 else 'blue' for x in df['Gender_Gap']]
-        bars = ax2.bar(df['Year'], df['Gender_Gap'], color=colors, alpha=0.7)
-        ax2.axhline(y=0, color='black', linestyle='-', alpha=0.5)
-        ax2.set_title('Gender Gap in Participation\n(Positive = Female advantage)', fontsize=12, fontweight='bold')
-        ax2.set_xlabel('Year')
-        ax2.set_ylabel('Gap (percentage points)')
-        ax2.grid(True, alpha=0.3)
-        
-        # 3. Total candidates over time
-        ax3 = fig.add_subplot(gs[1, 0])
-        ax3.bar(df['Year'], df['Total_Sat'], alpha=0.8, color='skyblue', edgecolor='navy')
-        ax3.set_title('Total KCSE Candidates', fontsize=12, fontweight='bold')
-        ax3.set_xlabel('Year')
-        ax3.set_ylabel('Number of Candidates')
-        ax3.grid(True, alpha=0.3)
-        # Format y-axis to show values in thousands
-        ax3.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x/1000:.0f}K'))
-        
-        # 4. Male vs Female candidates
-        ax4 = fig.add_subplot(gs[1, 1])
-        width = 0.35
-        x = np.arange(len(df))
-        ax4.bar(x - width/2, df['Female_Sat'], width, label='Female', color='red', alpha=0.7)
-        ax4.bar(x + width/2, df['Male_Sat'], width, label='Male', color='blue', alpha=0.7)
-        ax4.set_title('Male vs Female Candidates', fontsize=12, fontweight='bold')
-        ax4.set_xlabel('Year')
-        ax4.set_ylabel('Number of Candidates')
-        ax4.set_xticks(x)
-        ax4.set_xticklabels([int(year) for year in df['Year']])
-        ax4.legend()
-        ax4.grid(True, alpha=0.3)
-        ax4.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x/1000:.0f}K'))
-        
-        # 5. Registered vs Sat comparison
-        ax5 = fig.add_subplot(gs[1, 2])
-        ax5.plot(df['Year'], df['Total_Registered'], 'o-', label='Registered', linewidth=2, markersize=6)
-        ax5.plot(df['Year'], df['Total_Sat'], 's-', label='Sat for Exam', linewidth=2, markersize=6)
-        ax5.set_title('Registered vs Actual Participants', fontsize=12, fontweight='bold')
-        ax5.set_xlabel('Year')
-        ax5.set_ylabel('Number of Students')
-        ax5.legend()
-        ax5.grid(True, alpha=0.3)
-        ax5.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x/1000:.0f}K'))
-        
-        # 6. Year-over-year changes
-        ax6 = fig.add_subplot(gs[2, :])
-        changes = df['Total_Change'].values
-        colors = ['green' if x > 0 else 'red' for x in changes]
-        bars = ax6.bar(df['Year'], changes, color=colors, alpha=0.7)
-        ax6.axhline(y=0, color='black', linestyle='-', alpha=0.5)
-        ax6.set_title('Year-over-Year Change in Total Candidates', fontsize=12, fontweight='bold')
-        ax6.set_xlabel('Year')
-        ax6.set_ylabel('Change in Number of Candidates')
-        ax6.grid(True, alpha=0.3)
-        
-        # Add value labels on bars
-        for bar, value in zip(bars, changes):
-            height = bar.get_height()
-            ax6.text(bar.get_x() + bar.get_width()/2., height + (1000 if height > 0 else -3000),
-                    f'{int(value):,}', ha='center', va='bottom' if height > 0 else 'top', fontweight='bold')
-        
-        plt.suptitle('KCSE Examination Participation Analysis Dashboard\nKenya 2020-2024', 
-                     fontsize=16, fontweight='bold', y=0.98)
-        
-        plt.savefig('kcse_comprehensive_analysis.png', dpi=300, bbox_inches='tight')
-        print(f"\n📊 Comprehensive dashboard saved as 'kcse_comprehensive_analysis.png'")
-        plt.show()
+        """Queue the comprehensive dashboard for the render stage"""
+        self.chart_jobs.append(ChartJob('kcse_comprehensive_analysis', 'trend_dashboard', df.copy(),
+                                        formats=self.chart_formats, dpi=self.dpi,
+                                        title='Comprehensive dashboard'))
+
+    @stage('render_charts')
+    def render_charts(self):
+        """Render every queued figure headlessly (in a process pool when render_workers > 1)"""
+        if not self.chart_jobs:
+            return {}
+        results = render_figures(self.chart_jobs, self.output_dir, workers=self.render_workers,
+                                 show=self.show_charts)
+        self.chart_jobs = []
+        return results
     
+    @stage('dashboard')
+    def export_dashboard(self, path=None, plotlyjs='inline'):
+        """Write the interactive HTML dashboard from the trend metrics, cube and county statistics"""
+        payload = build_payload(self.trend_metrics, self.cube, self.county_stats)
+        return write_dashboard(path or self.output_dir / DASHBOARD_NAME, payload, plotlyjs=plotlyjs)
+
+    @stage('store')
+    def export_store(self, path=None):
+        """Persist the cleaned tables into the indexed SQLite store for ad hoc SQL"""
+        path = write_store(path or self.output_dir / STORE_NAME, self.time_series, self.county_facts,
+                           self.reference, sources={key: self.source_path(key) for key in self.SOURCE_FILES})
+        self.log(f"\n🗃️ SQL store saved as '{path}' ({path.stat().st_size / 1024:.0f} KB); "
+              f"query it with `python kcse_cli.py query --store {path} \"SELECT ...\"`")
+        return path
+
+    @stage('publish')
+    def publish_outputs(self, targets=None, concurrency=DEFAULT_CONCURRENCY, formats=PUBLISH_FORMATS):
+        """Write charts, JSON metrics, the Markdown summary and CSV extracts to every publish target"""
+        targets = [target_from_uri(target) if isinstance(target, (str, Path)) else target
+                   for target in (targets or [self.output_dir / PUBLISH_DIR])]
+        return publish(build_artifacts(self, formats=formats, dpi=self.dpi), targets, concurrency=concurrency,
+                       processes=self.render_workers)
+
+    @stage('county_reports')
+    def generate_county_reports(self, output_dir='reports', workers=None, force=False):
+        """Batch mode: one Markdown report per county per year plus a profile chart per county"""
+        return generate_county_reports(self.county_facts, output_dir,
+                                       workers=workers or self.render_workers, formats=self.chart_formats,
+                                       dpi=self.dpi, force=force)
+
+    @stage('analyze_counties')
     def analyze_county_patterns(self):
         """Analyze county-level patterns (basic analysis given data structure)"""
-        print("\n" + "="*60)
-        print("COUNTY-LEVEL PATTERNS ANALYSIS")
-        print("="*60)
-        
-        if 'county_gender' in self.cleaned_data:
-            df_gender = self.cleaned_data['county_gender']
-            print(f"\nGender distribution data: {df_gender.shape[0]} counties")
-            print("Sample data structure:")
-            print(df_gender.head())
-        
-        if 'county_age' in self.cleaned_data:
-            df_age = self.cleaned_data['county_age']
-            print(f"\nAge distribution data: {df_age.shape[0]} counties")
-            print("Sample data structure:")
-            print(df_age.head())
+        self.log("\n" + "="*60)
+        self.log("COUNTY-LEVEL PATTERNS ANALYSIS")
+        self.log("="*60)
+        
+        df_gender = self.county_gender
+        self.log(f"\nGender distribution data: {df_gender.shape[0]} counties")
+        self.log("Sample data structure:")
+        self.log(df_gender.head())
+        
+        df_age = self.county_age
+        self.log(f"\nAge distribution data: {df_age.shape[0]} counties")
+        self.log("Sample data structure:")
+        self.log(df_age.head())
+
+        facts = self.county_facts
+        memory_report(facts)
+
+        by_gender = facts[facts['age_band'] == 'All']
+        latest = by_gender[by_gender['year'] == by_gender['year'].max()]
+        regional = latest.pivot_table(index='region', columns='gender', values='candidates',
+                                      aggfunc='sum', observed=True)
+        self.log(f"\nCandidates by region and gender ({latest['year'].iloc[0]}):")
+        self.log(regional)
+
+        by_age = facts[facts['gender'] == 'All']
+        shares = by_age.groupby(['age_band'], observed=True)['candidates'].sum()
+        self.log("\nNational age distribution (all years):")
+        self.log((shares / shares.sum() * 100).round(1).astype(str) + '%')
+
+        stats = self.county_stats
+        self.log(f"\n📐 COUNTY DISPARITY STATISTICS ({len(stats)} counties):")
+        self.log(f"Counties at gender parity (GPI {PARITY_BAND[0]}-{PARITY_BAND[1]}): {int(stats['parity'].sum())}")
+        self.log(f"Significant candidate growth (p < 0.05): {int(stats['significant_growth'].sum())}")
+        self.log(f"Significant candidate decline (p < 0.05): {int(stats['significant_decline'].sum())}")
+        flagged = stats[stats['underperforming']]
+        if len(flagged):
+            self.log("Flagged as underperforming (robust outlier or significant decline):")
+            for county, row in flagged.iterrows():
+                self.log(f"  {county}: {row['trend_pct_per_year']:+.1f}%/yr (p={row['trend_p_value']:.3f}), GPI {row['gpi']:.3f}")
+        else:
+            self.log("No counties flagged as underperforming")
+
+        totals = self.cube.by_county().dropna(axis=0, how='all')
+        first, last = totals.index[0], totals.index[-1]
+        growth = ((totals.loc[last] / totals.loc[first]) - 1) * 100
+        self.log(f"\nLowest candidate growth by county ({first}-{last}):")
+        for county, value in growth.nsmallest(5).items():
+            self.log(f"  {county}: {value:+.1f}%")
+        self.log(f"Highest candidate growth by county ({first}-{last}):")
+        for county, value in growth.nlargest(5).items():
+            self.log(f"  {county}: {value:+.1f}%")
     
+    @stage('uncertainty')
+    def analyze_uncertainty(self, n_resamples=DEFAULT_RESAMPLES, seed=0, workers=None, confidence=0.95):
+        """Bootstrap intervals for the headline national figures and each county's share, GPI and growth"""
+        workers = workers or self.load_workers
+        national = bootstrap_national(self.time_series, n_resamples, confidence, seed=seed, workers=workers)
+        counties = bootstrap_counties(self.cube, n_resamples, confidence, seed=seed, workers=workers)
+        self.derived['uncertainty'] = {'national': national, 'counties': counties}
+
+        level = f"{confidence:.0%}"
+        self.log("\n" + "="*60)
+        self.log(f"UNCERTAINTY ({n_resamples:,} bootstrap resamples, {level} intervals, seed {seed})")
+        self.log("="*60)
+        self.log("\n📏 NATIONAL:")
+        for metric, row in national.iterrows():
+            unit = 'pp' if metric == 'Gender_Gap' else '%'
+            self.log(f"{metric.replace('_', ' ')}: {row['estimate']:.2f}{unit} "
+                  f"({level} CI {row['lower']:.2f} to {row['upper']:.2f}{unit})")
+
+        self.log("\n📏 COUNTIES (widest growth intervals):")
+        width = (counties['growth_upper'] - counties['growth_lower']).nlargest(5)
+        for county in width.index:
+            row = counties.loc[county]
+            self.log(f"  {county}: growth {row['growth']:+.1f}% ({row['growth_lower']:+.1f} to {row['growth_upper']:+.1f}), "
+                  f"GPI {row['gpi']:.3f} ({row['gpi_lower']:.3f}-{row['gpi_upper']:.3f})")
+        return self.derived['uncertainty']
+
+    @stage('forecast')
+    def forecast_candidature(self, horizon=1, model=DEFAULT_MODEL, holdout=1, confidence=0.95):
+        """Project every county x gender x age-band series horizon years ahead and backtest the models"""
+        years = self.cube.years
+        values, labels = cube_series(self.cube)
+        forecasts = forecast_series(values, years, labels, horizon, model, confidence)
+        national = forecast_national(values, years, labels, horizon, model, confidence)
+        try:
+            backtests = [backtest(values, years, labels, holdout, name, confidence)[1] for name in MODELS]
+        except ValueError as exc:
+            self.log(f"Backtest skipped: {exc}")
+            backtests = []
+        self.derived['forecast'] = {'forecasts': forecasts, 'national': national, 'backtests': backtests}
+
+        print_forecast_report(forecasts, backtests, national)
+        path = self.output_dir / FORECAST_NAME
+        path.parent.mkdir(parents=True, exist_ok=True)
+        forecasts.to_csv(path, index=False)
+        self.log(f"Forecasts saved as '{path}'")
+        return self.derived['forecast']
+
+    @stage('policy_insights')
     def generate_policy_insights(self):
         """Generate policy insights and recommendations"""
-        print("\n" + "="*70)
-        print("POLICY INSIGHTS AND RECOMMENDATIONS")
-        print("="*70)
+        self.log("\n" + "="*70)
+        self.log("POLICY INSIGHTS AND RECOMMENDATIONS")
+        self.log("="*70)
         
-        df = self.cleaned_data['time_series']
+        summary = self.trend_summary
         
         insights = []
         recommendations = []
         
-        # Participation rate analysis
-        avg_participation = df['Total_Participation_Rate'].mean()
-        if avg_participation > 99:
-            insights.append(f"✅ Excellent overall participation rate ({avg_participation:.2f}%)")
-        elif avg_participation > 95:
-            insights.append(f"✓ Good overall participation rate ({avg_participation:.2f}%)")
+        # Participation rate analysis: judge the latest year's 95% interval, not just the mean
+        avg_participation = summary['means']['Total_Participation_Rate']
+        latest = self.national_rates.iloc[-1]
+        interval = f"{int(latest['Year'])}: {latest['Total_Rate']:.2f}%, 95% CI {latest['Total_Rate_Lower']:.2f}-{latest['Total_Rate_Upper']:.2f}%"
+        if latest['Total_Rate_Lower'] > 99:
+            insights.append(f"✅ Excellent overall participation rate (mean {avg_participation:.2f}%; {interval})")
+        elif latest['Total_Rate_Lower'] > 95:
+            insights.append(f"✓ Good overall participation rate (mean {avg_participation:.2f}%; {interval})")
         else:
-            insights.append(f"⚠️ Concerning participation rate ({avg_participation:.2f}%)")
+            insights.append(f"⚠️ Concerning participation rate (mean {avg_participation:.2f}%; {interval})")
             recommendations.append("Investigate barriers preventing registered students from sitting exams")
         
         # Growth trend analysis
-        total_growth = ((df['Total_Sat'].iloc[-1] / df['Total_Sat'].iloc[0]) - 1) * 100
+        total_growth = summary['growth']['Total']
         if total_growth > 10:
             insights.append(f"📈 Strong growth in candidate numbers ({total_growth:.1f}%)")
         elif total_growth > 0:
@@ -281,12 +654,14 @@ class KCSEAnalyzerImproved:
             insights.append(f"📉 Decline in candidate numbers ({total_growth:.1f}%)")
             recommendations.append("Address factors causing decline in KCSE participation")
         
-        # Gender equity analysis
-        gender_gap = df['Gender_Gap'].mean()
+        # Gender equity analysis: a gap only counts if the two-proportion test says so
+        gender_gap = summary['means']['Gender_Gap']
+        significant_years = int((self.national_rates['Gender_Gap_P_Value'] < 0.05).sum())
+        tested = f"significant in {significant_years} of {len(self.national_rates)} years at p < 0.05"
         if abs(gender_gap) < 0.5:
-            insights.append(f"⚖️ Excellent gender parity (gap: {gender_gap:+.2f} pp)")
-        elif abs(gender_gap) < 2:
-            insights.append(f"✓ Good gender balance (gap: {gender_gap:+.2f} pp)")
+            insights.append(f"⚖️ Excellent gender parity (gap: {gender_gap:+.2f} pp, {tested})")
+        elif abs(gender_gap) < 2 or significant_years == 0:
+            insights.append(f"✓ Good gender balance (gap: {gender_gap:+.2f} pp, {tested})")
         else:
             insights.append(f"⚠️ Significant gender gap ({gender_gap:+.2f} pp)")
             if gender_gap > 0:
@@ -295,11 +670,11 @@ class KCSEAnalyzerImproved:
                 recommendations.append("Address barriers preventing female participation in KCSE")
         
         # Print insights
-        print("\n🔍 KEY FINDINGS:")
+        self.log("\n🔍 KEY FINDINGS:")
         for i, insight in enumerate(insights, 1):
-            print(f"{i}. {insight}")
+            self.log(f"{i}. {insight}")
         
-        print("\n📋 POLICY RECOMMENDATIONS:")
+        self.log("\n📋 POLICY RECOMMENDATIONS:")
         base_recommendations = [
             "Maintain high participation rates through continued support",
             "Monitor gender parity trends annually",
@@ -310,10 +685,10 @@ class KCSEAnalyzerImproved:
         
         all_recommendations = recommendations + base_recommendations
         for i, rec in enumerate(all_recommendations, 1):
-            print(f"{i}. {rec}")
+            self.log(f"{i}. {rec}")
         
         # Research priorities
-        print("\n🔬 RESEARCH PRIORITIES:")
+        self.log("\n🔬 RESEARCH PRIORITIES:")
         research_areas = [
             "County-level analysis of participation disparities",
             "Age distribution patterns and over-age candidate trends",
@@ -323,29 +698,89 @@ class KCSEAnalyzerImproved:
         ]
         
         for i, area in enumerate(research_areas, 1):
-            print(f"{i}. {area}")
+            self.log(f"{i}. {area}")
     
-    def run_comprehensive_analysis(self):
-        """Run the complete analysis"""
-        print("🎓 KCSE EXAMINATION PARTICIPATION ANALYSIS")
-        print("="*70)
-        print("Research Question: How do KCSE examination participation rates vary")
-        print("by gender, age group, and county in Kenya, and what trends emerge over time?")
-        print("="*70)
-        
-        # Load and clean data
-        self.load_and_clean_time_series_data()
-        self.load_county_gender_data()
-        self.load_county_age_data()
-        
+    @classmethod
+    def select_stages(cls, only=None, skip=None):
+        """Stages to run, in pipeline order: `only` (or the defaults) minus `skip`"""
+        chosen = set(only or cls.DEFAULT_STAGES) - set(skip or ())
+        return [name for name in cls.STAGES if name in chosen]
+
+    def run_comprehensive_analysis(self, stages=None, reports_dir='reports', force_reports=False,
+                                   n_resamples=DEFAULT_RESAMPLES, seed=0, plotlyjs='inline', store_path=None,
+                                   changed_only=False, publish_to=None, publish_concurrency=DEFAULT_CONCURRENCY,
+                                   horizon=1, forecast_model=DEFAULT_MODEL, holdout=1):
+        """Run the selected analysis stages (default: everything except county reports).
+
+        With changed_only, stages whose source sheets match the last run's fingerprints are skipped.
+        """
+        stages = self.select_stages() if stages is None else list(stages)
+        if changed_only and 'changes' not in stages:
+            stages.insert(0, 'changes')
+        self.log("🎓 KCSE EXAMINATION PARTICIPATION ANALYSIS")
+        self.log("="*70)
+        self.log("Research Question: How do KCSE examination participation rates vary")
+        self.log("by gender, age group, and county in Kenya, and what trends emerge over time?")
+        self.log("="*70)
+        
+        # Prefetch the workbooks the selected stages read in parallel; everything else
+        # (facts, cube, trend metrics) is computed lazily on first use
+        self.load_all_data(keys={key for name in stages for key in self.STAGE_SOURCES[name]})
+        if 'changes' in stages:
+            self.detect_source_changes()
+            if changed_only:
+                changed = self.changed_sources()
+                stale = self.stale_stages(stages)
+                skipped = [name for name in stages if name not in stale]
+                stages = stale
+                self.log(f"Changed sources: {', '.join(sorted(changed)) or 'none'}; "
+                      f"skipping stages already run on these sheets: {', '.join(skipped) or 'none'}")
+        
+        if 'validate' in stages:
+            self.validate_data()
+
         # Perform analyses
-        self.analyze_participation_trends()
-        self.analyze_county_patterns()
-        self.generate_policy_insights()
-        
-        print(f"\n✅ Comprehensive analysis completed!")
-        print("📊 Check the generated visualization: kcse_comprehensive_analysis.png")
+        if 'trends' in stages:
+            self.analyze_participation_trends()
+        if 'counties' in stages:
+            self.analyze_county_patterns()
+        if 'uncertainty' in stages:
+            self.analyze_uncertainty(n_resamples, seed=seed)
+        if 'forecast' in stages:
+            self.forecast_candidature(horizon, forecast_model, holdout)
+        if 'insights' in stages:
+            self.generate_policy_insights()
+        if 'reports' in stages:
+            self.generate_county_reports(reports_dir, force=force_reports)
+        if 'dashboard' in stages:
+            self.export_dashboard(plotlyjs=plotlyjs)
+        if 'store' in stages:
+            self.export_store(store_path)
+        if 'panel' in stages:
+            self.national_panel.report()
+
+        # Render figures after the analysis so plotting never blocks it
+        charts = {}
+        if 'charts' in stages:
+            self.create_trend_visualizations(self.trend_metrics)
+            charts = self.render_charts()
+        if 'publish' in stages:
+            self.publish_outputs(publish_to, concurrency=publish_concurrency)
+        if 'changes' in stages:
+            # Recorded only after the run succeeds, so a failed run is retried in full; stages that
+            # did not run keep their old baselines and still see the change next time
+            baselines = self.fingerprints.load_stages()
+            baselines.update({name: self.stage_inputs(name) for name in stages if name != 'changes'})
+            self.fingerprints.save(self.derived['changes']['fingerprints'], baselines)
+        self.cache.report()
+        compaction_report(self.cleaned_data)
+        self.recorder.print_summary()
+        
+        self.log(f"\n✅ Comprehensive analysis completed!")
+        for paths in charts.values():
+            self.log(f"📊 Check the generated visualization: {', '.join(paths)}")
 
 if __name__ == "__main__":
-    analyzer = KCSEAnalyzerImproved()
-    analyzer.run_comprehensive_analysis()
\ No newline at end of file
+    import sys
+    from kcse_cli import main
+    main(['analyze'] + sys.argv[1:])
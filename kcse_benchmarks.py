@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+KCSE Benchmark Suite
+Times each load / clean / analyse / render stage of KCSEAnalyzerImproved on synthetic
+KCSE-shaped workbooks (see kcse_synthetic) and compares against stored baselines.
+Exits non-zero when any stage is slower than its baseline by more than the threshold.
+Component benchmarks (workbook reader, cube, statistics, bootstrap, panel, validation,
+forecasts) compare each vectorised engine with the naive approach it replaced.
+
+    python kcse_benchmarks.py --years 20 --sub-counties 10 --save-baseline
+    python kcse_benchmarks.py --years 20 --sub-counties 10 --threshold 0.25
+    python kcse_benchmarks.py --component cube --component forecast
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from kcse_analysis_improved import KCSEAnalyzerImproved
+from kcse_bootstrap import bootstrap_counties, DEFAULT_RESAMPLES
+from kcse_cube import ParticipationCube
+from kcse_forecast import TrendFit, backtest, cube_series, forecast_series
+from kcse_panel import LAYOUTS, NationalPanel
+from kcse_stats import county_disparity_table
+from kcse_synthetic import (SyntheticSpec, write_synthetic_dataset, write_multi_sheet_workbook,
+                            synthetic_fact_table, synthetic_cleaned_frames, synthetic_panel_sources)
+from kcse_tidy import ALL
+from kcse_validate import validate
+from kcse_workbook import read_workbook
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+DEFAULT_THRESHOLD = 0.20
+
+
+def _quiet(fn):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn()
+
+
+def _best_of(fn, repeats, setup=None):
+    best = float('inf')
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        _quiet(fn)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _reset_trends(analyzer):
+    analyzer.trends.reset()
+    analyzer.invalidate('trend_metrics')
+
+
+def run_benchmarks(data_dir, repeats=3, dpi=100):
+    """Best-of-N wall time per pipeline stage on the workbooks in data_dir"""
+    with tempfile.TemporaryDirectory() as out:
+        analyzer = KCSEAnalyzerImproved(data_dir=data_dir, use_cache=False, load_workers=1,
+                                        output_dir=out, dpi=dpi, render_workers=1)
+        analyzer.recorder = None
+        results = {}
+        for key in analyzer.SOURCE_FILES:
+            results[f'load_{key}'] = _best_of(lambda: analyzer._load_cached(key), repeats)
+        results['build_facts'] = _best_of(analyzer.build_county_facts, repeats)
+        results['build_cube'] = _best_of(analyzer.build_participation_cube, repeats)
+        _quiet(lambda: analyzer.cube)  # warm the lazy facts/cube so analyze_counties times only the analysis
+        results['analyze_trends'] = _best_of(analyzer.analyze_participation_trends, repeats,
+                                             setup=lambda: _reset_trends(analyzer))
+        results['analyze_counties'] = _best_of(analyzer.analyze_county_patterns, repeats)
+        results['render_charts'] = _best_of(
+            analyzer.render_charts, repeats,
+            setup=lambda: analyzer.create_trend_visualizations(analyzer.trend_metrics))
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """Print a stage table and return the stages slower than baseline * (1 + threshold)"""
+    regressions = []
+    print(f"\n{'stage':<24}{'current':>10}{'baseline':>10}{'ratio':>8}")
+    for stage_name, seconds in results.items():
+        base = baseline.get(stage_name)
+        if base:
+            ratio = seconds / base
+            flag = ' ⚠️' if ratio > 1 + threshold else ''
+            print(f"{stage_name:<24}{seconds:>9.3f}s{base:>9.3f}s{ratio:>7.2f}x{flag}")
+            if flag:
+                regressions.append(stage_name)
+        else:
+            print(f"{stage_name:<24}{seconds:>9.3f}s{'-':>10}{'-':>8}")
+    return regressions
+
+
+def benchmark_workbook(spec, repeats=3):
+    """Per-sheet pd.read_excel against the single-pass loader on one 8-sheet workbook"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_multi_sheet_workbook(Path(tmp) / 'synthetic_gender_region.xlsx', spec)
+
+        def per_sheet():
+            xl = pd.ExcelFile(path)
+            return {sheet: pd.read_excel(path, sheet_name=sheet) for sheet in xl.sheet_names}
+
+        timings = {'per_sheet_read_excel': _best_of(per_sheet, repeats),
+                   'single_pass_read_workbook': _best_of(lambda: read_workbook(path), repeats)}
+    print(f"\n⏱️ WORKBOOK LOADER ({spec.n_units:,} units x {len(spec.years)} years, 8 sheets, best of {repeats}):")
+    print(f"per-sheet read_excel: {timings['per_sheet_read_excel']:.3f}s")
+    print(f"single-pass read_workbook: {timings['single_pass_read_workbook']:.3f}s")
+    print(f"Speed-up: {timings['per_sheet_read_excel'] / timings['single_pass_read_workbook']:.2f}x")
+    return timings
+
+
+def benchmark_cube(spec, n_queries=2000):
+    """Random cube lookups against the equivalent ad hoc pandas filters/groupbys"""
+    facts = synthetic_fact_table(spec)
+    rng = np.random.default_rng(spec.seed)
+    start = time.perf_counter()
+    cube = ParticipationCube(facts)
+    build = time.perf_counter() - start
+
+    counties = rng.choice(cube.counties, n_queries)
+    genders = rng.choice(['Female', 'Male'], n_queries)
+    years = rng.choice(cube.years, n_queries)
+
+    start = time.perf_counter()
+    cube_answers = [cube.query(county=c, gender=g, year=int(y)) for c, g, y in zip(counties, genders, years)]
+    cube_time = (time.perf_counter() - start) / n_queries
+
+    n_pandas = min(n_queries, 200)
+    start = time.perf_counter()
+    pandas_answers = []
+    for c, g, y in zip(counties[:n_pandas], genders[:n_pandas], years[:n_pandas]):
+        rows = facts[(facts['county'] == c) & (facts['gender'] == g) & (facts['year'] == y)]
+        pandas_answers.append(float(rows.groupby('age_band', observed=True)['candidates'].sum().sum()))
+    pandas_time = (time.perf_counter() - start) / n_pandas
+
+    assert np.allclose(cube_answers[:n_pandas], pandas_answers)
+    print(f"\n⏱️ PARTICIPATION CUBE ({len(facts):,} fact rows, {len(cube.years)} years):")
+    print(f"Cube build: {build * 1000:.1f} ms")
+    print(f"Cube query: {cube_time * 1e6:.1f} µs/query")
+    print(f"Pandas filter+groupby: {pandas_time * 1e6:.1f} µs/query")
+    print(f"Speed-up: {pandas_time / cube_time:.0f}x")
+    return {'cube_build': build, 'cube_query': cube_time, 'pandas_query': pandas_time}
+
+
+def benchmark_stats(spec):
+    """county_disparity_table against a per-unit np.polyfit loop"""
+    cube = ParticipationCube(synthetic_fact_table(spec))
+    start = time.perf_counter()
+    table = county_disparity_table(cube)
+    vectorised = time.perf_counter() - start
+
+    total = cube.county[:, cube._gender_index[ALL], cube._age_index[ALL], :]
+    start = time.perf_counter()
+    slopes = [np.polyfit(cube.years, row, 1)[0] for row in total]
+    looped = time.perf_counter() - start
+
+    assert np.allclose(slopes, table['trend_per_year'])
+    print(f"\n⏱️ STATISTICS ENGINE ({spec.n_units:,} units x {len(cube.years)} years):")
+    print(f"Vectorised disparity table (CIs, GPI, trends, p-values, outliers): {vectorised * 1000:.1f} ms")
+    print(f"Per-unit np.polyfit loop (slopes only): {looped * 1000:.1f} ms")
+    return {'stats_vectorised': vectorised, 'stats_looped': looped}
+
+
+def benchmark_bootstrap(spec, n_resamples=DEFAULT_RESAMPLES, workers=1):
+    """County bootstrap intervals over every unit"""
+    cube = ParticipationCube(synthetic_fact_table(spec))
+    start = time.perf_counter()
+    bootstrap_counties(cube, n_resamples, workers=workers)
+    elapsed = time.perf_counter() - start
+    print(f"\n⏱️ BOOTSTRAP: {n_resamples:,} resamples x {spec.n_units:,} units x {len(spec.years)} years "
+          f"in {elapsed:.2f}s ({workers} worker(s))")
+    return {'bootstrap': elapsed}
+
+
+def benchmark_panel(spec, n_sources=12, repeats=3):
+    """NationalPanel over n_sources synthetic sheets cycling through every layout"""
+    canonical, sources = synthetic_panel_sources(spec, n_sources)
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        panel = NationalPanel(sources)
+        best = min(best, time.perf_counter() - start)
+    assert panel.panel[canonical.columns].equals(canonical) and panel.conflicts.empty
+    print(f"\n⏱️ PANEL ALIGNMENT: {n_sources} sources x {len(spec.years)} years "
+          f"({len(LAYOUTS)} layouts) aligned and merged in {best * 1000:.1f} ms")
+    return {'panel': best}
+
+
+def benchmark_validation(spec):
+    """A full validation pass over the cleaned county tables of every unit"""
+    report = validate(*synthetic_cleaned_frames(spec))
+    print(f"\n⏱️ VALIDATION: {spec.n_units:,} units x {len(spec.years)} years, {len(report.summary)} checks "
+          f"in {report.elapsed * 1000:.1f} ms ({report.errors} errors, {report.warnings} warnings)")
+    return {'validation': report.elapsed}
+
+
+def benchmark_forecast(spec, horizon=3):
+    """Batched fitting, forecasting and backtesting of every series against a per-series np.polyfit loop"""
+    cube = ParticipationCube(synthetic_fact_table(spec))
+    values, labels = cube_series(cube)
+
+    start = time.perf_counter()
+    forecasts = forecast_series(values, cube.years, labels, horizon)
+    batched = time.perf_counter() - start
+    start = time.perf_counter()
+    backtest(values, cube.years, labels, holdout=2)
+    backtested = time.perf_counter() - start
+
+    n_loop = min(len(values), 1000)
+    start = time.perf_counter()
+    slopes = [np.polyfit(cube.years, row, 1)[0] for row in values[:n_loop]]
+    looped = (time.perf_counter() - start) / n_loop * len(values)
+
+    assert np.allclose(slopes, TrendFit(values[:n_loop], cube.years).slope)
+    print(f"\n⏱️ FORECASTS ({len(values):,} series x {len(cube.years)} years, horizon {horizon}):")
+    print(f"Batched fit + {len(forecasts):,} forecasts with intervals: {batched * 1000:.1f} ms")
+    print(f"Batched backtest (2 held-out years): {backtested * 1000:.1f} ms")
+    print(f"Per-series np.polyfit loop (slopes only, extrapolated): {looped * 1000:.1f} ms")
+    return {'forecast_batched': batched, 'forecast_backtest': backtested, 'forecast_looped': looped}
+
+
+# Component benchmarks: name -> (function, default scale as SyntheticSpec keyword arguments)
+COMPONENTS = {
+    'workbook': (benchmark_workbook, {'years': 20}),
+    'cube': (benchmark_cube, {'years': 20}),
+    'stats': (benchmark_stats, {'years': 20, 'counties': 50, 'sub_counties': 100}),
+    'bootstrap': (benchmark_bootstrap, {'years': 5}),
+    'panel': (benchmark_panel, {'years': 20}),
+    'validation': (benchmark_validation, {'years': 20, 'sub_counties': 200}),
+    'forecast': (benchmark_forecast, {'years': 20, 'counties': 50, 'sub_counties': 40}),
+}
+
+
+def run_components(names):
+    """Run component benchmarks at their default scales; returns {metric: seconds}"""
+    results = {}
+    for name in names:
+        fn, scale = COMPONENTS[name]
+        results.update(fn(SyntheticSpec(**scale)))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the KCSE pipeline on synthetic data")
+    parser.add_argument('--years', type=int, default=20)
+    parser.add_argument('--counties', type=int, default=47)
+    parser.add_argument('--sub-counties', type=int, default=1)
+    parser.add_argument('--schools', type=int, default=1)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the baseline for its scale")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown before a stage counts as a regression (0.2 = 20%%)")
+    parser.add_argument('--component', action='append', choices=['all', *COMPONENTS],
+                        help="Run a component benchmark at its default scale instead of the pipeline (repeatable)")
+    args = parser.parse_args()
+
+    if args.component:
+        run_components(list(COMPONENTS) if 'all' in args.component else args.component)
+        sys.exit(0)
+
+    spec = SyntheticSpec(args.years, args.counties, args.sub_counties, args.schools)
+    scale_key = f"y{args.years}_c{args.counties}_s{args.sub_counties}_k{args.schools}"
+    print(f"🏁 KCSE BENCHMARKS: {spec}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        write_synthetic_dataset(tmp, spec)
+        print(f"Synthetic workbooks written in {time.perf_counter() - start:.2f}s")
+        results = run_benchmarks(tmp, repeats=args.repeats, dpi=args.dpi)
+
+    baseline_path = Path(args.baseline)
+    baselines = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    regressions = compare_to_baseline(results, baselines.get(scale_key, {}), args.threshold)
+
+    if args.save_baseline:
+        baselines[scale_key] = results
+        baseline_path.write_text(json.dumps(baselines, indent=2))
+        print(f"\nBaseline for {scale_key} saved to '{baseline_path}'")
+    elif regressions:
+        print(f"\n❌ {len(regressions)} stage(s) regressed beyond {args.threshold:.0%}: {regressions}")
+        sys.exit(1)
+    else:
+        print("\n✅ No regressions against baseline")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+KCSE Resampling Uncertainty
+Parametric bootstrap intervals for the headline participation figures. Counts are redrawn in
+NumPy batches (Sat ~ Binomial(Registered, rate) nationally; Female ~ Binomial(Total, share) and
+Total ~ Poisson(Total) per county), the metrics are recomputed for the whole batch at once, and
+percentile intervals are taken over all resamples. Each batch draws from its own SeedSequence
+child, so results are identical whether batches run in one process or across a pool.
+"""
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from kcse_stats import gender_parity_index
+from kcse_tidy import ALL
+
+DEFAULT_RESAMPLES = 10_000
+DEFAULT_BATCH_SIZE = 1_000
+
+
+def national_metrics(sat, registered):
+    """Headline metrics from Sat counts shaped (resamples, gender [Female, Male], years)"""
+    rates = sat / registered * 100
+    total_sat = sat.sum(axis=1)
+    total_rate = total_sat / registered.sum(axis=0) * 100
+    return {
+        'Total_Participation_Rate': total_rate.mean(axis=1),
+        'Female_Participation_Rate': rates[:, 0].mean(axis=1),
+        'Male_Participation_Rate': rates[:, 1].mean(axis=1),
+        'Gender_Gap': (rates[:, 0] - rates[:, 1]).mean(axis=1),
+        'Total_Growth': (total_sat[:, -1] / total_sat[:, 0] - 1) * 100,
+    }
+
+
+def county_metrics(first_total, latest_total, latest_female):
+    """County metrics from first-year and latest-year totals and latest-year female counts,
+    each shaped (resamples, counties)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'female_share': latest_female / latest_total * 100,
+            'gpi': gender_parity_index(latest_female, latest_total - latest_female),
+            'growth': (latest_total / first_total - 1) * 100,
+        }
+
+
+def _national_batch(seed, size, counts):
+    """Worker task: one batch of national resamples"""
+    rng = np.random.default_rng(seed)
+    registered = counts['registered']
+    sat = rng.binomial(registered, counts['sat'] / registered, size=(size,) + registered.shape)
+    return national_metrics(sat, registered)
+
+
+def _county_batch(seed, size, counts):
+    """Worker task: one batch of county resamples (only the first and latest years are drawn)"""
+    rng = np.random.default_rng(seed)
+    first = rng.poisson(counts['first_total'], size=(size,) + counts['first_total'].shape)
+    latest = rng.poisson(counts['latest_total'], size=(size,) + counts['latest_total'].shape)
+    female = rng.binomial(latest, counts['latest_share'])
+    return county_metrics(first.astype(float), latest.astype(float), female.astype(float))
+
+
+def run_resamples(batch_fn, counts, n_resamples=DEFAULT_RESAMPLES, seed=0, batch_size=DEFAULT_BATCH_SIZE,
+                  workers=1):
+    """Run batch_fn over n_resamples in batches (optionally in a process pool) and stack the results"""
+    sizes = [batch_size] * (n_resamples // batch_size)
+    if n_resamples % batch_size:
+        sizes.append(n_resamples % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes))) as pool:
+            batches = list(pool.map(batch_fn, seeds, sizes, [counts] * len(sizes)))
+    else:
+        batches = [batch_fn(s, size, counts) for s, size in zip(seeds, sizes)]
+    return {metric: np.concatenate([batch[metric] for batch in batches]) for metric in batches[0]}
+
+
+def percentile_interval(samples, confidence=0.95):
+    """Lower/upper percentile bounds along the resample axis (axis 0), ignoring NaNs"""
+    tail = (1 - confidence) / 2 * 100
+    shape = samples.shape[1:]
+    samples = samples.reshape(len(samples), -1)
+    bounds = np.percentile(samples, [tail, 100 - tail], axis=0)
+    # nanpercentile loops per column, so only use it where some (not all) resamples are NaN
+    nan_count = np.isnan(samples).sum(axis=0)
+    partial = (nan_count > 0) & (nan_count < samples.shape[0])
+    if partial.any():
+        bounds[:, partial] = np.nanpercentile(samples[:, partial], [tail, 100 - tail], axis=0)
+    return bounds.reshape((2,) + shape)
+
+
+def bootstrap_national(time_series, n_resamples=DEFAULT_RESAMPLES, confidence=0.95, seed=0,
+                       batch_size=DEFAULT_BATCH_SIZE, workers=1):
+    """Bootstrap intervals for mean participation rates, mean gender gap and total Sat growth"""
+    ts = time_series.sort_values('Year')
+    counts = {
+        'registered': ts[['Female_Registered', 'Male_Registered']].to_numpy(dtype=np.int64).T,
+        'sat': ts[['Female_Sat', 'Male_Sat']].to_numpy(dtype=np.int64).T,
+    }
+    point = {metric: values[0] for metric, values in national_metrics(counts['sat'][None], counts['registered']).items()}
+    samples = run_resamples(_national_batch, counts, n_resamples, seed, batch_size, workers)
+    rows = []
+    for metric, values in samples.items():
+        lower, upper = percentile_interval(values, confidence)
+        rows.append({'metric': metric, 'estimate': point[metric], 'lower': lower, 'upper': upper})
+    return pd.DataFrame(rows).set_index('metric')
+
+
+def bootstrap_counties(cube, n_resamples=DEFAULT_RESAMPLES, confidence=0.95, seed=0,
+                       batch_size=DEFAULT_BATCH_SIZE, workers=1):
+    """Per-county bootstrap intervals for latest female share, parity index and first-to-last growth"""
+    a_all = cube._age_index[ALL]
+    total = cube.county[:, cube._gender_index[ALL], a_all, :]
+    female = cube.county[:, cube._gender_index['Female'], a_all, :]
+    reported = ~np.isnan(total)
+    rows = np.arange(total.shape[0])
+    first_total = total[rows, np.argmax(reported, axis=1)]
+    last = total.shape[1] - 1 - np.argmax(reported[:, ::-1], axis=1)
+    latest_total, latest_female = total[rows, last], female[rows, last]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        latest_share = latest_female / latest_total
+
+    # Counties with no data are drawn as zero and masked back to NaN afterwards
+    counts = {
+        'first_total': np.nan_to_num(first_total).astype(np.int64),
+        'latest_total': np.nan_to_num(latest_total).astype(np.int64),
+        'latest_share': np.nan_to_num(latest_share),
+    }
+    point = county_metrics(first_total[None], latest_total[None], latest_female[None])
+    samples = run_resamples(_county_batch, counts, n_resamples, seed, batch_size, workers)
+    missing = ~reported.any(axis=1)
+
+    table = {}
+    for metric, values in samples.items():
+        values[:, missing] = np.nan
+        lower, upper = percentile_interval(values, confidence)
+        table[metric] = point[metric][0]
+        table[f'{metric}_lower'] = lower
+        table[f'{metric}_upper'] = upper
+    return pd.DataFrame(table, index=pd.Index(cube.counties, name='county'))
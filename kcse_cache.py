@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+KCSE Data Cache
+Columnar on-disk cache for cleaned DataFrames, so unchanged workbooks are not re-parsed through openpyxl on every run.
+
+Each cached frame is stored as one memory-mappable .npy file per column plus a JSON manifest
+recording the source workbook path, mtime, size and SHA-256 content hash. Categorical columns
+are stored as their integer codes, with the categories kept in the manifest.
+"""
+
+import hashlib
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Bump when the cleaning logic changes so stale cached frames are discarded
+CACHE_VERSION = 4
+DEFAULT_CACHE_DIR = '.kcse_cache'
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class KCSEDataCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, enabled=True):
+        self.cache_dir = Path(cache_dir)
+        self.enabled = enabled
+        self.hits = []
+        self.misses = []
+
+    def _entry_dir(self, key):
+        return self.cache_dir / key
+
+    def _source_stat(self, source):
+        stat = Path(source).stat()
+        return {
+            'path': str(Path(source).resolve()),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+        }
+
+    def _read_manifest(self, key):
+        manifest_path = self._entry_dir(key) / 'manifest.json'
+        if not manifest_path.exists():
+            return None
+        try:
+            return json.loads(manifest_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _is_fresh(self, key, manifest, source):
+        """Check a manifest against the source file: path and mtime first, content hash as fallback"""
+        if manifest is None or manifest.get('version') != CACHE_VERSION:
+            return False
+        current = self._source_stat(source)
+        if manifest['source']['path'] != current['path']:
+            return False
+        if (manifest['source']['mtime_ns'] == current['mtime_ns']
+                and manifest['source']['size'] == current['size']):
+            return True
+        # Touched but possibly unchanged (e.g. re-downloaded): compare contents
+        if manifest['source']['sha256'] != file_fingerprint(source):
+            return False
+        manifest['source'].update(current)
+        (self._entry_dir(key) / 'manifest.json').write_text(json.dumps(manifest, indent=2))
+        return True
+
+    def get(self, key, source):
+        """Return the cached frame(s) for key if source is unchanged, else None"""
+        if not self.enabled:
+            return None
+        manifest = self._read_manifest(key)
+        if not self._is_fresh(key, manifest, source):
+            self.misses.append(key)
+            return None
+        try:
+            frames = self._read_frames(self._entry_dir(key), manifest)
+        except (OSError, ValueError):
+            self.misses.append(key)
+            return None
+        self.hits.append(key)
+        return frames
+
+    def put(self, key, source, frames):
+        """Write a cleaned frame (or a dict of frames from a multi-sheet source) keyed on its source workbook"""
+        if not self.enabled:
+            return
+        entry_dir = self._entry_dir(key)
+        tmp_dir = entry_dir.with_name(entry_dir.name + '.tmp')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        parts = frames if isinstance(frames, dict) else {'': frames}
+        layout = {}
+        for i, (name, df) in enumerate(parts.items()):
+            part_dir = tmp_dir / f'part_{i:02d}'
+            part_dir.mkdir()
+            layout[name] = dict(self._write_frame(part_dir, df), dir=part_dir.name)
+
+        source_info = self._source_stat(source)
+        source_info['sha256'] = file_fingerprint(source)
+        manifest = {
+            'version': CACHE_VERSION,
+            'key': key,
+            'source': source_info,
+            'multi': isinstance(frames, dict),
+            'frames': layout,
+        }
+        (tmp_dir / 'manifest.json').write_text(json.dumps(manifest, indent=2))
+
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        tmp_dir.rename(entry_dir)
+
+    def _write_frame(self, part_dir, df):
+        columns = []
+        for i, (name, series) in enumerate(df.items()):
+            filename = f'col_{i:04d}.npy'
+            column = {'name': str(name), 'file': filename}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                values = series.cat.codes.to_numpy()
+                column['categories'] = series.cat.categories.tolist()
+                column['ordered'] = bool(series.cat.ordered)
+            else:
+                values = series.to_numpy()
+            column['object'] = values.dtype == object
+            np.save(part_dir / filename, values, allow_pickle=column['object'])
+            columns.append(column)
+        index = df.index.to_numpy()
+        np.save(part_dir / 'index.npy', index, allow_pickle=index.dtype == object)
+        return {'columns': columns, 'index_object': index.dtype == object}
+
+    def _read_frames(self, entry_dir, manifest):
+        frames = {name: self._read_frame(entry_dir / layout['dir'], layout)
+                  for name, layout in manifest['frames'].items()}
+        return frames if manifest['multi'] else frames['']
+
+    def _read_frame(self, part_dir, layout):
+        data = {}
+        for col in layout['columns']:
+            # Numeric columns are memory-mapped; object columns must be unpickled
+            if col['object']:
+                data[col['name']] = np.load(part_dir / col['file'], allow_pickle=True)
+            else:
+                data[col['name']] = np.load(part_dir / col['file'], mmap_mode='r')
+            if 'categories' in col:
+                data[col['name']] = pd.Categorical.from_codes(data[col['name']], col['categories'],
+                                                              ordered=col['ordered'])
+        index = np.load(part_dir / 'index.npy', allow_pickle=layout['index_object'])
+        return pd.DataFrame(data, index=index, columns=[c['name'] for c in layout['columns']])
+
+    def clear(self):
+        """Remove every cached frame"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def report(self):
+        """Print a cache hit/miss summary for this run"""
+        if not self.enabled:
+            print("\n🗄️ Data cache disabled (--no-cache)")
+            return
+        total = len(self.hits) + len(self.misses)
+        print(f"\n🗄️ DATA CACHE REPORT ({self.cache_dir}):")
+        print(f"Hits: {len(self.hits)}/{total} {self.hits}")
+        print(f"Misses: {len(self.misses)}/{total} {self.misses}")
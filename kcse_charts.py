@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+KCSE Chart Rendering
+Figure builders are pure functions of the cleaned data; rendering is a separate stage that
+draws them with the non-interactive Agg backend, optionally across a process pool, and
+writes each figure in the requested formats and DPI. Nothing here calls plt.show() unless asked.
+matplotlib and seaborn are imported inside the functions that draw, so importing this module
+(and the analyzers built on it) stays cheap when no chart stage runs.
+"""
+
+import io
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+DEFAULT_DPI = 300
+DEFAULT_FORMATS = ('png',)
+
+# pyplot's figure registry is global state: threads drawing in one process take turns
+_PYPLOT_LOCK = threading.Lock()
+
+
+def apply_style():
+    """Plot style shared by every figure (applied inside each render worker)"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    plt.style.use('seaborn-v0_8')
+    sns.set_palette("husl")
+
+
+def build_trend_dashboard(df):
+    """Six-panel national participation dashboard (expects analyze_participation_trends columns)"""
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import FuncFormatter
+
+    # Create a comprehensive dashboard
+    fig = plt.figure(figsize=(18, 14))
+    gs = fig.add_gridspec(3, 3, hspace=0.3, wspace=0.3)
+
+    # 1. Participation rates over time
+    ax1 = fig.add_subplot(gs[0, :2])
+    ax1.plot(df['Year'], df['Total_Participation_Rate'], 'o-', linewidth=3, markersize=8, label='Total', color='purple')
+    ax1.plot(df['Year'], df['Female_Participation_Rate'], 's-', linewidth=2, markersize=6, label='Female', color='red')
+    ax1.plot(df['Year'], df['Male_Participation_Rate'], '^-', linewidth=2, markersize=6, label='Male', color='blue')
+    ax1.set_title('KCSE Participation Rates by Gender (2020-2024)', fontsize=14, fontweight='bold')
+    ax1.set_xlabel('Year')
+    ax1.set_ylabel('Participation Rate (%)')
+    ax1.legend()
+    ax1.grid(True, alpha=0.3)
+    ax1.set_ylim(95, 101)  # Focus on the relevant range
+
+    # 2. Gender gap over time
+    ax2 = fig.add_subplot(gs[0, 2])
+    colors = ['red' if x > 0 else 'blue' for x in df['Gender_Gap']]
+    bars = ax2.bar(df['Year'], df['Gender_Gap'], color=colors, alpha=0.7)
+    ax2.axhline(y=0, color='black', linestyle='-', alpha=0.5)
+    ax2.set_title('Gender Gap in Participation\n(Positive = Female advantage)', fontsize=12, fontweight='bold')
+    ax2.set_xlabel('Year')
+    ax2.set_ylabel('Gap (percentage points)')
+    ax2.grid(True, alpha=0.3)
+
+    # 3. Total candidates over time
+    ax3 = fig.add_subplot(gs[1, 0])
+    ax3.bar(df['Year'], df['Total_Sat'], alpha=0.8, color='skyblue', edgecolor='navy')
+    ax3.set_title('Total KCSE Candidates', fontsize=12, fontweight='bold')
+    ax3.set_xlabel('Year')
+    ax3.set_ylabel('Number of Candidates')
+    ax3.grid(True, alpha=0.3)
+    # Format y-axis to show values in thousands
+    ax3.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f'{x/1000:.0f}K'))
+
+    # 4. Male vs Female candidates
+    ax4 = fig.add_subplot(gs[1, 1])
+    width = 0.35
+    x = np.arange(len(df))
+    ax4.bar(x - width/2, df['Female_Sat'], width, label='Female', color='red', alpha=0.7)
+    ax4.bar(x + width/2, df['Male_Sat'], width, label='Male', color='blue', alpha=0.7)
+    ax4.set_title('Male vs Female Candidates', fontsize=12, fontweight='bold')
+    ax4.set_xlabel('Year')
+    ax4.set_ylabel('Number of Candidates')
+    ax4.set_xticks(x)
+    ax4.set_xticklabels([int(year) for year in df['Year']])
+    ax4.legend()
+    ax4.grid(True, alpha=0.3)
+    ax4.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f'{x/1000:.0f}K'))
+
+    # 5. Registered vs Sat comparison
+    ax5 = fig.add_subplot(gs[1, 2])
+    ax5.plot(df['Year'], df['Total_Registered'], 'o-', label='Registered', linewidth=2, markersize=6)
+    ax5.plot(df['Year'], df['Total_Sat'], 's-', label='Sat for Exam', linewidth=2, markersize=6)
+    ax5.set_title('Registered vs Actual Participants', fontsize=12, fontweight='bold')
+    ax5.set_xlabel('Year')
+    ax5.set_ylabel('Number of Students')
+    ax5.legend()
+    ax5.grid(True, alpha=0.3)
+    ax5.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f'{x/1000:.0f}K'))
+
+    # 6. Year-over-year changes
+    ax6 = fig.add_subplot(gs[2, :])
+    changes = df['Total_Change'].values
+    colors = ['green' if x > 0 else 'red' for x in changes]
+    bars = ax6.bar(df['Year'], changes, color=colors, alpha=0.7)
+    ax6.axhline(y=0, color='black', linestyle='-', alpha=0.5)
+    ax6.set_title('Year-over-Year Change in Total Candidates', fontsize=12, fontweight='bold')
+    ax6.set_xlabel('Year')
+    ax6.set_ylabel('Change in Number of Candidates')
+    ax6.grid(True, alpha=0.3)
+
+    # Add value labels on bars
+    for bar, value in zip(bars, changes):
+        height = bar.get_height()
+        ax6.text(bar.get_x() + bar.get_width()/2., height + (1000 if height > 0 else -3000),
+                f'{int(value):,}', ha='center', va='bottom' if height > 0 else 'top', fontweight='bold')
+
+    fig.suptitle('KCSE Examination Participation Analysis Dashboard\nKenya 2020-2024',
+                 fontsize=16, fontweight='bold', y=0.98)
+    return fig
+
+
+def build_time_trends(df):
+    """Four-panel time trends figure used by KCSEAnalyzer.analyze_time_trends"""
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(2, 2, figsize=(15, 12))
+    fig.suptitle('KCSE Participation Trends (2020-2024)', fontsize=16, fontweight='bold')
+
+    # Plot 1: Overall participation rates
+    axes[0,0].plot(df['Year'], df['Participation_Rate'], marker='o', linewidth=2, markersize=8)
+    axes[0,0].set_title('Overall Participation Rate Over Time')
+    axes[0,0].set_xlabel('Year')
+    axes[0,0].set_ylabel('Participation Rate (%)')
+    axes[0,0].grid(True, alpha=0.3)
+
+    # Plot 2: Gender comparison
+    axes[0,1].plot(df['Year'], df['Female_Participation_Rate'], marker='o', label='Female', linewidth=2)
+    axes[0,1].plot(df['Year'], df['Male_Participation_Rate'], marker='s', label='Male', linewidth=2)
+    axes[0,1].set_title('Participation Rate by Gender')
+    axes[0,1].set_xlabel('Year')
+    axes[0,1].set_ylabel('Participation Rate (%)')
+    axes[0,1].legend()
+    axes[0,1].grid(True, alpha=0.3)
+
+    # Plot 3: Total candidates
+    axes[1,0].bar(df['Year'], df['Total_Sat'], alpha=0.7, color='skyblue')
+    axes[1,0].set_title('Total KCSE Candidates')
+    axes[1,0].set_xlabel('Year')
+    axes[1,0].set_ylabel('Number of Candidates')
+    axes[1,0].grid(True, alpha=0.3)
+
+    # Plot 4: Gender gap
+    colors = ['red' if x > 0 else 'blue' for x in df['Gender_Gap']]
+    axes[1,1].bar(df['Year'], df['Gender_Gap'], color=colors, alpha=0.7)
+    axes[1,1].axhline(y=0, color='black', linestyle='-', alpha=0.5)
+    axes[1,1].set_title('Gender Gap in Participation\n(Positive = Female advantage)')
+    axes[1,1].set_xlabel('Year')
+    axes[1,1].set_ylabel('Gender Gap (percentage points)')
+    axes[1,1].grid(True, alpha=0.3)
+
+    fig.tight_layout()
+    return fig
+
+
+def build_county_profile(data):
+    """Two-panel county figure: candidates by gender per year and age-band shares"""
+    import matplotlib.pyplot as plt
+
+    stats, age_shares, county = data['stats'], data['age_shares'], data['county']
+    fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    fig.suptitle(f'KCSE Candidature Profile: {county}', fontsize=14, fontweight='bold')
+
+    width = 0.35
+    x = np.arange(len(stats))
+    axes[0].bar(x - width/2, stats['Female'], width, label='Female', color='red', alpha=0.7)
+    axes[0].bar(x + width/2, stats['Male'], width, label='Male', color='blue', alpha=0.7)
+    axes[0].set_xticks(x)
+    axes[0].set_xticklabels([int(year) for year in stats.index])
+    axes[0].set_title('Candidates by Gender')
+    axes[0].set_xlabel('Year')
+    axes[0].set_ylabel('Number of Candidates')
+    axes[0].legend()
+    axes[0].grid(True, alpha=0.3)
+
+    if not age_shares.empty:
+        age_shares.T.plot(kind='bar', ax=axes[1], alpha=0.8)
+        axes[1].legend(title='Year')
+    axes[1].set_title('Age Distribution of Candidates')
+    axes[1].set_xlabel('Age band')
+    axes[1].set_ylabel('Share of Candidates (%)')
+    axes[1].grid(True, alpha=0.3)
+
+    fig.tight_layout()
+    return fig
+
+
+BUILDERS = {
+    'trend_dashboard': build_trend_dashboard,
+    'time_trends': build_time_trends,
+    'county_profile': build_county_profile,
+}
+
+
+class ChartJob:
+    """One figure to render: output name, registered builder and the data it draws"""
+
+    def __init__(self, name, builder, data, formats=DEFAULT_FORMATS, dpi=DEFAULT_DPI, title=None):
+        self.name = name
+        self.builder = builder
+        self.data = data
+        self.formats = tuple(formats)
+        self.dpi = dpi
+        self.title = title or name
+
+
+def render_job(job, output_dir, headless=True):
+    """Build one figure, save it in every requested format and close it; returns written paths"""
+    if headless:
+        import matplotlib
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    apply_style()
+
+    fig = BUILDERS[job.builder](job.data)
+    paths = []
+    for fmt in job.formats:
+        path = Path(output_dir) / f'{job.name}.{fmt}'
+        fig.savefig(path, dpi=job.dpi, bbox_inches='tight')
+        paths.append(str(path))
+    if headless:
+        plt.close(fig)
+    return paths
+
+
+def encode_job(job):
+    """Draw one figure headlessly into memory; returns {'<name>.<format>': bytes} for every format"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    encoded = {}
+    with _PYPLOT_LOCK:
+        apply_style()
+        fig = BUILDERS[job.builder](job.data)
+        try:
+            for fmt in job.formats:
+                buffer = io.BytesIO()
+                fig.savefig(buffer, format=fmt, dpi=job.dpi, bbox_inches='tight')
+                encoded[f'{job.name}.{fmt}'] = buffer.getvalue()
+        finally:
+            plt.close(fig)
+    return encoded
+
+
+def render_figures(jobs, output_dir='.', workers=1, show=False):
+    """Render chart jobs, in a process pool when workers > 1; returns {job name: [paths]}"""
+    jobs = list(jobs)
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    if show or workers <= 1 or len(jobs) <= 1:
+        results = {job.name: render_job(job, output_dir, headless=not show) for job in jobs}
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = {job.name: pool.submit(render_job, job, output_dir) for job in jobs}
+            results = {name: future.result() for name, future in futures.items()}
+
+    for job in jobs:
+        print(f"\n📊 {job.title} saved as {', '.join(repr(p) for p in results[job.name])}")
+    if show:
+        import matplotlib.pyplot as plt
+        plt.show()
+    return results
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Paper Trails command-line interface
+
+    python kcse_cli.py analyze --data-dir data/ --only trends --format svg
+    python kcse_cli.py analyze --skip charts --run-report run.json
+    python kcse_cli.py analyze --only reports --reports-dir reports/
+    python kcse_cli.py analyze --only dashboard --output-dir site/
+    python kcse_cli.py analyze --only store && python kcse_cli.py query "SELECT * FROM county_gender WHERE county = 'Nairobi'"
+    python kcse_cli.py analyze --only forecast --horizon 2 --forecast-model growth
+    python kcse_cli.py analyze --only uncertainty --only publish --publish-to site/ --publish-to fake-objstore://bucket/
+    python kcse_cli.py serve --data-dir . --port 8765
+
+Headless by default: charts are written to --output-dir and never shown unless --show is
+given, and matplotlib/seaborn are only imported when the charts or reports stage runs.
+"""
+
+import argparse
+import sys
+
+from kcse_analysis_improved import KCSEAnalyzerImproved
+from kcse_cache import DEFAULT_CACHE_DIR
+from kcse_charts import DEFAULT_DPI, DEFAULT_FORMATS
+from kcse_dashboard import PLOTLY_MISSING, plotly_available
+from kcse_instrument import StageRecorder
+from kcse_stream import DEFAULT_BATCH_SIZE
+from kcse_bootstrap import DEFAULT_RESAMPLES
+from kcse_forecast import DEFAULT_MODEL, MODELS
+from kcse_publish import target_from_uri, DEFAULT_CONCURRENCY
+from kcse_server import build_parser as build_server_parser, run_server
+from kcse_store import build_parser as build_query_parser, run_query
+
+# Per-workbook path overrides: option name -> SOURCE_FILES key
+SOURCE_OPTIONS = {
+    'registered_vs_sat': 'time_series',
+    'gender_region': 'county_gender',
+    'age_region': 'county_age',
+    'normalised': 'reference',
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python kcse_cli.py', description="KCSE examination participation analysis")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    analyze = commands.add_parser('analyze', help="Run the participation analysis pipeline")
+    inputs = analyze.add_argument_group('inputs')
+    inputs.add_argument('--data-dir', default='.', help="Directory containing the KCSE workbooks")
+    inputs.add_argument('--registered-vs-sat', metavar='PATH', help="Path to 'Registered vs Sat.xlsx'")
+    inputs.add_argument('--gender-region', metavar='PATH', help="Path to 'Gender + Region.xlsx'")
+    inputs.add_argument('--age-region', metavar='PATH', help="Path to 'Age + Region.xlsx'")
+    inputs.add_argument('--normalised', metavar='PATH', help="Path to 'normalised data.xlsx'")
+    inputs.add_argument('--candidates', metavar='PATH', action='append',
+                        help="Candidate-level CSV/xlsx extract to stream instead of the summary workbooks (repeatable)")
+    inputs.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Rows per batch when streaming extracts")
+    inputs.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Directory for the cleaned-data cache")
+    inputs.add_argument('--no-cache', action='store_true', help="Always re-parse the workbooks, bypassing the cache")
+    inputs.add_argument('--workers', type=int, default=None, help="Processes used to load workbooks (default: CPU count)")
+
+    stages = analyze.add_argument_group('stages')
+    stages.add_argument('--only', action='append', choices=KCSEAnalyzerImproved.STAGES, metavar='STAGE',
+                        help=f"Run only this stage (repeatable; one of {', '.join(KCSEAnalyzerImproved.STAGES)})")
+    stages.add_argument('--skip', action='append', choices=KCSEAnalyzerImproved.STAGES, metavar='STAGE',
+                        help="Skip this stage (repeatable)")
+    stages.add_argument('--county-reports', metavar='DIR',
+                        help="Batch mode: only write per-county reports to DIR (same as --only reports --reports-dir DIR)")
+    stages.add_argument('--reports-dir', default='reports', help="Output directory of the reports stage")
+    stages.add_argument('--force', action='store_true', help="Regenerate county reports even if inputs are unchanged")
+    stages.add_argument('--resamples', type=int, default=DEFAULT_RESAMPLES,
+                        help="Bootstrap resamples for the uncertainty stage")
+    stages.add_argument('--seed', type=int, default=0, help="Seed for the uncertainty stage (results are reproducible)")
+    stages.add_argument('--horizon', type=int, default=1, help="Forecast stage: years to project ahead")
+    stages.add_argument('--forecast-model', choices=MODELS, default=DEFAULT_MODEL,
+                        help="Forecast stage: linear (constant yearly change) or growth (constant growth rate)")
+    stages.add_argument('--holdout', type=int, default=1, help="Forecast stage: latest years held out for the backtest")
+    stages.add_argument('--strict', action='store_true', help="Exit with status 1 if validation finds errors")
+    stages.add_argument('--changed-only', action='store_true',
+                        help="Skip stages whose source sheets are unchanged since the last run (by content fingerprint)")
+    stages.add_argument('--incremental', metavar='DIR', help="Persist per-year trend metrics in DIR and only compute new years")
+
+    outputs = analyze.add_argument_group('outputs')
+    outputs.add_argument('--output-dir', default='.', help="Directory for rendered charts")
+    outputs.add_argument('--format', dest='formats', action='append', choices=['png', 'svg', 'pdf', 'jpg'],
+                         help="Chart output format (repeatable, default: png)")
+    outputs.add_argument('--dpi', type=int, default=DEFAULT_DPI, help="Resolution for raster chart formats")
+    outputs.add_argument('--render-workers', type=int, default=None, help="Processes used to render charts")
+    outputs.add_argument('--plotlyjs', choices=['inline', 'cdn'], default='inline',
+                         help="Dashboard stage: inline plotly.js for a fully offline page (default) "
+                              "or load it from the CDN for a smaller file")
+    outputs.add_argument('--store', metavar='PATH', help="Store stage: SQLite database path (default: <output-dir>/kcse.sqlite)")
+    outputs.add_argument('--publish-to', metavar='TARGET', action='append',
+                         help="Publish stage: directory or fake-objstore://DIR to write every artefact to "
+                              "(repeatable, default: <output-dir>/publish)")
+    outputs.add_argument('--publish-concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                         help="Publish stage: artefacts encoded and written at once")
+    outputs.add_argument('--show', action='store_true', help="Open charts in an interactive window after saving")
+
+    profiling = analyze.add_argument_group('profiling')
+    profiling.add_argument('--run-report', metavar='PATH', help="Write stage timings/memory as JSON to PATH")
+    profiling.add_argument('--trace-memory', action='store_true', help="Record tracemalloc allocation deltas per stage")
+    profiling.add_argument('--profile-stage', metavar='STAGE', help="Dump a cProfile of one stage (e.g. load, render_charts)")
+    profiling.add_argument('--profile-path', metavar='PATH', help="Where to write the cProfile dump")
+
+    serve = commands.add_parser('serve', help="Serve participation metrics as a local JSON API")
+    build_server_parser(serve)
+
+    query = commands.add_parser('query', help="Run SQL against the SQLite store written by the store stage")
+    build_query_parser(query)
+    return parser
+
+
+def run_analyze(args):
+    only, reports_dir = args.only, args.reports_dir
+    if args.county_reports:
+        only, reports_dir = ['reports'], args.county_reports
+    stages = KCSEAnalyzerImproved.select_stages(only, args.skip)
+    if not stages:
+        print("Nothing to do: every stage was skipped", file=sys.stderr)
+        return 2
+
+    if 'dashboard' in stages and args.plotlyjs == 'inline' and not plotly_available():
+        print(PLOTLY_MISSING, file=sys.stderr)
+        return 2
+
+    try:
+        publish_to = [target_from_uri(uri) for uri in args.publish_to] if args.publish_to else None
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+
+    sources = {key: getattr(args, option) for option, key in SOURCE_OPTIONS.items()
+               if getattr(args, option)}
+    recorder = StageRecorder(trace_memory=args.trace_memory, profile_stage=args.profile_stage,
+                             profile_path=args.profile_path)
+    analyzer = KCSEAnalyzerImproved(data_dir=args.data_dir, use_cache=not args.no_cache,
+                                    cache_dir=args.cache_dir, load_workers=args.workers,
+                                    output_dir=args.output_dir, chart_formats=args.formats or DEFAULT_FORMATS,
+                                    dpi=args.dpi, render_workers=args.render_workers, show_charts=args.show,
+                                    trend_state_dir=args.incremental, recorder=recorder, sources=sources)
+    if args.candidates:
+        analyzer.ingest_candidate_extracts(args.candidates, batch_size=args.batch_size)
+    analyzer.run_comprehensive_analysis(stages, reports_dir=reports_dir, force_reports=args.force,
+                                        n_resamples=args.resamples, seed=args.seed, plotlyjs=args.plotlyjs,
+                                        store_path=args.store, changed_only=args.changed_only,
+                                        publish_to=publish_to, publish_concurrency=args.publish_concurrency,
+                                        horizon=args.horizon, forecast_model=args.forecast_model,
+                                        holdout=args.holdout)
+    if args.run_report:
+        recorder.write_report(args.run_report)
+    validation = analyzer.derived.get('validation')
+    if args.strict and validation is not None and validation.errors:
+        print(f"Validation failed with {validation.errors} error(s)", file=sys.stderr)
+        return 1
+    return 0
+
+
+COMMANDS = {'analyze': run_analyze, 'serve': run_server, 'query': run_query}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sys.exit(COMMANDS[args.command](args))
+
+
+if __name__ == "__main__":
+    main()
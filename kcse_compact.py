@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+KCSE Frame Compaction
+Shrinks every cleaned frame before it is cached or analysed: integer counts and codes are
+downcast to the smallest signed type that holds them (signed, so differences such as
+year-over-year changes cannot wrap), and text labels (county, region, gender, age band)
+become categoricals. The report compares each frame with the same rows held as
+int64 / object columns, the layout the workbooks load into.
+"""
+
+import pandas as pd
+
+
+def compact_frame(df):
+    """Downcast integer columns and categorise text columns; returns a new frame"""
+    columns = {}
+    for name, series in df.items():
+        kind = series.dtype.kind
+        if kind in 'iu':
+            columns[name] = pd.to_numeric(series, downcast='integer')
+        elif kind == 'O' or series.dtype == 'string':
+            columns[name] = series.astype(object).astype('category')
+        else:
+            columns[name] = series
+    return pd.DataFrame(columns, index=df.index)
+
+
+def loose_bytes(df):
+    """Deep memory of df with categoricals as object and integers as int64"""
+    loose = {}
+    for name, series in df.items():
+        if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == 'string':
+            loose[name] = series.astype(object)
+        elif series.dtype.kind in 'iu':
+            loose[name] = series.astype('int64')
+        else:
+            loose[name] = series
+    return int(pd.DataFrame(loose, index=df.index).memory_usage(deep=True).sum())
+
+
+def compaction_report(frames):
+    """Print bytes before/after per cleaned frame; returns {name: (loose, compact)}"""
+    sizes = {name: (loose_bytes(df), int(df.memory_usage(deep=True).sum())) for name, df in frames.items()}
+    if not sizes:
+        return sizes
+    print("\n🗜️ CLEANED DATA FOOTPRINT (int64/object -> compact):")
+    for name, (loose, compact) in sizes.items():
+        print(f"{name:<16} {loose / 1024:8.1f} KB -> {compact / 1024:7.1f} KB "
+              f"(saved {(loose - compact) / 1024:.1f} KB, {1 - compact / loose:.0%})")
+    loose = sum(size[0] for size in sizes.values())
+    compact = sum(size[1] for size in sizes.values())
+    print(f"{'total':<16} {loose / 1024:8.1f} KB -> {compact / 1024:7.1f} KB "
+          f"(saved {(loose - compact) / 1024:.1f} KB, {1 - compact / loose:.0%})")
+    return sizes
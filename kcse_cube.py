@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+KCSE Participation Cube
+Materialises county, region and national rollups of the fact table (gender x age band x year)
+into dense NumPy arrays with label indexes, so slice queries are array lookups instead of
+pandas groupbys recomputed on every run.
+"""
+
+import numpy as np
+import pandas as pd
+
+from kcse_tidy import ALL
+
+
+class ParticipationCube:
+    def __init__(self, facts):
+        """Build the cube from a county_facts table (see kcse_tidy.build_fact_table)"""
+        self.counties = list(facts['county'].cat.categories)
+        self.regions = list(facts['region'].cat.categories)
+        self.genders = list(facts['gender'].cat.categories)
+        self.age_bands = list(facts['age_band'].cat.categories)
+        self.years = sorted(facts['year'].unique().tolist())
+
+        self._county_index = {label: i for i, label in enumerate(self.counties)}
+        self._region_index = {label: i for i, label in enumerate(self.regions)}
+        self._gender_index = {label: i for i, label in enumerate(self.genders)}
+        self._age_index = {label: i for i, label in enumerate(self.age_bands)}
+        self._year_index = {year: i for i, year in enumerate(self.years)}
+
+        # county x gender x age band x year; NaN where the source has no such breakdown
+        shape = (len(self.counties), len(self.genders), len(self.age_bands), len(self.years))
+        county = np.full(shape, np.nan)
+        year_codes = np.searchsorted(self.years, facts['year'].to_numpy())
+        county[facts['county'].cat.codes.to_numpy(), facts['gender'].cat.codes.to_numpy(),
+               facts['age_band'].cat.codes.to_numpy(), year_codes] = facts['candidates'].to_numpy()
+
+        # Fill the All/All cell from the gender breakdown where the source did not provide it
+        g_all, a_all = self._gender_index[ALL], self._age_index[ALL]
+        genders = [i for label, i in self._gender_index.items() if label != ALL]
+        by_gender = county[:, genders, a_all, :]
+        missing = np.isnan(county[:, g_all, a_all, :])
+        totals = np.where(np.isnan(by_gender).all(axis=1), np.nan, np.nansum(by_gender, axis=1))
+        county[:, g_all, a_all, :] = np.where(missing, totals, county[:, g_all, a_all, :])
+        self.county = county
+
+        # Region and national rollups are sums over counties (NaN only where every county is NaN)
+        county_region = (facts.drop_duplicates('county')
+                         .set_index('county')['region'].cat.codes
+                         .reindex(self.counties).fillna(-1).to_numpy(dtype=int))
+        self.county_region = county_region  # region code per county, -1 if unassigned
+        assigned = np.flatnonzero(county_region >= 0)
+        membership = np.zeros((len(self.regions), len(self.counties)))
+        membership[county_region[assigned], assigned] = 1
+        present = ~np.isnan(county)
+        self.region = np.tensordot(membership, np.nan_to_num(county), axes=1)
+        self.region[np.tensordot(membership, present, axes=1) == 0] = np.nan
+        self.national = np.nansum(county, axis=0)
+        self.national[~present.any(axis=0)] = np.nan
+
+    def query(self, county=None, region=None, gender=ALL, age_band=ALL, year=None):
+        """Candidates for one slice; returns a float, or an array over self.years when year is None"""
+        g = self._gender_index[gender]
+        a = self._age_index[age_band]
+        if county is not None:
+            series = self.county[self._county_index[county], g, a]
+        elif region is not None:
+            series = self.region[self._region_index[region], g, a]
+        else:
+            series = self.national[g, a]
+        if year is None:
+            return series
+        return float(series[self._year_index[year]])
+
+    def by_county(self, gender=ALL, age_band=ALL, year=None):
+        """All counties for one gender/age band as a Series (or year x county frame when year is None)"""
+        block = self.county[:, self._gender_index[gender], self._age_index[age_band]]
+        if year is None:
+            return pd.DataFrame(block.T, index=self.years, columns=self.counties)
+        return pd.Series(block[:, self._year_index[year]], index=self.counties)
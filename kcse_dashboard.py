@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+KCSE Interactive Dashboard
+Writes one self-contained HTML dashboard (national trends, gender gap, county and region
+breakdowns by year / gender / age band) in place of the static PNGs. The page ships
+pre-aggregated data only: the participation cube and trend metrics as base64 little-endian
+typed arrays, with every label stored once, and the browser builds the Plotly traces from it.
+"""
+
+import base64
+import importlib.util
+import json
+import numpy as np
+from pathlib import Path
+
+DASHBOARD_NAME = 'kcse_dashboard.html'
+PLOTLY_CDN = 'https://cdn.plot.ly/plotly-2.35.2.min.js'
+PLOTLY_MISSING = "inlining plotly.js needs the plotly package: pip install plotly, or pass --plotlyjs cdn"
+TREND_COLUMNS = ['Total_Participation_Rate', 'Female_Participation_Rate', 'Male_Participation_Rate',
+                 'Gender_Gap', 'Total_Sat', 'Female_Sat', 'Male_Sat', 'YoY_Sat_Growth']
+STATS_COLUMNS = ['female_share', 'gpi', 'trend_pct_per_year', 'trend_p_value']
+
+
+def encode_array(values, dtype='<f4'):
+    """Column payload: dtype, shape and base64 bytes of a little-endian typed array"""
+    arr = np.ascontiguousarray(np.asarray(values, dtype=dtype))
+    return {'dtype': np.dtype(dtype).name, 'shape': list(arr.shape),
+            'data': base64.b64encode(arr.tobytes()).decode('ascii')}
+
+
+def build_payload(trend_metrics, cube, county_stats=None):
+    """Compact dashboard data: deduplicated labels plus typed-array columns"""
+    payload = {
+        'labels': {
+            'counties': cube.counties,
+            'regions': cube.regions,
+            'genders': cube.genders,
+            'age_bands': cube.age_bands,
+            'years': [int(y) for y in cube.years],
+        },
+        # Counts fit float32 exactly (< 2**24) and NaN marks breakdowns the source lacks
+        'county': encode_array(cube.county),
+        'county_region': encode_array(np.where(cube.county_region >= 0, cube.county_region, 255), '<u1'),
+        'trend_years': [int(y) for y in trend_metrics['Year']],
+        'trends': {col: encode_array(trend_metrics[col]) for col in TREND_COLUMNS if col in trend_metrics},
+    }
+    if county_stats is not None:
+        stats = county_stats.reindex(cube.counties)
+        payload['county_stats'] = {col: encode_array(stats[col]) for col in STATS_COLUMNS}
+        payload['county_flags'] = encode_array(stats['underperforming'].fillna(False), '<u1')
+    return payload
+
+
+def plotly_available():
+    """Whether plotly.js can be inlined (the plotly package is installed)"""
+    return importlib.util.find_spec('plotly') is not None
+
+
+def plotly_script(plotlyjs='inline'):
+    """<script> for plotly.js: inlined from the plotly package (fully offline page) or, opt-in, from the CDN"""
+    if plotlyjs == 'inline':
+        try:
+            from plotly.offline import get_plotlyjs
+        except ImportError as exc:
+            raise ImportError(PLOTLY_MISSING) from exc
+        return f'<script type="text/javascript">{get_plotlyjs()}</script>'
+    return f'<script src="{PLOTLY_CDN}" charset="utf-8"></script>'
+
+
+def write_dashboard(path, payload, plotlyjs='inline', title='KCSE Participation Dashboard'):
+    """Write the dashboard HTML; returns the path"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = json.dumps(payload, separators=(',', ':')).replace('</', '<\\/')
+    html = (DASHBOARD_TEMPLATE
+            .replace('{{title}}', title)
+            .replace('{{plotly}}', plotly_script(plotlyjs))
+            .replace('{{payload}}', data))
+    path.write_text(html, encoding='utf-8')
+    print(f"\n🌐 Interactive dashboard saved as '{path}' ({path.stat().st_size / 1024:.0f} KB, "
+          f"data payload {len(data) / 1024:.0f} KB)")
+    return path
+
+
+DASHBOARD_TEMPLATE = r"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{{title}}</title>
+{{plotly}}
+<style>
+  body { font-family: system-ui, sans-serif; margin: 0 auto; max-width: 1400px; padding: 16px; color: #222; }
+  h1 { font-size: 1.4em; }
+  .grid { display: grid; grid-template-columns: 1fr 1fr; gap: 12px; }
+  .wide { grid-column: 1 / span 2; }
+  .controls { margin: 8px 0; }
+  .controls label { margin-right: 12px; }
+</style>
+</head>
+<body>
+<h1>{{title}}</h1>
+<div class="grid">
+  <div id="rates"></div>
+  <div id="gap"></div>
+  <div id="candidates"></div>
+  <div id="growth"></div>
+  <div class="wide">
+    <div class="controls">
+      <label>Year <select id="year"></select></label>
+      <label>Gender <select id="gender"></select></label>
+      <label>Age band <select id="age"></select></label>
+    </div>
+    <div id="counties"></div>
+  </div>
+  <div id="regions"></div>
+  <div id="ages"></div>
+</div>
+<script id="kcse-data" type="application/json">{{payload}}</script>
+<script>
+(function () {
+  const payload = JSON.parse(document.getElementById('kcse-data').textContent);
+  const TYPES = {float32: Float32Array, uint8: Uint8Array, int16: Int16Array, uint32: Uint32Array};
+
+  function decode(column) {
+    const binary = atob(column.data);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+    return new TYPES[column.dtype](bytes.buffer);
+  }
+
+  const L = payload.labels;
+  const cube = decode(payload.county);
+  const [C, G, A, Y] = payload.county.shape;
+  const cell = (c, g, a, y) => cube[((c * G + g) * A + a) * Y + y];
+  const countyRegion = decode(payload.county_region);
+  const ALL_G = L.genders.indexOf('All'), ALL_A = L.age_bands.indexOf('All');
+  const trends = {};
+  for (const name in payload.trends) trends[name] = Array.from(decode(payload.trends[name]));
+  const years = payload.trend_years;
+  const layout = (title, extra) => Object.assign({title: title, margin: {t: 40, r: 10, l: 60, b: 40}, height: 360}, extra || {});
+
+  Plotly.newPlot('rates', ['Total', 'Female', 'Male'].map(g => ({
+    x: years, y: trends[g + '_Participation_Rate'], name: g, mode: 'lines+markers'})),
+    layout('Participation rate (% of registered who sat)'));
+  Plotly.newPlot('gap', [{x: years, y: trends.Gender_Gap, type: 'bar',
+    marker: {color: trends.Gender_Gap.map(v => v >= 0 ? '#d6604d' : '#4393c3')}}],
+    layout('Gender gap (Female - Male, pp)'));
+  Plotly.newPlot('candidates', ['Female', 'Male'].map(g => ({
+    x: years, y: trends[g + '_Sat'], name: g, type: 'bar'})),
+    layout('Candidates who sat', {barmode: 'stack'}));
+  Plotly.newPlot('growth', [{x: years, y: trends.YoY_Sat_Growth, mode: 'lines+markers', name: 'YoY growth'}],
+    layout('Year-over-year growth in candidates (%)'));
+
+  function fill(select, labels, initial) {
+    labels.forEach((label, i) => select.add(new Option(label, i)));
+    select.value = initial;
+  }
+  const yearSel = document.getElementById('year'), genderSel = document.getElementById('gender'),
+        ageSel = document.getElementById('age');
+  fill(yearSel, L.years.map(String), Y - 1);
+  fill(genderSel, L.genders, ALL_G);
+  fill(ageSel, L.age_bands, ALL_A);
+
+  const flags = payload.county_flags ? decode(payload.county_flags) : null;
+  const gpi = payload.county_stats ? decode(payload.county_stats.gpi) : null;
+
+  function drawBreakdowns() {
+    const y = +yearSel.value, g = +genderSel.value, a = +ageSel.value;
+    const rows = [];
+    for (let c = 0; c < C; c++) {
+      const v = cell(c, g, a, y);
+      if (!Number.isNaN(v)) rows.push({c: c, v: v});
+    }
+    rows.sort((p, q) => q.v - p.v);
+    Plotly.react('counties', [{
+      x: rows.map(r => L.counties[r.c]), y: rows.map(r => r.v), type: 'bar',
+      marker: {color: rows.map(r => countyRegion[r.c]), colorscale: 'Portland',
+               line: {color: rows.map(r => flags && flags[r.c] ? '#000' : 'rgba(0,0,0,0)'), width: 2}},
+      text: rows.map(r => (countyRegion[r.c] < L.regions.length ? L.regions[countyRegion[r.c]] : '') +
+                          (gpi ? ' · GPI ' + gpi[r.c].toFixed(3) : '') + (flags && flags[r.c] ? ' · flagged' : '')),
+      hovertemplate: '%{x}: %{y:,}<br>%{text}<extra></extra>'}],
+      layout('Candidates by county — ' + L.years[y] + ', ' + L.genders[g] + ', age ' + L.age_bands[a] +
+             ' (outlined: flagged as underperforming)', {height: 420, xaxis: {tickangle: -60}}));
+
+    Plotly.react('regions', L.genders.filter((_, i) => i !== ALL_G).map(gender => {
+      const gi = L.genders.indexOf(gender);
+      const totals = L.regions.map(() => 0);
+      for (let c = 0; c < C; c++) {
+        const v = cell(c, gi, ALL_A, y);
+        if (countyRegion[c] < L.regions.length && !Number.isNaN(v)) totals[countyRegion[c]] += v;
+      }
+      return {x: L.regions, y: totals, name: gender, type: 'bar'};
+    }), layout('Candidates by region and gender — ' + L.years[y], {barmode: 'group'}));
+
+    Plotly.react('ages', L.age_bands.filter((_, i) => i !== ALL_A).map(band => {
+      const ai = L.age_bands.indexOf(band);
+      return {x: L.years, name: band, type: 'bar', y: L.years.map((_, yi) => {
+        let total = 0, seen = false;
+        for (let c = 0; c < C; c++) {
+          const v = cell(c, ALL_G, ai, yi);
+          if (!Number.isNaN(v)) { total += v; seen = true; }
+        }
+        return seen ? total : null;
+      })};
+    }), layout('Age distribution of candidates (all counties)', {barmode: 'stack'}));
+  }
+  [yearSel, genderSel, ageSel].forEach(s => s.addEventListener('change', drawBreakdowns));
+  drawBreakdowns();
+})();
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+KCSE Release Fingerprints
+Content fingerprints of every cleaned sheet, split into blocks (one per county and year, one
+per national year, one per reference row), so a republished workbook can be compared with the
+last run cell by cell. Block hashes are combined from vectorised row hashes; the values are
+kept alongside so the diff can show old and new counts for the data-quality report.
+"""
+
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from kcse_schema import REFERENCE_SHEETS
+
+# Bump when block definitions or the state layout change so the next run records a fresh baseline
+FINGERPRINT_VERSION = 2
+STATE_NAME = 'fingerprints.json'
+CHANGES_NAME = 'kcse_source_changes.csv'
+CHANGE_COLUMNS = ['dataset', 'block', 'label', 'year', 'field', 'old', 'new', 'change']
+
+
+def source_key(dataset):
+    """The SOURCE_FILES key a fingerprinted dataset is loaded from"""
+    return 'reference' if dataset in REFERENCE_SHEETS else dataset
+
+
+def long_values(dataset, df):
+    """One row per cell: block id, label, year, field and value"""
+    if dataset == 'time_series':
+        long = df.melt(id_vars='Year', var_name='field', value_name='value')
+        long['block'] = long['Year'].astype(str)
+        long['label'] = 'National'
+        long['year'] = long['Year']
+    elif dataset in ('county_gender', 'county_age'):
+        long = df.melt(id_vars=['County_Code', 'County'], var_name='column', value_name='value')
+        parts = long['column'].str.extract(r'^(?P<field>.+)_(?P<year>\d{4})$')
+        long['field'] = parts['field']
+        long['year'] = parts['year'].astype(int)
+        long['block'] = long['County_Code'].astype(str) + '/' + parts['year']
+        long['label'] = long['County'].astype(str)
+    else:
+        key = df.columns[0]
+        long = df.astype({col: object for col in df.columns[1:]}).melt(id_vars=key, var_name='field',
+                                                                          value_name='value')
+        long['block'] = long[key].astype(str)
+        long['label'] = long['block']
+        long['year'] = None
+    return long[['block', 'label', 'year', 'field', 'value']]
+
+
+def fingerprint_frame(dataset, df):
+    """Sheet hash plus {block: {label, year, hash, values}} for one cleaned frame"""
+    long = long_values(dataset, df).sort_values(['block', 'field'], kind='stable', ignore_index=True)
+    row_hashes = pd.util.hash_pandas_object(long[['block', 'field', 'value']].astype(str),
+                                            index=False).to_numpy()
+    codes, blocks = pd.factorize(long['block'], sort=True)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    # Rows are sorted by block, so one reduceat pass sums (mod 2**64) each block's row hashes
+    block_hashes = np.add.reduceat(row_hashes, starts)
+
+    first = long.iloc[starts]
+    fields = long.groupby('block', sort=True)['field'].agg(list)
+    values = long.groupby('block', sort=True)['value'].agg(list)
+    state = {}
+    for i, block in enumerate(blocks):
+        year = first['year'].iloc[i]
+        state[block] = {
+            'label': first['label'].iloc[i],
+            'year': None if year is None or pd.isna(year) else int(year),
+            'hash': f'{block_hashes[i]:016x}',
+            'values': dict(zip(fields[block], [v.item() if hasattr(v, 'item') else v for v in values[block]])),
+        }
+    digest = hashlib.sha256(json.dumps([dataset, list(map(str, df.columns))]).encode())
+    digest.update(block_hashes.tobytes())
+    return {'sheet': digest.hexdigest(), 'blocks': state}
+
+
+def fingerprint_datasets(frames):
+    """Fingerprints of every cleaned frame in frames ({dataset: DataFrame})"""
+    return {dataset: fingerprint_frame(dataset, df) for dataset, df in frames.items()}
+
+
+def diff_fingerprints(old, new):
+    """Compare two fingerprint sets: (status per dataset, DataFrame of changed cells)"""
+    status, rows = {}, []
+    for dataset in list(new) + [name for name in old if name not in new]:
+        before, after = old.get(dataset), new.get(dataset)
+        if before is None:
+            status[dataset] = 'added'
+            continue
+        if after is None:
+            status[dataset] = 'removed'
+            continue
+        if before['sheet'] == after['sheet']:
+            status[dataset] = 'unchanged'
+            continue
+        status[dataset] = 'changed'
+        for block in sorted(set(before['blocks']) | set(after['blocks'])):
+            b, a = before['blocks'].get(block), after['blocks'].get(block)
+            if b is not None and a is not None and b['hash'] == a['hash']:
+                continue
+            info = a or b
+            b_values = b['values'] if b else {}
+            a_values = a['values'] if a else {}
+            for field in dict.fromkeys(list(b_values) + list(a_values)):
+                old_value, new_value = b_values.get(field), a_values.get(field)
+                if old_value == new_value:
+                    continue
+                change = (new_value - old_value if isinstance(old_value, (int, float))
+                          and isinstance(new_value, (int, float)) else None)
+                rows.append([dataset, block, info['label'], info['year'], field, old_value, new_value, change])
+    return status, pd.DataFrame(rows, columns=CHANGE_COLUMNS)
+
+
+class FingerprintState:
+    """Fingerprints recorded by the last run, kept as JSON in the cache directory, plus the
+    sheet hashes each analysis stage last ran against"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def _read(self):
+        if not self.path.exists():
+            return None
+        try:
+            state = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return None
+        if state.get('version') != FINGERPRINT_VERSION:
+            return None
+        return state
+
+    def load(self):
+        state = self._read()
+        return None if state is None else state['datasets']
+
+    def load_stages(self):
+        """{stage: {dataset: sheet hash}} as of each stage's last successful run"""
+        state = self._read()
+        return {} if state is None else state['stages']
+
+    def save(self, datasets, stages):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        tmp_path.write_text(json.dumps({'version': FINGERPRINT_VERSION, 'datasets': datasets, 'stages': stages}))
+        tmp_path.replace(self.path)
+
+
+def print_change_report(status, changes, limit=20):
+    """Summarise which sheets and county/year blocks changed, with old and new values"""
+    print("\n" + "="*60)
+    print("SOURCE RELEASE CHANGES")
+    print("="*60)
+    for dataset, state in status.items():
+        marker = {'unchanged': '✓', 'changed': '⚠️', 'added': '＋', 'removed': '－'}[state]
+        blocks = changes.loc[changes['dataset'] == dataset, 'block'].nunique()
+        detail = f" ({blocks} blocks, {int((changes['dataset'] == dataset).sum())} cells)" if state == 'changed' else ''
+        print(f"{marker} {dataset}: {state}{detail}")
+    if len(changes):
+        print(f"\n🔎 CHANGED CELLS (first {min(limit, len(changes))} of {len(changes)}):")
+        for row in changes.head(limit).itertuples():
+            year = f" {row.year}" if row.year is not None and not pd.isna(row.year) else ''
+            print(f"  {row.dataset}: {row.label}{year} {row.field}: {row.old} -> {row.new}")
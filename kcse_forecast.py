@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+KCSE Candidature Forecasts
+Next-year candidate projections for every county x gender x age-band series at once. Each model
+is a least-squares fit on the year: 'linear' (constant yearly change) or 'growth' (log-linear,
+constant growth rate). All series are fitted together from one stack of per-series normal
+equations solved by np.linalg.solve, with NaN years masked out per series, so the cost is a
+few array passes however many series (counties, sub-counties, schools) there are. Forecasts
+carry Student-t prediction intervals, and backtest() refits on all but the last years and
+scores the held-out forecasts against a naive last-value forecast. A series needs two
+observed years for a point forecast and three for an interval.
+"""
+
+import numpy as np
+import pandas as pd
+
+from kcse_stats import t_critical
+from kcse_tidy import ALL
+
+FORECAST_NAME = 'kcse_forecasts.csv'
+DEFAULT_MODEL = 'linear'
+MODELS = ('linear', 'growth')
+DEGREE = 1  # straight line in the (possibly log) year scale
+MIN_YEARS = DEGREE + 1  # enough for a point forecast; intervals need one more year
+
+
+class TrendFit:
+    """Least-squares trend fitted to every row of a series x years array"""
+
+    def __init__(self, values, years, model=DEFAULT_MODEL):
+        if model not in MODELS:
+            raise ValueError(f"unknown forecast model {model!r} (expected one of {', '.join(MODELS)})")
+        self.model = model
+        self.years = np.asarray(years, dtype=float)
+        self.origin = self.years.mean()  # centred years keep the normal equations well conditioned
+        y = np.asarray(values, dtype=float)
+        if model == 'growth':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                y = np.where(y > 0, np.log(y), np.nan)
+
+        present = ~np.isnan(y)
+        X = self.design(self.years)
+        self.n = present.sum(axis=1)
+        self.df = self.n - X.shape[1]
+        # Per-series normal equations: X' W X and X' W y with W masking each series' missing years
+        xtx = np.einsum('st,tp,tq->spq', present.astype(float), X, X)
+        xty = np.einsum('st,tp->sp', np.where(present, y, 0.0), X)
+        self.valid = (self.df >= 0) & (np.abs(np.linalg.det(xtx)) > 1e-9)
+        xtx[~self.valid] = np.eye(X.shape[1])
+        self.xtx_inv = np.linalg.inv(xtx)
+        self.coef = np.linalg.solve(xtx, xty[..., None])[..., 0]
+        residuals = np.where(present, y - self.coef @ X.T, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # An exact fit (no residual degrees of freedom) gets a point forecast but no interval
+            self.sigma2 = np.where(self.valid & (self.df >= 1), (residuals**2).sum(axis=1) / self.df, np.nan)
+        self.coef[~self.valid] = np.nan
+
+    def design(self, years):
+        """Polynomial design matrix (years x DEGREE + 1) in centred years"""
+        return np.vander(np.asarray(years, dtype=float) - self.origin, DEGREE + 1, increasing=True)
+
+    @property
+    def slope(self):
+        """Candidates per year (linear) or continuous growth rate per year (growth)"""
+        return self.coef[:, 1]
+
+    def predict(self, years, confidence=0.95):
+        """(point, lower, upper) arrays of shape series x years, clipped at zero candidates;
+        the bounds are NaN for series fitted without residual degrees of freedom"""
+        X0 = self.design(years)
+        point = self.coef @ X0.T
+        leverage = np.einsum('hp,spq,hq->sh', X0, self.xtx_inv, X0)
+        half = t_critical(self.df, confidence)[:, None] * np.sqrt(self.sigma2[:, None] * (1 + leverage))
+        lower, upper = point - half, point + half
+        if self.model == 'growth':
+            return np.exp(point), np.exp(lower), np.exp(upper)
+        return np.maximum(point, 0), np.maximum(lower, 0), np.maximum(upper, 0)
+
+
+def cube_series(cube, min_years=MIN_YEARS):
+    """(values, labels): every county x gender x age-band cell of the cube with min_years of data"""
+    values = cube.county.reshape(-1, len(cube.years))
+    keep = np.flatnonzero((~np.isnan(values)).sum(axis=1) >= min_years)
+    county, gender, age = np.unravel_index(keep, cube.county.shape[:3])
+    labels = pd.DataFrame({
+        'county': pd.Categorical.from_codes(county, cube.counties),
+        'gender': pd.Categorical.from_codes(gender, cube.genders),
+        'age_band': pd.Categorical.from_codes(age, cube.age_bands),
+    })
+    return values[keep], labels
+
+
+def _last_observed(values):
+    """Column index and value of each row's last non-NaN entry"""
+    observed = ~np.isnan(values)
+    index = values.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1)
+    return index, values[np.arange(len(values)), index]
+
+
+def _long(labels, years, **columns):
+    """One row per (series, year) for series x years arrays"""
+    frame = labels.loc[labels.index.repeat(len(years))].reset_index(drop=True)
+    frame['year'] = np.tile(np.asarray(years, dtype=int), len(labels))
+    for name, values in columns.items():
+        frame[name] = np.asarray(values).ravel()
+    return frame
+
+
+def forecast_series(values, years, labels, horizon=1, model=DEFAULT_MODEL, confidence=0.95):
+    """Point forecasts with prediction intervals for the horizon years after years[-1]"""
+    fit = TrendFit(values, years, model)
+    targets = np.arange(int(years[-1]) + 1, int(years[-1]) + 1 + horizon)
+    point, lower, upper = fit.predict(targets, confidence)
+    last_index, last = _last_observed(values)
+    frame = _long(labels, targets, forecast=point, lower=lower, upper=upper,
+                  last_year=np.repeat(np.asarray(years, dtype=int)[last_index], horizon),
+                  last_actual=np.repeat(last, horizon))
+    frame['model'] = model
+    frame['n_years'] = np.repeat(fit.n, horizon)
+    return frame[fit.valid.repeat(horizon)].reset_index(drop=True)
+
+
+def forecast_national(values, years, labels, horizon=1, model=DEFAULT_MODEL, confidence=0.95):
+    """Forecast of the national total, fitted to the summed county totals: county prediction
+    intervals do not add up to an interval for their sum, so the aggregate gets its own fit"""
+    totals = ((labels['gender'] == ALL) & (labels['age_band'] == ALL)).to_numpy()
+    # A year missing for any county stays missing; with no county totals at all, every year is
+    national = values[totals].sum(axis=0, keepdims=True) if totals.any() else np.full((1, len(years)), np.nan)
+    label = pd.DataFrame({'county': ['National'], 'gender': [ALL], 'age_band': [ALL]})
+    return forecast_series(national, years, label, horizon, model, confidence)
+
+
+def backtest(values, years, labels, holdout=1, model=DEFAULT_MODEL, confidence=0.95):
+    """Refit on all but the last holdout years and score forecasts of those years.
+
+    Returns (per series and held-out year errors, summary dict with MAE, MAPE, interval
+    coverage and the naive last-value forecast's MAE/MAPE for comparison).
+    """
+    years = np.asarray(years)
+    if holdout < 1 or len(years) - holdout < MIN_YEARS:
+        raise ValueError(f"backtesting {holdout} year(s) needs at least {MIN_YEARS + holdout} years, "
+                         f"have {len(years)}")
+    train, actual = values[:, :-holdout], values[:, -holdout:]
+    fit = TrendFit(train, years[:-holdout], model)
+    point, lower, upper = fit.predict(years[-holdout:], confidence)
+    # Naive baseline: the last observed training value carried forward
+    naive = np.repeat(_last_observed(train)[1][:, None], holdout, axis=1)
+
+    scored = fit.valid[:, None] & ~np.isnan(actual) & (actual > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        errors = _long(labels, years[-holdout:], actual=actual, forecast=point, lower=lower, upper=upper,
+                       error=point - actual, pct_error=(point - actual) / actual * 100,
+                       covered=(lower <= actual) & (actual <= upper), naive_error=naive - actual)
+    errors = errors[scored.ravel()].reset_index(drop=True)
+    with_interval = errors['lower'].notna()
+    summary = {
+        'model': model,
+        'holdout_years': [int(y) for y in years[-holdout:]],
+        'train_years': len(years) - holdout,
+        'series': int(scored.any(axis=1).sum()),
+        'mae': float(errors['error'].abs().mean()),
+        'mape': float(errors['pct_error'].abs().mean()),
+        'median_ape': float(errors['pct_error'].abs().median()),
+        # None when no series had enough training years for an interval (residual df < 1)
+        'coverage': float(errors.loc[with_interval, 'covered'].mean()) if with_interval.any() else None,
+        'confidence': confidence,
+        'naive_mae': float(errors['naive_error'].abs().mean()),
+        'naive_mape': float((errors['naive_error'] / errors['actual'] * 100).abs().mean()),
+    }
+    return errors, summary
+
+
+def print_forecast_report(forecasts, backtests, national=None, limit=5):
+    print("\n" + "="*60)
+    if forecasts.empty:
+        print(f"CANDIDATURE FORECASTS: no forecastable series (each needs {MIN_YEARS} observed years)")
+        print("="*60)
+        return
+    years = sorted(forecasts['year'].unique())
+    print(f"CANDIDATURE FORECASTS ({len(forecasts):,} series-years, {years[0]}-{years[-1]})")
+    print("="*60)
+    totals = forecasts[(forecasts['gender'] == ALL) & (forecasts['age_band'] == ALL)]
+    national = national.set_index('year') if national is not None else pd.DataFrame()
+    for year, rows in totals.groupby('year'):
+        line = f"📈 {year}: county forecasts sum to {rows['forecast'].sum():,.0f} across {len(rows)} counties"
+        if year in national.index:
+            row = national.loc[year]
+            bounds = (f"prediction interval {row['lower']:,.0f}-{row['upper']:,.0f}" if pd.notna(row['lower'])
+                      else "no interval: too few years")
+            line += f"; national total fitted on its own: {row['forecast']:,.0f} ({bounds})"
+        print(line)
+    first = totals[totals['year'] == years[0]].copy()
+    first['change'] = (first['forecast'] / first['last_actual'] - 1) * 100
+    for title, picked in (("Largest projected increases", first.nlargest(limit, 'change')),
+                          ("Largest projected decreases", first.nsmallest(limit, 'change'))):
+        print(f"\n{title} ({years[0]}):")
+        for row in picked.itertuples():
+            bounds = f", {row.lower:,.0f}-{row.upper:,.0f}" if pd.notna(row.lower) else ''
+            print(f"  {row.county}: {row.last_actual:,.0f} -> {row.forecast:,.0f} ({row.change:+.1f}%{bounds})")
+    for summary in backtests:
+        if pd.notna(summary['coverage']):
+            coverage = f"{summary['confidence']:.0%} interval coverage {summary['coverage']:.0%}"
+        else:
+            coverage = (f"interval coverage not tested: {summary['train_years']} training years leave "
+                        f"no residual degrees of freedom")
+        print(f"\n🔁 BACKTEST ({summary['model']}, held out {summary['holdout_years']}, {summary['series']} series): "
+              f"MAE {summary['mae']:,.0f}, MAPE {summary['mape']:.1f}% (median {summary['median_ape']:.1f}%), "
+              f"{coverage}; naive last value MAE {summary['naive_mae']:,.0f}, MAPE {summary['naive_mape']:.1f}%")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+KCSE Incremental Trends
+Per-year trend metrics (participation rates, gender gap, year-over-year change) with running
+aggregates. When a new KNEC release appends a year, only the new rows are computed and the
+means and first/last growth figures are updated in O(1) instead of recomputing the full series.
+Every stored year's input row is fingerprinted, so a republished release that corrects an
+earlier year triggers a full rebuild instead of keeping stale metrics.
+"""
+
+import json
+import pandas as pd
+from pathlib import Path
+
+from kcse_fingerprint import fingerprint_frame
+
+RATE_COLUMNS = ['Total_Participation_Rate', 'Female_Participation_Rate', 'Male_Participation_Rate', 'Gender_Gap']
+INPUT_COLUMNS = ['Year', 'Total_Registered', 'Total_Sat', 'Female_Registered', 'Female_Sat',
+                 'Male_Registered', 'Male_Sat']
+# Bump when the metric definitions change so persisted state is rebuilt
+STATE_VERSION = 2
+
+
+def compute_trend_rows(df, previous=None):
+    """Add rate, gap and year-over-year columns to rows sorted by Year.
+
+    previous is the last already-computed row (a dict), used for the first row's YoY change.
+    """
+    df = df.copy()
+    df['Total_Participation_Rate'] = (df['Total_Sat'] / df['Total_Registered']) * 100
+    df['Female_Participation_Rate'] = (df['Female_Sat'] / df['Female_Registered']) * 100
+    df['Male_Participation_Rate'] = (df['Male_Sat'] / df['Male_Registered']) * 100
+    df['Gender_Gap'] = df['Female_Participation_Rate'] - df['Male_Participation_Rate']
+
+    prior_sat = df['Total_Sat'].shift(1).astype(float)
+    if previous is not None and len(df):
+        prior_sat.iloc[0] = previous['Total_Sat']
+    df['YoY_Sat_Change'] = df['Total_Sat'] - prior_sat
+    df['YoY_Sat_Growth'] = (df['Total_Sat'] / prior_sat - 1) * 100
+    return df
+
+
+class TrendAccumulator:
+    """Running per-year trend metrics; optionally persisted to a state directory"""
+
+    def __init__(self, state_dir=None):
+        self.state_dir = Path(state_dir) if state_dir else None
+        self.reset()
+        if self.state_dir is not None:
+            self._load_state()
+
+    def reset(self):
+        self.count = 0
+        self.sums = {col: 0.0 for col in RATE_COLUMNS}
+        self.first = None
+        self.last = None
+        self._rows = []
+        self.appended_years = []
+        self.row_hashes = {}
+
+    @property
+    def _rows_path(self):
+        return self.state_dir / 'trend_rows.csv'
+
+    @property
+    def _state_path(self):
+        return self.state_dir / 'trend_state.json'
+
+    def _load_state(self):
+        if not self._state_path.exists():
+            return
+        state = json.loads(self._state_path.read_text())
+        if state.get('version') != STATE_VERSION:
+            return
+        self.count = state['count']
+        self.sums = state['sums']
+        self.first = state['first']
+        self.last = state['last']
+        self.row_hashes = state['row_hashes']
+
+    def _save_state(self, new_rows, rebuilt):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        # Rows are appended, so each release only writes its new years
+        if rebuilt or not self._rows_path.exists():
+            new_rows.to_csv(self._rows_path, index=False)
+        else:
+            new_rows.to_csv(self._rows_path, mode='a', header=False, index=False)
+        state = {'version': STATE_VERSION, 'count': self.count, 'sums': self.sums,
+                 'first': self.first, 'last': self.last, 'row_hashes': self.row_hashes}
+        self._state_path.write_text(json.dumps(state, indent=2))
+
+    @staticmethod
+    def input_hashes(df):
+        """{year: hash of that year's input row}, as the fingerprint blocks of the national series"""
+        inputs = df[INPUT_COLUMNS].astype(float).astype({'Year': int})
+        return {year: block['hash'] for year, block in fingerprint_frame('time_series', inputs)['blocks'].items()}
+
+    def _matches_state(self, df):
+        """Check that the incoming series extends the stored one: every stored year is present
+        with an identical input row"""
+        if self.last is None:
+            return False
+        known = df[df['Year'] <= self.last['Year']]
+        return len(known) == self.count and self.input_hashes(known) == self.row_hashes
+
+    def update(self, df):
+        """Fold a (possibly longer) time series in, computing only years after the last stored one"""
+        df = df.sort_values('Year')
+        rebuilt = not self._matches_state(df)
+        if rebuilt:
+            self.reset()
+            new = df
+        else:
+            self.appended_years = []
+            new = df[df['Year'] > self.last['Year']]
+
+        rows = compute_trend_rows(new, previous=self.last)
+        if len(rows):
+            self.count += len(rows)
+            for col in RATE_COLUMNS:
+                self.sums[col] += float(rows[col].sum())
+            records = rows[INPUT_COLUMNS + RATE_COLUMNS].astype(float).to_dict('records')
+            if self.first is None:
+                self.first = records[0]
+            self.last = records[-1]
+            self.appended_years = rows['Year'].astype(int).tolist()
+            self.row_hashes.update(self.input_hashes(rows))
+        self._rows.append(rows)
+        if self.state_dir is not None and (len(rows) or rebuilt):
+            self._save_state(rows, rebuilt)
+        return rows
+
+    def rows(self):
+        """The full per-year metrics frame (read back from the state directory when persisted)"""
+        if self.state_dir is not None and self._rows_path.exists():
+            return pd.read_csv(self._rows_path)
+        return pd.concat(self._rows, ignore_index=True) if self._rows else pd.DataFrame()
+
+    def summary(self):
+        """Means and first-to-last changes, straight from the running aggregates"""
+        first, last = self.first, self.last
+        return {
+            'first_year': int(first['Year']),
+            'last_year': int(last['Year']),
+            'n_years': self.count,
+            'means': {col: self.sums[col] / self.count for col in RATE_COLUMNS},
+            'rate_change': {col: last[col] - first[col] for col in RATE_COLUMNS[:3]},
+            'growth': {group: (last[f'{group}_Sat'] / first[f'{group}_Sat'] - 1) * 100
+                       for group in ('Total', 'Female', 'Male')},
+        }
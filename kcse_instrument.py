@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+KCSE Pipeline Instrumentation
+Stage-level wall time, CPU time, optional tracemalloc deltas and peaks, row counts and the
+process's peak RSS so far for the analysis pipeline, written as a machine-readable JSON run report. One stage can also be
+profiled with cProfile and dumped for inspection with pstats/snakeviz.
+"""
+
+import cProfile
+import functools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process since it started, in MB (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def count_rows(result):
+    """Row count of a stage result: a DataFrame, or a dict of DataFrames"""
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    if isinstance(result, dict):
+        frames = [value for value in result.values() if isinstance(value, pd.DataFrame)]
+        if frames:
+            return sum(len(frame) for frame in frames)
+    return None
+
+
+class StageRecorder:
+    def __init__(self, trace_memory=False, profile_stage=None, profile_path=None):
+        self.trace_memory = trace_memory
+        self.profile_stage = profile_stage
+        self.profile_path = profile_path
+        self.stages = []
+        self._depth = 0
+        self._peaks = []  # traced-memory high-water mark of each open stage, innermost last
+        self.started = datetime.now(timezone.utc).isoformat()
+
+    @contextmanager
+    def stage(self, name):
+        """Record one pipeline stage; set record['rows'] inside the block to report a row count"""
+        record = {'stage': name, 'depth': self._depth, 'rows': None}
+        self.stages.append(record)  # appended on entry so nested stages follow their parent
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        traced = tracemalloc.is_tracing()
+        if traced:
+            # The tracemalloc peak is global: fold it into the parent's mark before resetting it
+            mem_before, peak = tracemalloc.get_traced_memory()
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            tracemalloc.reset_peak()
+            self._peaks.append(mem_before)
+        profiler = cProfile.Profile() if name == self.profile_stage else None
+
+        self._depth += 1
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record['wall_s'] = round(time.perf_counter() - wall_start, 6)
+            record['cpu_s'] = round(time.process_time() - cpu_start, 6)
+            # ru_maxrss is a process-lifetime high-water mark, not a per-stage figure
+            record['process_peak_rss_mb'] = peak_rss_mb()
+            if traced:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(self._peaks.pop(), peak)
+                record['alloc_delta_mb'] = round((current - mem_before) / 2**20, 3)
+                record['alloc_peak_mb'] = round((peak - mem_before) / 2**20, 3)
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                tracemalloc.reset_peak()
+            if profiler is not None:
+                path = Path(self.profile_path or f'profile_{name}.prof')
+                profiler.dump_stats(path)
+                record['profile'] = str(path)
+            self._depth -= 1
+
+    def report(self):
+        """Run report as a JSON-serialisable dict"""
+        return {
+            'started': self.started,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'stages': self.stages,
+        }
+
+    def write_report(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(self.report(), indent=2))
+        print(f"\n⏱️ Run report written to '{path}'")
+
+    def print_summary(self):
+        print("\n⏱️ STAGE TIMINGS:")
+        for record in self.stages:
+            if 'wall_s' not in record:
+                continue  # still running
+            rows = f"{record['rows']:,} rows" if record['rows'] is not None else ''
+            indent = '  ' * record['depth']
+            print(f"{indent}{record['stage']:<{32 - len(indent)}} {record['wall_s']:8.3f}s wall "
+                  f"{record['cpu_s']:8.3f}s cpu  {rows}")
+
+
+def stage(name):
+    """Method decorator: time the call under self.recorder (a no-op if the instance has none)"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            recorder = getattr(self, 'recorder', None)
+            if recorder is None:
+                return method(self, *args, **kwargs)
+            with recorder.stage(name) as record:
+                result = method(self, *args, **kwargs)
+                record['rows'] = count_rows(result)
+            return result
+        return wrapper
+    return decorator
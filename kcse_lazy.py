@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+KCSE Lazy Datasets
+Memoised, on-demand analyzer attributes with explicit dependencies. Each lazy_dataset is
+computed the first time it is read, kept in one of the instance's dicts (cleaned_data by
+default), and dropped again by invalidate() together with everything computed from it.
+"""
+
+
+class lazy_dataset:
+    """Decorator for a memoised analyzer attribute computed from the datasets in depends_on"""
+
+    def __init__(self, *depends_on, store='cleaned_data'):
+        self.depends_on = depends_on
+        self.store = store
+
+    def __call__(self, compute):
+        self.compute = compute
+        self.__doc__ = compute.__doc__
+        return self
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        store = getattr(instance, self.store)
+        if self.name not in store:
+            store[self.name] = self.compute(instance)
+        return store[self.name]
+
+    def __set__(self, instance, value):
+        getattr(instance, self.store)[self.name] = value
+
+    def is_loaded(self, instance):
+        return self.name in getattr(instance, self.store)
+
+
+def lazy_members(cls):
+    """{name: lazy_dataset} for a class and its bases"""
+    return {name: member for klass in reversed(cls.__mro__) for name, member in vars(klass).items()
+            if isinstance(member, lazy_dataset)}
+
+
+def downstream(cls, *names):
+    """names plus every lazy dataset of cls computed (transitively) from them"""
+    members = lazy_members(cls)
+    stale = set(names)
+    changed = True
+    while changed:
+        changed = False
+        for name, member in members.items():
+            if name not in stale and stale.intersection(member.depends_on):
+                stale.add(name)
+                changed = True
+    return stale
+
+
+def invalidate(instance, *names):
+    """Forget names and everything computed from them; returns the names dropped"""
+    members = lazy_members(type(instance))
+    dropped = []
+    for name in sorted(downstream(type(instance), *names)):
+        if name in members and members[name].is_loaded(instance):
+            getattr(instance, members[name].store).pop(name)
+            dropped.append(name)
+    return dropped
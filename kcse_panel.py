@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+KCSE National Panel Alignment
+The national Registered/Sat figures appear in several layouts: the Registered/Sat/Change
+triples of 'Registered vs Sat.xlsx' (repeated in 'Gender + Region.xlsx'), the snake_case
+`kcse_national_trends` sheet and the `National Summary Data` sheet of 'normalised data.xlsx'.
+Each layout is registered with a mapping onto one canonical Year x measure panel; every sheet
+of every workbook is matched against the registry, and all aligned sources are merged in one
+long-format pass with per-cell provenance and conflict detection.
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from kcse_schema import SCHEMAS, TIME_SERIES_COLUMNS, SchemaMismatchError, normalise_tokens, locate_data_start
+from kcse_workbook import read_workbook
+
+PANEL_COLUMNS = ['Year'] + [name for name, _ in TIME_SERIES_COLUMNS]
+
+
+class PanelLayout:
+    """One known layout of the national figures.
+
+    mapping sends canonical columns to source columns: header names for named layouts,
+    positions for positional ones (whose headers span several rows).
+    """
+
+    def __init__(self, name, mapping, header_tokens=None):
+        self.name = name
+        self.mapping = mapping
+        self.named = all(isinstance(source, str) for source in mapping.values())
+        self.header_tokens = header_tokens or list(mapping.values())
+
+    def matches(self, raw):
+        """Whether raw (a header-less sheet) carries this layout's header tokens above its data"""
+        start = locate_data_start(raw) if raw.shape[1] else None
+        if not start or raw.shape[1] <= max(self._positions(raw, start).values(), default=0):
+            return False
+        found = set(normalise_tokens(raw.iloc[:start].to_numpy().ravel()))
+        return set(normalise_tokens(self.header_tokens)) <= found
+
+    def _positions(self, raw, start):
+        if not self.named:
+            return dict(self.mapping)
+        header = list(normalise_tokens(raw.iloc[start - 1].to_numpy()))
+        wanted = dict(zip(self.mapping, normalise_tokens(list(self.mapping.values()))))
+        return {column: header.index(token) for column, token in wanted.items() if token in header}
+
+    def values(self, raw):
+        """Float matrix of the data rows in PANEL_COLUMNS order (NaN where this layout lacks a measure)"""
+        start = locate_data_start(raw)
+        positions = self._positions(raw, start)
+        cells = raw.iloc[start:, list(positions.values())].to_numpy().ravel()
+        # One to_numeric pass over every cell instead of one per column
+        body = pd.to_numeric(pd.Series(cells, dtype=object), errors='coerce').to_numpy(dtype=float)
+        body = body.reshape(-1, len(positions))
+        matrix = np.full((len(body), len(PANEL_COLUMNS)), np.nan)
+        matrix[:, [PANEL_COLUMNS.index(column) for column in positions]] = body
+        return matrix[~np.isnan(matrix[:, 0])]
+
+    def align(self, raw):
+        """Canonical panel rows (Year plus every measure; NaN where this layout lacks one)"""
+        return pd.DataFrame(self.values(raw), columns=PANEL_COLUMNS)
+
+
+LAYOUTS = {
+    # Registered / Sat / Change for Total, Female and Male, two header rows
+    'registered_vs_sat': PanelLayout('registered_vs_sat', dict(zip(PANEL_COLUMNS, range(len(PANEL_COLUMNS)))),
+                                     header_tokens=SCHEMAS['registered_vs_sat'].header_tokens),
+    'national_trends': PanelLayout('national_trends', {
+        'Year': 'year', 'Total_Registered': 'total_registered', 'Total_Sat': 'total_sat',
+        'Male_Registered': 'males_registered', 'Male_Sat': 'males_sat',
+        'Female_Registered': 'females_registered', 'Female_Sat': 'females_sat',
+    }),
+    'national_summary': PanelLayout('national_summary', {
+        'Year': 'examination_year', 'Total_Registered': 'total_registered', 'Total_Sat': 'total_sat',
+        'Female_Registered': 'female_registered', 'Female_Sat': 'female_sat',
+        'Male_Registered': 'male_registered', 'Male_Sat': 'male_sat',
+        'Total_Change': 'year_over_year_change', 'Female_Change': 'female_change', 'Male_Change': 'male_change',
+    }),
+}
+
+
+def detect_layout(raw):
+    """The registered layout a header-less sheet follows, or None"""
+    for layout in LAYOUTS.values():
+        if layout.matches(raw):
+            return layout
+    return None
+
+
+def align_sheet(raw, layout=None):
+    """Align one header-less sheet onto the canonical panel (layout detected unless given)"""
+    layout = layout or detect_layout(raw)
+    if layout is None:
+        raise ValueError("sheet matches no registered national layout")
+    return layout.align(raw).sort_values('Year', ignore_index=True)
+
+
+def discover_sources(paths):
+    """Every (label, layout, raw sheet) among the workbooks' sheets that matches a registered layout"""
+    found = []
+    for path in paths:
+        for sheet, raw in read_workbook(path, header=None).items():
+            layout = detect_layout(raw)
+            if layout is not None:
+                found.append((f'{Path(path).name}:{sheet.strip()}', layout, raw))
+    return found
+
+
+class NationalPanel:
+    """Canonical Year x measure panel merged from several aligned sources.
+
+    Sources are given in priority order: for each cell the first source that reports it wins,
+    and cells on which sources disagree are listed in conflicts.
+    """
+
+    def __init__(self, sources, searched=None):
+        if not sources:
+            where = f" of {', '.join(Path(path).name for path in searched)}" if searched else ''
+            if searched is not None and not searched:
+                where = " (no workbooks found)"
+            raise SchemaMismatchError(f"no sheet{where} matches a registered national layout "
+                                      f"(tried {', '.join(LAYOUTS)})")
+        self.sources = [label for label, _, _ in sources]
+        matrices = [layout.values(raw) for _, layout, raw in sources]
+        stacked = np.vstack(matrices)
+        n_fields = len(PANEL_COLUMNS) - 1
+        # Long (Year, field, value, priority) rows for every source in one array pass
+        long = pd.DataFrame({
+            'Year': np.repeat(stacked[:, 0], n_fields).astype(int),
+            'field': np.tile(np.arange(n_fields), len(stacked)),
+            'value': stacked[:, 1:].ravel(),
+            'priority': np.repeat(np.repeat(np.arange(len(sources)), [len(m) for m in matrices]), n_fields),
+        })
+        long = long[~np.isnan(long['value'].to_numpy())]
+        long = long.sort_values(['Year', 'field', 'priority'], kind='stable', ignore_index=True)
+        long['field'] = pd.Categorical.from_codes(long['field'], PANEL_COLUMNS[1:])
+        long['source'] = pd.Categorical.from_codes(long['priority'], self.sources)
+
+        chosen = long.drop_duplicates(['Year', 'field'])
+        self.panel = self._compact(chosen.pivot(index='Year', columns='field', values='value')
+                                   .reindex(columns=PANEL_COLUMNS[1:]).reset_index())
+        self.provenance = chosen.pivot(index='Year', columns='field', values='source').reindex(columns=PANEL_COLUMNS[1:])
+
+        spread = long.groupby(['Year', 'field'], observed=True)['value'].transform('nunique')
+        disputed = long[spread > 1]
+        conflicts = disputed.pivot_table(index=['Year', 'field'], columns='source', values='value', aggfunc='first',
+                                          observed=True)
+        conflicts = conflicts.reindex(columns=[s for s in self.sources if s in conflicts.columns])
+        conflicts.insert(0, 'chosen', chosen.set_index(['Year', 'field'])['value'].reindex(conflicts.index))
+        self.conflicts = conflicts
+        self.coverage = long.groupby('source', observed=True)['Year'].agg(['min', 'max', 'nunique']).reindex(self.sources)
+
+    @staticmethod
+    def _compact(panel):
+        # Complete columns go back to integers; measures some years lack stay float (NaN)
+        complete = [col for col in panel.columns if panel[col].notna().all()]
+        return panel.astype({col: 'int64' for col in complete})
+
+    @classmethod
+    def from_workbooks(cls, paths):
+        paths = list(paths)
+        return cls(discover_sources(paths), searched=paths)
+
+    def report(self, limit=20):
+        print("\n" + "="*60)
+        print(f"NATIONAL PANEL ALIGNMENT ({len(self.sources)} sources, {len(self.panel)} years)")
+        print("="*60)
+        for source, row in self.coverage.iterrows():
+            print(f"  {source}: {int(row['min'])}-{int(row['max'])} ({int(row['nunique'])} years)")
+        gaps = int(self.panel.isna().sum().sum())
+        print(f"Cells missing from every source: {gaps}")
+        if len(self.conflicts):
+            years = sorted(self.conflicts.index.get_level_values('Year').unique())
+            print(f"\n⚠️ {len(self.conflicts)} conflicting cells in {years} (first source wins):")
+            print(self.conflicts.head(limit).to_string())
+        else:
+            print("✅ All overlapping sources agree")
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+KCSE Report Publishing
+Writes every artefact of a run (PNG/SVG charts, JSON metrics, the Markdown summary and CSV
+extracts) to one or more output targets. Encoding runs in an executor while the event loop
+writes finished artefacts, with at most `concurrency` artefacts in flight; each file is written
+to a temporary name and renamed into place. The previous manifest is deleted before anything
+is written and the new one is written last, so a reader never sees a half-written file or a
+manifest that lists missing files or checksums of a previous run's.
+
+    python kcse_cli.py analyze --only publish --publish-to site/ --publish-to fake-objstore://bucket-dir
+"""
+
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+
+import pandas as pd
+
+from kcse_charts import ChartJob, encode_job, DEFAULT_DPI
+
+PUBLISH_DIR = 'publish'
+MANIFEST_NAME = 'manifest.json'
+SUMMARY_NAME = 'KCSE_Analysis_Summary.md'
+PUBLISH_FORMATS = ('png', 'svg')
+DEFAULT_CONCURRENCY = 4
+
+
+class Artifact:
+    """One encoding task published under key.
+
+    encode(*args) returns the file's bytes, or {name: bytes} for several files under key/
+    (a chart in each format). cpu_bound tasks go to the process pool when there is one.
+    """
+
+    def __init__(self, key, encode, *args, cpu_bound=False):
+        self.key = key
+        self.encode = encode
+        self.args = args
+        self.cpu_bound = cpu_bound
+
+    def files(self, encoded):
+        """{target key: bytes} for the encoder's result"""
+        if isinstance(encoded, dict):
+            return {f'{self.key}/{name}': data for name, data in encoded.items()}
+        return {self.key: encoded}
+
+
+class LocalDirectoryTarget:
+    """Files under a local directory, each written to a temporary name and renamed into place"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def __str__(self):
+        return str(self.root)
+
+    async def put(self, key, data, content_type=None):
+        return await asyncio.to_thread(self._write, key, data)
+
+    def _write(self, key, data):
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique temporary name: concurrent publishes of the same key never share one
+        tmp_path = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+        try:
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return path
+
+    async def delete(self, key):
+        await asyncio.to_thread((self.root / key).unlink, missing_ok=True)
+
+    async def close(self):
+        pass
+
+
+class FakeObjectStoreTarget:
+    """Local stand-in for an object-store bucket, for tests and dry runs.
+
+    Objects live under root/<bucket>/<key>; each put is all-or-nothing and records the
+    content type, size and an MD5 ETag (as object stores report for single-part uploads),
+    and close() writes the bucket index to root/<bucket>.index.json.
+    """
+
+    def __init__(self, root, bucket='kcse'):
+        self.root = Path(root)
+        self.bucket = bucket
+        self.files = LocalDirectoryTarget(self.root / bucket)
+        self.objects = {}
+
+    def __str__(self):
+        return f'fake-objstore://{self.root}/{self.bucket}'
+
+    async def put(self, key, data, content_type=None):
+        await self.files.put(key, data)
+        self.objects[key] = {'etag': hashlib.md5(data).hexdigest(), 'size': len(data),
+                             'content_type': content_type or 'application/octet-stream'}
+
+    async def delete(self, key):
+        await self.files.delete(key)
+        self.objects.pop(key, None)
+
+    def get(self, key):
+        return (self.files.root / key).read_bytes()
+
+    def list(self, prefix=''):
+        return sorted(key for key in self.objects if key.startswith(prefix))
+
+    async def close(self):
+        index = json.dumps({'bucket': self.bucket, 'objects': self.objects}, indent=2, sort_keys=True)
+        await LocalDirectoryTarget(self.root).put(f'{self.bucket}.index.json', index.encode())
+
+
+# URI scheme -> target factory; plain paths are local directories
+TARGETS = {
+    'file': LocalDirectoryTarget,
+    'fake-objstore': FakeObjectStoreTarget,
+}
+
+
+def target_from_uri(uri):
+    """Build a target from 'DIR', 'file://DIR' or '<scheme>://LOCATION' for a registered scheme"""
+    scheme, sep, location = str(uri).partition('://')
+    if not sep:
+        return LocalDirectoryTarget(uri)
+    if scheme not in TARGETS:
+        raise ValueError(f"unknown publish target scheme {scheme!r} (expected one of {', '.join(TARGETS)})")
+    return TARGETS[scheme](location)
+
+
+def content_type(key):
+    if key.endswith('.md'):
+        return 'text/markdown; charset=utf-8'
+    return mimetypes.guess_type(key)[0] or 'application/octet-stream'
+
+
+async def publish_async(artifacts, targets, concurrency=DEFAULT_CONCURRENCY, threads=None, processes=None):
+    """Encode and write every artefact to every target, then the manifest; returns the manifest entries.
+
+    A stale manifest is removed first: if any artefact fails, the target is left without one
+    rather than with a manifest whose checksums no longer match the files next to it.
+    """
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    await asyncio.gather(*(target.delete(MANIFEST_NAME) for target in targets))
+
+    async def publish_one(artifact):
+        async with slots:
+            start = time.perf_counter()
+            executor = processes if artifact.cpu_bound and processes is not None else threads
+            encoded = artifact.files(await loop.run_in_executor(executor, partial(artifact.encode, *artifact.args)))
+            encoded_at = time.perf_counter()
+            # Writes of one artefact's files to every target overlap with other artefacts' encoding
+            await asyncio.gather(*(target.put(key, data, content_type(key))
+                                   for key, data in encoded.items() for target in targets))
+            done = time.perf_counter()
+        return [{'key': key, 'artifact': artifact.key, 'bytes': len(data), 'content_type': content_type(key),
+                 'sha256': hashlib.sha256(data).hexdigest(), 'encode_ms': round((encoded_at - start) * 1000, 1),
+                 'write_ms': round((done - encoded_at) * 1000, 1)} for key, data in encoded.items()]
+
+    results = await asyncio.gather(*(publish_one(artifact) for artifact in artifacts))
+    entries = [entry for result in results for entry in result]
+    manifest = json.dumps({'published_at': datetime.now(timezone.utc).isoformat(), 'files': entries},
+                          indent=2).encode()
+    await asyncio.gather(*(target.put(MANIFEST_NAME, manifest, 'application/json') for target in targets))
+    await asyncio.gather(*(target.close() for target in targets))
+    return entries
+
+
+def publish(artifacts, targets, concurrency=DEFAULT_CONCURRENCY, processes=1):
+    """Synchronous entry point: run publish_async on a fresh event loop and print a summary.
+
+    Charts are drawn in a pool of `processes` workers when processes > 1, otherwise in threads
+    alongside the other encoders.
+    """
+    artifacts, targets = list(artifacts), list(targets)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as threads:
+        if processes > 1 and any(artifact.cpu_bound for artifact in artifacts):
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                entries = asyncio.run(publish_async(artifacts, targets, concurrency, threads, pool))
+        else:
+            entries = asyncio.run(publish_async(artifacts, targets, concurrency, threads))
+    elapsed = time.perf_counter() - start
+
+    print("\n" + "="*60)
+    print(f"PUBLISHED {len(entries)} FILES ({sum(e['bytes'] for e in entries) / 1024:,.0f} KB) "
+          f"in {elapsed:.2f}s")
+    print("="*60)
+    for entry in entries:
+        print(f"  {entry['key']:<40} {entry['bytes'] / 1024:8.1f} KB  "
+              f"encode {entry['encode_ms']:7.1f} ms  write {entry['write_ms']:6.1f} ms")
+    for target in targets:
+        print(f"📦 {target}")
+    return entries
+
+
+def encode_csv(df, index=False):
+    return df.to_csv(index=index).encode()
+
+
+def encode_json(payload):
+    return json.dumps(payload, indent=2, default=_json_default).encode()
+
+
+def encode_text(text):
+    return text.encode()
+
+
+def _json_default(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        # Keyed by the index (metric, county), which records orientation would drop
+        return json.loads(value.to_json(orient='index'))
+    raise TypeError(f"{type(value).__name__} is not JSON serialisable")
+
+
+def _records(df):
+    return json.loads(df.to_json(orient='records'))
+
+
+def format_summary(trends, summary, rates, county_stats, validation=None, uncertainty=None):
+    """Markdown summary of a run in the layout of KCSE_Analysis_Summary.md"""
+    first, last = summary['first_year'], summary['last_year']
+    means, growth, change = summary['means'], summary['growth'], summary['rate_change']
+    latest = rates.iloc[-1]
+    national = uncertainty['national'] if uncertainty is not None else None
+
+    def interval(metric, unit='%'):
+        if national is None or metric not in national.index:
+            return ''
+        row = national.loc[metric]
+        return f" (95% CI {row['lower']:.2f}–{row['upper']:.2f}{unit})"
+
+    lines = [
+        "# KCSE Examination Participation Analysis - Summary Report",
+        "",
+        "## Research Question",
+        "**How do KCSE examination participation rates vary by gender, age group, and county in Kenya, "
+        "and what trends emerge over time?**",
+        "",
+        "---",
+        "",
+        "## 📊 Detailed Statistics",
+        "",
+        "| Metric | Value |",
+        "|--------|-------|",
+        f"| **Analysis Period** | {first}-{last} ({summary['n_years']} years) |",
+        f"| **Total Candidates ({last})** | {int(trends['Total_Sat'].iloc[-1]):,} |",
+        f"| **Total Candidates ({first})** | {int(trends['Total_Sat'].iloc[0]):,} |",
+        f"| **Average Participation Rate** | {means['Total_Participation_Rate']:.2f}%"
+        f"{interval('Total_Participation_Rate')} |",
+        f"| **Participation Rate ({last})** | {latest['Total_Rate']:.2f}% "
+        f"(95% CI {latest['Total_Rate_Lower']:.2f}–{latest['Total_Rate_Upper']:.2f}%) |",
+        f"| **Female Participation Rate** | {means['Female_Participation_Rate']:.2f}% |",
+        f"| **Male Participation Rate** | {means['Male_Participation_Rate']:.2f}% |",
+        f"| **Gender Gap** | {means['Gender_Gap']:+.2f} percentage points{interval('Gender_Gap', ' pp')} |",
+        f"| **Growth Rate** | {growth['Total']:+.1f}%{interval('Total_Growth')} |",
+        f"| **Participation Rate Change** | {change['Total_Participation_Rate']:+.2f} percentage points |",
+        "",
+        "## 📈 Participation by Year",
+        "",
+        "| Year | Candidates | Total | Female | Male | Gap (pp) | Gap p-value |",
+        "|------|------------|-------|--------|------|----------|-------------|",
+    ]
+    candidates = dict(zip(trends['Year'], trends['Total_Sat']))
+    lines += [f"| {int(row.Year)} | {int(candidates[row.Year]):,} | {row.Total_Rate:.2f}% | {row.Female_Rate:.2f}% | "
+              f"{row.Male_Rate:.2f}% | {row.Gender_Gap:+.2f} | {row.Gender_Gap_P_Value:.3f} |"
+              for row in rates.itertuples()]
+    lines += [
+        "",
+        "## 🗺️ Counties",
+        "",
+        f"- **Counties analysed:** {len(county_stats)}",
+        f"- **At gender parity:** {int(county_stats['parity'].sum())}",
+        f"- **Significant candidate growth (p < 0.05):** {int(county_stats['significant_growth'].sum())}",
+        f"- **Significant candidate decline (p < 0.05):** {int(county_stats['significant_decline'].sum())}",
+    ]
+    flagged = county_stats[county_stats['underperforming']]
+    lines += [f"- ⚠️ **{county}** flagged: {row['trend_pct_per_year']:+.1f}%/yr (p={row['trend_p_value']:.3f}), "
+              f"GPI {row['gpi']:.3f}" for county, row in flagged.iterrows()]
+    if validation is not None:
+        lines += ["", "## ✅ Data Validation", "",
+                  f"{len(validation.summary)} checks: {validation.errors} errors, {validation.warnings} warnings "
+                  f"(details in `metrics/validation.json`)."]
+    lines += ["", "![Participation dashboard](charts/kcse_comprehensive_analysis.png)", ""]
+    return "\n".join(lines)
+
+
+def build_artifacts(analyzer, formats=PUBLISH_FORMATS, dpi=DEFAULT_DPI):
+    """Every artefact of an analyzer's run: charts, JSON metrics, the Markdown summary and CSV extracts"""
+    trends, summary, rates = analyzer.trend_metrics, analyzer.trend_summary, analyzer.national_rates
+    county_stats = analyzer.county_stats
+    validation = analyzer.derived.get('validation')
+    uncertainty = analyzer.derived.get('uncertainty')
+    forecast = analyzer.derived.get('forecast')
+
+    artifacts = [
+        Artifact('charts', encode_job, ChartJob('kcse_comprehensive_analysis', 'trend_dashboard', trends.copy(),
+                                                formats=formats, dpi=dpi), cpu_bound=True),
+        Artifact(SUMMARY_NAME, lambda: encode_text(format_summary(trends, summary, rates, county_stats,
+                                                                  validation, uncertainty))),
+        Artifact('metrics/summary.json', encode_json, {
+            'trend_summary': summary,
+            'latest_rates': _records(rates.tail(1))[0],
+            'sources': {key: str(analyzer.source_path(key)) for key in analyzer.SOURCE_FILES},
+        }),
+        Artifact('data/time_series.csv', encode_csv, analyzer.time_series),
+        Artifact('data/trend_metrics.csv', encode_csv, trends),
+        Artifact('data/national_rates.csv', encode_csv, rates),
+        Artifact('data/county_stats.csv', encode_csv, county_stats, True),
+        Artifact('data/county_facts.csv', encode_csv, analyzer.county_facts),
+    ]
+    if validation is not None:
+        artifacts.append(Artifact('metrics/validation.json', encode_json, validation.to_dict()))
+    if uncertainty is not None:
+        artifacts.append(Artifact('metrics/uncertainty.json', encode_json, uncertainty))
+    if forecast is not None:
+        artifacts.append(Artifact('data/forecasts.csv', encode_csv, forecast['forecasts']))
+        artifacts.append(Artifact('metrics/forecast_backtest.json', encode_json, forecast['backtests']))
+    return artifacts
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+KCSE County Reports
+Batch generation of one participation report (Markdown + chart) per county per year.
+Workers receive the fact table once through the pool initializer and treat it as read-only,
+and counties whose fact rows are unchanged since the last run are skipped.
+"""
+
+import hashlib
+import json
+import re
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from kcse_charts import ChartJob, render_job, DEFAULT_DPI, DEFAULT_FORMATS
+from kcse_tidy import ALL
+
+# Bump when the report layout changes so every county is regenerated
+REPORT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+_shared = {}
+
+
+def _init_worker(facts, national, options):
+    """Pool initializer: keep one read-only copy of the shared data per worker process"""
+    _shared['facts'] = facts
+    _shared['national'] = national
+    _shared['options'] = options
+
+
+def county_slug(county):
+    return re.sub(r'[^a-z0-9]+', '_', str(county).lower()).strip('_')
+
+
+def county_fingerprint(county_facts, national, options):
+    """Hash of everything a county's reports depend on: its fact rows, the national
+    totals used for its share, and the output options"""
+    rows = county_facts.sort_values(['year', 'gender', 'age_band']).reset_index(drop=True)
+    digest = hashlib.sha256(pd.util.hash_pandas_object(rows, index=False).to_numpy().tobytes())
+    digest.update(national.reindex(rows['year'].unique()).to_numpy().tobytes())
+    digest.update(json.dumps([REPORT_VERSION, list(options['formats']), options['dpi']]).encode())
+    return digest.hexdigest()
+
+
+def county_statistics(county_facts, national):
+    """Per-year gender counts, parity, growth, national share and age profile for one county"""
+    by_gender = county_facts[county_facts['age_band'] == ALL]
+    stats = by_gender.pivot_table(index='year', columns='gender', values='candidates',
+                                  aggfunc='sum', observed=True).astype(float)
+    stats['Total'] = stats[['Female', 'Male']].sum(axis=1)
+    stats['Female_Share'] = stats['Female'] / stats['Total'] * 100
+    stats['Gender_Parity_Index'] = stats['Female'] / stats['Male']
+    stats['YoY_Growth'] = stats['Total'].pct_change() * 100
+    stats['National_Share'] = stats['Total'] / national.reindex(stats.index) * 100
+
+    by_age = county_facts[county_facts['gender'] == ALL]
+    ages = by_age.pivot_table(index='year', columns='age_band', values='candidates',
+                              aggfunc='sum', observed=True).astype(float)
+    age_shares = ages.div(ages.sum(axis=1), axis=0) * 100
+    return stats, age_shares
+
+
+def format_county_report(county, region, year, stats, age_shares, chart_name):
+    """Markdown report for one county and year"""
+    row = stats.loc[year]
+    lines = [
+        f"# KCSE Participation Report: {county} ({year})",
+        "",
+        f"**Region:** {region}",
+        "",
+        "| Metric | Value |",
+        "|--------|-------|",
+        f"| **Total Candidates** | {int(row['Total']):,} |",
+        f"| **Female Candidates** | {int(row['Female']):,} |",
+        f"| **Male Candidates** | {int(row['Male']):,} |",
+        f"| **Female Share** | {row['Female_Share']:.2f}% |",
+        f"| **Gender Parity Index (F/M)** | {row['Gender_Parity_Index']:.3f} |",
+        f"| **Share of National Candidates** | {row['National_Share']:.2f}% |",
+    ]
+    if pd.notna(row['YoY_Growth']):
+        lines.append(f"| **Year-over-Year Growth** | {row['YoY_Growth']:+.1f}% |")
+    if year in age_shares.index:
+        lines += ["", "## Age Distribution", "", "| Age band | Share |", "|----------|-------|"]
+        lines += [f"| {band} | {share:.1f}% |" for band, share in age_shares.loc[year].items()]
+    lines += ["", f"![{county} profile]({chart_name})", ""]
+    return "\n".join(lines)
+
+
+def _write_county_reports(county):
+    """Worker task: write every year's report and the profile chart for one county"""
+    facts, national, options = _shared['facts'], _shared['national'], _shared['options']
+    county_facts = facts[facts['county'] == county]
+    stats, age_shares = county_statistics(county_facts, national)
+    region = county_facts['region'].iloc[0]
+
+    out_dir = Path(options['output_dir']) / county_slug(county)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    job = ChartJob(f'{county_slug(county)}_profile', 'county_profile',
+                   {'stats': stats, 'age_shares': age_shares, 'county': county},
+                   formats=options['formats'], dpi=options['dpi'])
+    chart_paths = render_job(job, out_dir)
+
+    written = list(chart_paths)
+    for year in stats.index:
+        path = out_dir / f'{int(year)}.md'
+        path.write_text(format_county_report(county, region, int(year), stats, age_shares,
+                                             Path(chart_paths[0]).name))
+        written.append(str(path))
+    return written
+
+
+def generate_county_reports(facts, output_dir='reports', workers=1, formats=DEFAULT_FORMATS,
+                            dpi=DEFAULT_DPI, force=False):
+    """Generate per-county reports, skipping counties whose fact rows have not changed"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / MANIFEST_NAME
+    previous = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+    national = (facts[(facts['age_band'] == ALL) & (facts['gender'] != ALL)]
+                .groupby('year')['candidates'].sum().astype(float))
+    options = {'output_dir': str(output_dir), 'formats': tuple(formats), 'dpi': dpi}
+    groups = {county: rows for county, rows in facts.groupby('county', observed=True)}
+    counties = list(groups)
+    fingerprints = {c: county_fingerprint(groups[c], national, options) for c in counties}
+    todo = [c for c in counties
+            if force or previous.get(c) != fingerprints[c] or not (output_dir / county_slug(c)).exists()]
+
+    if workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo)), initializer=_init_worker,
+                                 initargs=(facts, national, options)) as pool:
+            results = dict(zip(todo, pool.map(_write_county_reports, todo)))
+    else:
+        _init_worker(facts, national, options)
+        results = {county: _write_county_reports(county) for county in todo}
+
+    manifest_path.write_text(json.dumps(fingerprints, indent=2))
+    print(f"\n🗂️ COUNTY REPORTS ({output_dir}):")
+    print(f"Generated: {len(todo)} counties, {sum(len(paths) for paths in results.values())} files")
+    print(f"Skipped (unchanged): {len(counties) - len(todo)} counties")
+    return results
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+KCSE Sheet Schemas
+Declarative schema registry for the KNEC workbooks: expected header tokens, column names and dtypes.
+A vectorised header locator finds where the data block starts, so new extracts load without
+hand-edited row offsets, and a sheet that no longer matches its schema fails with a clear diff.
+"""
+
+import numpy as np
+import pandas as pd
+
+from kcse_workbook import read_sheet
+
+
+class SchemaMismatchError(ValueError):
+    """Raised when a sheet's layout no longer matches its registered schema"""
+
+
+def normalise_tokens(values):
+    """Lower-case and strip all whitespace so '22 + yrs' and '22+yrs' compare equal"""
+    return pd.Series(values, dtype=object).fillna('').map(str).str.lower().str.replace(r'\s+', '', regex=True)
+
+
+def locate_data_start(df, column=0, limit=None):
+    """Return the position of the first row whose key column holds an integer code, or None"""
+    key = normalise_tokens(df.iloc[:limit, column].to_numpy())
+    is_code = key.str.fullmatch(r'\d+(\.0+)?').to_numpy()
+    if not is_code.any():
+        return None
+    return int(np.argmax(is_code))
+
+
+class SheetSchema:
+    """Layout of one sheet: header tokens to expect, id columns, and either fixed value
+    columns or per-year groups of measure columns."""
+
+    def __init__(self, name, workbook, sheet, header_tokens, id_columns,
+                 value_columns=None, measures=None, value_dtype='int64'):
+        self.name = name
+        self.workbook = workbook
+        self.sheet = sheet
+        self.header_tokens = header_tokens
+        self.id_columns = id_columns
+        self.value_columns = value_columns or []
+        self.measures = measures or []
+        self.value_dtype = value_dtype
+
+    @property
+    def per_year(self):
+        return bool(self.measures)
+
+    def load(self, path):
+        """Read the sheet from path (header-less) and apply this schema"""
+        return self.apply(read_sheet(path, self.sheet, header=None))
+
+    def apply(self, raw):
+        """Locate the data block in a raw header-less frame, name its columns and cast dtypes"""
+        start = locate_data_start(raw)
+        if start is None:
+            raise SchemaMismatchError(f"[{self.name}] no data rows found: column 0 holds no integer codes")
+        header = raw.iloc[:start]
+        self._check_header_tokens(header)
+
+        if self.per_year:
+            columns = self.id_columns_names() + self._year_columns(header)
+        else:
+            columns = self.id_columns_names() + [name for name, _ in self.value_columns]
+        if raw.shape[1] < len(columns):
+            raise SchemaMismatchError(
+                f"[{self.name}] expected at least {len(columns)} columns, sheet has {raw.shape[1]}")
+
+        # Keep only rows with a numeric key (drops totals rows and trailing blanks)
+        body = raw.iloc[start:, :len(columns)]
+        key = pd.to_numeric(body.iloc[:, 0], errors='coerce')
+        df_clean = body[key.notna().to_numpy()].reset_index(drop=True)
+        df_clean.columns = columns
+        return self._cast(df_clean)
+
+    def id_columns_names(self):
+        return [name for name, _ in self.id_columns]
+
+    def _check_header_tokens(self, header):
+        found = set(normalise_tokens(header.to_numpy().ravel()))
+        expected = set(normalise_tokens(self.header_tokens))
+        missing = sorted(expected - found)
+        if missing:
+            raise SchemaMismatchError(
+                f"[{self.name}] header tokens missing from '{self.sheet}': {missing}\n"
+                f"  expected: {sorted(expected)}\n"
+                f"  found:    {sorted(t for t in found if t)}")
+
+    def _year_columns(self, header):
+        """Derive '<Measure>_<Year>' column names from the year row and check each group's labels"""
+        values = header.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        is_year = (values >= 1900) & (values <= 2100) & (values == np.floor(values))
+        year_row = int(np.argmax(is_year.sum(axis=1)))
+        positions = np.flatnonzero(is_year[year_row])
+        if len(positions) == 0:
+            raise SchemaMismatchError(f"[{self.name}] no year row found in header of '{self.sheet}'")
+        years = values[year_row, positions].astype(int)
+
+        width = len(self.measures)
+        first = len(self.id_columns)
+        expected_positions = first + width * np.arange(len(years))
+        if not np.array_equal(positions, expected_positions):
+            raise SchemaMismatchError(
+                f"[{self.name}] year groups start at columns {positions.tolist()}, "
+                f"expected {expected_positions.tolist()} (groups of {width})")
+
+        # The last header row carries the measure labels for every year group
+        labels = normalise_tokens(header.iloc[-1].to_numpy()).to_numpy()
+        diffs = []
+        for year, pos in zip(years, positions):
+            for offset, (_, tokens) in enumerate(self.measures):
+                accepted = set(normalise_tokens(tokens if isinstance(tokens, (list, tuple)) else [tokens]))
+                found = labels[pos + offset] if pos + offset < len(labels) else ''
+                if found not in accepted:
+                    diffs.append(f"  col {pos + offset} ({year}): expected {sorted(accepted)}, found '{found}'")
+        if diffs:
+            raise SchemaMismatchError(f"[{self.name}] measure labels differ from schema:\n" + "\n".join(diffs))
+
+        return [f"{measure}_{year}" for year in years for measure, _ in self.measures]
+
+    def _cast(self, df):
+        dtypes = dict(self.id_columns)
+        if self.per_year:
+            dtypes.update({col: self.value_dtype for col in df.columns[len(self.id_columns):]})
+        else:
+            dtypes.update(dict(self.value_columns))
+
+        numeric = [col for col, dtype in dtypes.items() if dtype not in ('string', 'object')]
+        df[numeric] = df[numeric].apply(pd.to_numeric, errors='coerce')
+        bad = df[numeric].isna()
+        if bad.to_numpy().any():
+            cells = [f"row {r}, column '{numeric[c]}'" for r, c in zip(*np.nonzero(bad.to_numpy()))][:10]
+            raise SchemaMismatchError(f"[{self.name}] non-numeric or empty values in count columns: {cells}")
+        for col in [c for c, dtype in dtypes.items() if dtype == 'string']:
+            df[col] = df[col].astype(str).str.strip()
+        return df.astype(dtypes)
+
+
+AGE_BANDS = [
+    ('Age_16_Below', ['16 yrs & below', '16 yrs and below']),
+    ('Age_17', '17 yrs'),
+    ('Age_18', '18 yrs'),
+    ('Age_19', '19 yrs'),
+    ('Age_20', '20 yrs'),
+    ('Age_21', '21 yrs'),
+    ('Age_22_Plus', '22 + yrs'),
+    ('Total', 'Total'),
+]
+
+TIME_SERIES_COLUMNS = [
+    ('Total_Registered', 'int64'), ('Total_Sat', 'int64'), ('Total_Change', 'int64'),
+    ('Female_Registered', 'int64'), ('Female_Sat', 'int64'), ('Female_Change', 'int64'),
+    ('Male_Registered', 'int64'), ('Male_Sat', 'int64'), ('Male_Change', 'int64'),
+]
+
+COUNTY_ID_COLUMNS = [('County_Code', 'int64'), ('County', 'string')]
+
+SCHEMAS = {
+    'registered_vs_sat': SheetSchema(
+        'registered_vs_sat', 'Registered vs Sat.xlsx', 'Sheet1',
+        header_tokens=['Year', 'Total Candidature', 'Females', 'Males', 'No. Registered'],
+        id_columns=[('Year', 'int64')],
+        value_columns=TIME_SERIES_COLUMNS,
+    ),
+    'gender_region': SheetSchema(
+        'gender_region', 'Gender + Region.xlsx', 'Gender + Region',
+        header_tokens=['County Code & Name', 'Female', 'Male', 'Total'],
+        id_columns=COUNTY_ID_COLUMNS,
+        measures=[('Female', 'Female'), ('Male', 'Male'), ('Total', 'Total')],
+    ),
+    'age_region': SheetSchema(
+        'age_region', 'Age + Region.xlsx', 'Sheet1',
+        header_tokens=['County Code & Name', 'Candidates’ Age Group', 'Total'],
+        id_columns=COUNTY_ID_COLUMNS,
+        measures=AGE_BANDS,
+    ),
+    'counties': SheetSchema(
+        'counties', 'normalised data.xlsx', 'counties',
+        header_tokens=['county_id', 'county_name', 'region_id'],
+        id_columns=[('county_id', 'int64')],
+        value_columns=[('county_name', 'string'), ('region_id', 'int64')],
+    ),
+    'regions': SheetSchema(
+        'regions', 'normalised data.xlsx', 'regions',
+        header_tokens=['region_id', 'region_name'],
+        id_columns=[('region_id', 'int64')],
+        value_columns=[('region_name', 'string')],
+    ),
+    'gender': SheetSchema(
+        'gender', 'normalised data.xlsx', 'gender',
+        header_tokens=['gender_id', 'gender_name'],
+        id_columns=[('gender_id', 'int64')],
+        value_columns=[('gender_name', 'string')],
+    ),
+    'age_group': SheetSchema(
+        'age_group', 'normalised data.xlsx', 'age_group',
+        header_tokens=['age_group_id', 'age_description'],
+        id_columns=[('age_group_id', 'int64')],
+        value_columns=[('age_description', 'string')],
+    ),
+}
+
+REFERENCE_SHEETS = ['counties', 'regions', 'gender', 'age_group']
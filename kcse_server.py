@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+KCSE Query API
+A small asyncio HTTP/1.1 server over KCSEAnalyzerImproved. The workbooks are loaded and
+aggregated once into a snapshot (trend metrics, participation cube, county statistics);
+requests are answered from that snapshot through an LRU response cache with ETags, and the
+snapshot is rebuilt in a worker thread and swapped in when a source workbook changes (only the
+datasets whose content fingerprints changed are recomputed).
+
+    python kcse_server.py --data-dir . --port 8765
+    curl 'localhost:8765/api/counties?year=2024&gender=Female'
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from kcse_analysis_improved import KCSEAnalyzerImproved
+from kcse_cache import DEFAULT_CACHE_DIR
+from kcse_tidy import ALL
+
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 1024
+RELOAD_INTERVAL = 2.0
+MAX_HEADER_BYTES = 16384
+UNCACHED = {'/api/health'}  # live counters, never cached
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 503: 'Service Unavailable'}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _clean(value):
+    """JSON-safe scalar: NaN/inf -> None, NumPy scalars -> Python"""
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _records(df):
+    return json.loads(df.to_json(orient='records'))
+
+
+class Snapshot:
+    """Everything the endpoints serve, computed once from one analyzer"""
+
+    def __init__(self, analyzer, changes=None):
+        self.analyzer = analyzer
+        self.changes = changes
+        self.trends = analyzer.trend_metrics
+        self.rates = analyzer.national_rates
+        self.cube = analyzer.cube
+        self.county_stats = analyzer.county_stats
+        self.summary = analyzer.trend_summary
+        self.sources = source_state(analyzer)
+        self.loaded_at = datetime.now(timezone.utc).isoformat()
+        self.version = hashlib.sha1(json.dumps(self.sources, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def source_state(analyzer):
+    """(mtime_ns, size) of every source workbook; a change triggers a reload"""
+    state = {}
+    for key in analyzer.SOURCE_FILES:
+        path = analyzer.source_path(key)
+        try:
+            stat = path.stat()
+            state[str(path)] = [stat.st_mtime_ns, stat.st_size]
+        except FileNotFoundError:
+            state[str(path)] = None
+    return state
+
+
+class KCSEQueryService:
+    """Routing, response caching and snapshot reloading; independent of the socket layer"""
+
+    def __init__(self, data_dir='.', cache_dir=DEFAULT_CACHE_DIR, use_cache=True,
+                 cache_size=DEFAULT_CACHE_SIZE, sources=None):
+        self.analyzer_options = {'data_dir': data_dir, 'cache_dir': cache_dir, 'use_cache': use_cache,
+                                 'load_workers': 1, 'sources': sources, 'quiet': True}
+        self.cache_size = cache_size
+        self.responses = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.snapshot = None
+        self.routes = {
+            '/api/health': self.health,
+            '/api/national/trends': self.national_trends,
+            '/api/national/rates': self.national_rates,
+            '/api/national/summary': self.national_summary,
+            '/api/counties': self.counties,
+            '/api/regions': self.regions,
+            '/api/county-stats': self.county_statistics,
+        }
+
+    def build_snapshot(self, previous=None):
+        """Load and aggregate everything with a quiet analyzer; safe to call from a worker thread.
+
+        Given the previous snapshot, its analyzer is cloned and refreshed, so only datasets
+        whose contents changed (and what is derived from them) are recomputed.
+        """
+        if previous is None:
+            analyzer = KCSEAnalyzerImproved(**self.analyzer_options)
+            analyzer.recorder = None
+            analyzer.load_all_data()
+            return Snapshot(analyzer)
+        analyzer = previous.analyzer.clone()
+        status, _ = analyzer.refresh()
+        return Snapshot(analyzer, changes=[name for name, state in status.items() if state != 'unchanged'])
+
+    def install(self, snapshot):
+        """Swap in a new snapshot and drop every cached response"""
+        self.snapshot = snapshot
+        self.responses.clear()
+
+    def sources_changed(self):
+        return self.snapshot is None or source_state(self.snapshot.analyzer) != self.snapshot.sources
+
+    # Request handling
+
+    def handle(self, method, target, headers=None):
+        """Answer one request; returns (status, headers dict, body bytes)"""
+        headers = headers or {}
+        if method not in ('GET', 'HEAD'):
+            return self._error(405, f"{method} not allowed")
+        if self.snapshot is None:
+            return self._error(503, "data not loaded yet")
+
+        url = urlsplit(target)
+        if url.path in UNCACHED:
+            try:
+                body, _ = self._render(url)
+            except ApiError as exc:
+                return self._error(exc.status, str(exc))
+            return 200, {'Cache-Control': 'no-store', 'Content-Type': 'application/json'}, body if method == 'GET' else b''
+        key = (url.path, url.query)
+        cached = self.responses.get(key)
+        if cached is not None:
+            self.responses.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            try:
+                cached = self._render(url)
+            except ApiError as exc:
+                return self._error(exc.status, str(exc))
+            self.responses[key] = cached
+            if len(self.responses) > self.cache_size:
+                self.responses.popitem(last=False)
+
+        body, etag = cached
+        response_headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Content-Type': 'application/json'}
+        if etag in [tag.strip() for tag in headers.get('if-none-match', '').split(',')]:
+            return 304, response_headers, b''
+        return 200, response_headers, body if method == 'GET' else b''
+
+    def _render(self, url):
+        path = unquote(url.path).rstrip('/') or '/'
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if path.startswith('/api/counties/'):
+            data = self.county(path[len('/api/counties/'):], query)
+        elif path in self.routes:
+            data = self.routes[path](query)
+        else:
+            raise ApiError(404, f"no such endpoint: {path}")
+        body = json.dumps({'version': self.snapshot.version, 'data': data}, separators=(',', ':')).encode()
+        # Weak validator: the body is derived from the snapshot version plus the query
+        return body, f'W/"{hashlib.sha1(body).hexdigest()[:16]}"'
+
+    def _error(self, status, message):
+        body = json.dumps({'error': message}).encode()
+        return status, {'Content-Type': 'application/json'}, body
+
+    # Query parameters
+
+    def _label(self, query, name, labels, default):
+        value = query.get(name, default)
+        if value not in labels:
+            raise ApiError(400, f"unknown {name} '{value}'; expected one of {labels}")
+        return value
+
+    def _slice(self, query):
+        cube = self.snapshot.cube
+        gender = self._label(query, 'gender', cube.genders, ALL)
+        age_band = self._label(query, 'age_band', cube.age_bands, ALL)
+        year = query.get('year')
+        if year is not None:
+            try:
+                year = int(year)
+            except ValueError:
+                raise ApiError(400, f"year must be an integer, got '{year}'")
+            if year not in cube.years:
+                raise ApiError(400, f"no data for year {year}; available: {cube.years}")
+        return gender, age_band, year
+
+    # Endpoints
+
+    def health(self, query):
+        snap = self.snapshot
+        return {'loaded_at': snap.loaded_at, 'sources': snap.sources, 'reloads': self.reloads,
+                'cache': {'entries': len(self.responses), 'hits': self.hits, 'misses': self.misses}}
+
+    def national_trends(self, query):
+        return _records(self.snapshot.trends)
+
+    def national_rates(self, query):
+        return _records(self.snapshot.rates)
+
+    def national_summary(self, query):
+        return json.loads(json.dumps(self.snapshot.summary, default=_clean))
+
+    def counties(self, query):
+        """Every county for one gender / age band: a value per county for ?year=, else per year"""
+        gender, age_band, year = self._slice(query)
+        cube = self.snapshot.cube
+        frame = cube.by_county(gender, age_band)
+        if year is not None:
+            return {'year': year, 'gender': gender, 'age_band': age_band,
+                    'counties': {c: _clean(v) for c, v in frame.loc[year].items()}}
+        return {'gender': gender, 'age_band': age_band, 'years': cube.years,
+                'counties': {c: [_clean(v) for v in frame[c]] for c in frame.columns}}
+
+    def county(self, name, query):
+        """One county: series over years for every gender, or every age band with ?by=age_band"""
+        cube = self.snapshot.cube
+        if name not in cube.counties:
+            raise ApiError(404, f"unknown county '{name}'")
+        by = query.get('by', 'gender')
+        if by not in ('gender', 'age_band'):
+            raise ApiError(400, "by must be 'gender' or 'age_band'")
+        labels = cube.genders if by == 'gender' else cube.age_bands
+        series = {label: [_clean(v) for v in (cube.query(county=name, gender=label) if by == 'gender'
+                                               else cube.query(county=name, age_band=label))]
+                  for label in labels}
+        stats = self.snapshot.county_stats.loc[name]
+        return {'county': name, 'years': cube.years, 'by': by, 'series': series,
+                'statistics': {k: _clean(v) for k, v in stats.items()}}
+
+    def regions(self, query):
+        gender, age_band, year = self._slice(query)
+        cube = self.snapshot.cube
+        if year is not None:
+            return {'year': year, 'gender': gender, 'age_band': age_band,
+                    'regions': {r: _clean(cube.query(region=r, gender=gender, age_band=age_band, year=year))
+                                for r in cube.regions}}
+        return {'gender': gender, 'age_band': age_band, 'years': cube.years,
+                'regions': {r: [_clean(v) for v in cube.query(region=r, gender=gender, age_band=age_band)]
+                            for r in cube.regions}}
+
+    def county_statistics(self, query):
+        return _records(self.snapshot.county_stats.reset_index())
+
+
+async def _read_request(reader):
+    """Parse one HTTP/1.1 request head; returns (method, target, version, headers) or None at EOF"""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise ApiError(400, "request header too large")
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ', 2)
+    except ValueError:
+        raise ApiError(400, "malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    # Requests are bodiless GETs; skip any body so keep-alive stays in sync
+    length = int(headers.get('content-length', 0) or 0)
+    if length:
+        await reader.readexactly(length)
+    return method, target, version, headers
+
+
+def _response_bytes(status, headers, body, keep_alive):
+    lines = [f'HTTP/1.1 {status} {REASONS.get(status, "")}']
+    headers = dict(headers, **{'Content-Length': str(len(body)),
+                               'Connection': 'keep-alive' if keep_alive else 'close'})
+    lines += [f'{name}: {value}' for name, value in headers.items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+
+class KCSEServer:
+    """asyncio socket layer plus the hot-reload watcher around a KCSEQueryService"""
+
+    def __init__(self, service, host='127.0.0.1', port=DEFAULT_PORT, reload_interval=RELOAD_INTERVAL,
+                 access_log=False):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.reload_interval = reload_interval
+        self.access_log = access_log
+        self.server = None
+        self.watcher = None
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except ApiError as exc:
+                    writer.write(_response_bytes(*self.service._error(exc.status, str(exc)), keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, target, version, headers = request
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and not (version == 'HTTP/1.0' and headers.get('connection', '').lower() != 'keep-alive'))
+                status, response_headers, body = self.service.handle(method, target, headers)
+                writer.write(_response_bytes(status, response_headers, body, keep_alive))
+                await writer.drain()
+                if self.access_log:
+                    print(f"{method} {target} {status} {len(body)}")
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+    async def watch_sources(self):
+        """Poll workbook mtimes and swap in a rebuilt snapshot when any source changes"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            if not self.service.sources_changed():
+                continue
+            start = time.perf_counter()
+            try:
+                snapshot = await loop.run_in_executor(None, self.service.build_snapshot, self.service.snapshot)
+            except Exception as exc:  # keep serving the last good snapshot
+                print(f"⚠️ Reload failed, still serving version {self.service.snapshot.version}: {exc}")
+                continue
+            self.service.install(snapshot)
+            self.service.reloads += 1
+            print(f"🔄 Sources changed: reloaded version {snapshot.version} in {time.perf_counter() - start:.2f}s "
+                  f"(changed content: {', '.join(snapshot.changes) or 'none'})")
+
+    async def start(self):
+        if self.service.snapshot is None:
+            start = time.perf_counter()
+            self.service.install(await asyncio.get_running_loop().run_in_executor(None, self.service.build_snapshot))
+            print(f"📦 Loaded version {self.service.snapshot.version} in {time.perf_counter() - start:.2f}s")
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                 limit=MAX_HEADER_BYTES)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.watcher = asyncio.create_task(self.watch_sources()) if self.reload_interval else None
+        print(f"🌐 KCSE query API on http://{self.host}:{self.port}/api/health")
+        return self
+
+    async def stop(self):
+        if self.watcher is not None:
+            self.watcher.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Serve KCSE participation metrics as JSON")
+    parser.add_argument('--data-dir', default='.', help="Directory containing the KCSE workbooks")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Directory for the cleaned-data cache")
+    parser.add_argument('--no-cache', action='store_true', help="Always re-parse the workbooks, bypassing the cache")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE, help="Cached responses (LRU)")
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL,
+                        help="Seconds between source checks for hot reload (0 disables)")
+    parser.add_argument('--access-log', action='store_true', help="Print one line per request")
+    return parser
+
+
+def run_server(args):
+    service = KCSEQueryService(args.data_dir, cache_dir=args.cache_dir, use_cache=not args.no_cache,
+                               cache_size=args.cache_size)
+    server = KCSEServer(service, args.host, args.port, reload_interval=args.reload_interval,
+                        access_log=args.access_log)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    run_server(build_parser().parse_args())
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+KCSE Statistics Engine
+Vectorised statistics over every county (or sub-county / school) and year at once: proportion
+confidence intervals, gender parity indices, per-unit linear trend slopes with t-test
+significance, and robust outlier flags. Every function broadcasts over a units x years array,
+so the cost is a handful of NumPy passes however many units there are.
+"""
+
+import math
+import numpy as np
+import pandas as pd
+from statistics import NormalDist
+
+from kcse_tidy import ALL
+
+# UNESCO convention: a gender parity index between 0.97 and 1.03 counts as parity
+PARITY_BAND = (0.97, 1.03)
+OUTLIER_THRESHOLD = 3.5  # modified z-score (Iglewicz & Hoaglin)
+
+
+def z_value(confidence=0.95):
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def wilson_interval(successes, trials, confidence=0.95):
+    """Proportion and Wilson score interval, element-wise over arrays of any shape"""
+    successes = np.asarray(successes, dtype=float)
+    trials = np.asarray(trials, dtype=float)
+    z = z_value(confidence)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = successes / trials
+        denom = 1 + z**2 / trials
+        centre = (p + z**2 / (2 * trials)) / denom
+        half = z * np.sqrt(p * (1 - p) / trials + z**2 / (4 * trials**2)) / denom
+    return p, centre - half, centre + half
+
+
+def gender_parity_index(female, male):
+    """Female / male ratio element-wise (NaN where male is 0 or missing)"""
+    female = np.asarray(female, dtype=float)
+    male = np.asarray(male, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(male > 0, female / male, np.nan)
+
+
+def _lgamma(values):
+    """log Gamma element-wise, evaluated once per distinct value (degrees of freedom take only a few)"""
+    values = np.asarray(values, dtype=float)
+    distinct, inverse = np.unique(values, return_inverse=True)
+    logs = np.array([math.lgamma(v) if v > 0 else np.nan for v in distinct])
+    return logs[inverse].reshape(values.shape)
+
+
+def normal_two_sided_p(z):
+    """2 * P(Z > |z|) for a standard normal, element-wise: erfc(|z| / sqrt 2) from the Chebyshev
+    fit in Numerical Recipes (erfcc, fractional error below 1.2e-7)"""
+    x = np.abs(np.asarray(z, dtype=float)) / math.sqrt(2)
+    t = 1 / (1 + 0.5 * x)
+    poly = np.polynomial.polynomial.polyval(t, [-1.26551223, 1.00002368, 0.37409196, 0.09678418, -0.18628806,
+                                                0.27886807, -1.13520398, 1.48851587, -0.82215223, 0.17087277])
+    return np.minimum(t * np.exp(-x * x + poly), 1.0)  # the fit overshoots 1 by ~3e-8 at z = 0
+
+
+def _betacf(a, b, x, iterations=200):
+    """Continued fraction for the regularised incomplete beta (modified Lentz), vectorised"""
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1, a - 1
+    c = np.ones_like(x)
+    d = 1 - qab * x / qap
+    d = 1 / np.where(np.abs(d) < tiny, tiny, d)
+    h = d.copy()
+    for m in range(1, iterations + 1):
+        m2 = 2 * m
+        for numerator in (m * (b - m) * x / ((qam + m2) * (a + m2)),
+                          -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))):
+            d = 1 + numerator * d
+            d = 1 / np.where(np.abs(d) < tiny, tiny, d)
+            c = 1 + numerator / c
+            c = np.where(np.abs(c) < tiny, tiny, c)
+            delta = d * c
+            h = h * delta
+        if np.all(np.abs(delta - 1) < 1e-12):
+            break
+    return h
+
+
+def _betainc(a, b, x):
+    """Regularised incomplete beta I_x(a, b) for arrays (SciPy is not a dependency)"""
+    a, b, x = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (a, b, x)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        front = np.exp(_lgamma(a + b) - _lgamma(a) - _lgamma(b) + a * np.log(x) + b * np.log1p(-x))
+        # The continued fraction converges for x < (a+1)/(a+b+2); use the symmetry otherwise
+        direct = x < (a + 1) / (a + b + 2)
+        result = np.where(direct,
+                          front * _betacf(a, b, x) / a,
+                          1 - front * _betacf(b, a, 1 - x) / b)
+    result = np.where(x <= 0, 0.0, np.where(x >= 1, 1.0, result))
+    return np.where(np.isnan(x), np.nan, result)
+
+
+def t_two_sided_p(t, df):
+    """Two-sided p-value of Student's t, element-wise"""
+    t = np.asarray(t, dtype=float)
+    df = np.asarray(df, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = _betainc(df / 2, 0.5, df / (df + t**2))
+    return np.where(df > 0, p, np.nan)
+
+
+def t_critical(df, confidence=0.95):
+    """Two-sided Student's t critical value, element-wise.
+
+    Exact for df 1 and 2; otherwise the Cornish-Fisher expansion refined by Newton steps on
+    t_two_sided_p, once per distinct df.
+    """
+    df = np.asarray(df, dtype=float)
+    valid = df > 0
+    nu, inverse = np.unique(np.where(valid, df, 1.0), return_inverse=True)
+    alpha = 1 - confidence
+    z = z_value(confidence)
+    t = z + ((z**3 + z) / 4 / nu + (5 * z**5 + 16 * z**3 + 3 * z) / 96 / nu**2
+             + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / 384 / nu**3
+             + (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / 92160 / nu**4)
+    log_norm = _lgamma((nu + 1) / 2) - _lgamma(nu / 2) - 0.5 * np.log(nu * math.pi)
+    for _ in range(4):
+        density = np.exp(log_norm - (nu + 1) / 2 * np.log1p(t**2 / nu))
+        t = t + (t_two_sided_p(t, nu) - alpha) / (2 * density)
+    t = np.where(nu == 1, math.tan(math.pi / 2 * confidence), t)
+    t = np.where(nu == 2, confidence * np.sqrt(2 / (1 - confidence**2)), t)
+    return np.where(valid, t[inverse].reshape(df.shape), np.nan)
+
+
+def two_proportion_test(successes_a, trials_a, successes_b, trials_b):
+    """Difference of two proportions (a - b) and its two-sided pooled z-test p-value, element-wise"""
+    sa, na, sb, nb = (np.asarray(v, dtype=float) for v in (successes_a, trials_a, successes_b, trials_b))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pooled = (sa + sb) / (na + nb)
+        se = np.sqrt(pooled * (1 - pooled) * (1 / na + 1 / nb))
+        diff = sa / na - sb / nb
+        z = np.where(se > 0, diff / se, 0.0)
+    return diff, normal_two_sided_p(z)
+
+
+def linear_trends(values, years):
+    """OLS slope of each row of values (units x years) on years, ignoring NaNs.
+
+    Returns a dict of arrays with one entry per unit: slope, intercept, stderr, t, p_value, n.
+    """
+    y = np.asarray(values, dtype=float)
+    x = np.broadcast_to(np.asarray(years, dtype=float), y.shape)
+    present = ~np.isnan(y)
+    n = present.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = np.where(present, x, 0).sum(axis=1) / n
+        y_mean = np.where(present, y, 0).sum(axis=1) / n
+        dx = np.where(present, x - x_mean[:, None], 0)
+        dy = np.where(present, y - y_mean[:, None], 0)
+        sxx = (dx**2).sum(axis=1)
+        slope = (dx * dy).sum(axis=1) / sxx
+        intercept = y_mean - slope * x_mean
+        residuals = dy - slope[:, None] * dx
+        df = n - 2
+        stderr = np.sqrt((residuals**2).sum(axis=1) / df / sxx)
+        # A perfect fit has zero stderr: infinitely significant unless the slope is also zero
+        t = np.where(stderr == 0, np.where(slope == 0, 0.0, np.sign(slope) * np.inf), slope / stderr)
+    p_value = np.where(np.isinf(t), 0.0, t_two_sided_p(t, np.where(df > 0, df, np.nan)))
+    invalid = (df <= 0) | (sxx == 0)
+    for arr in (slope, intercept, stderr, t, p_value):
+        arr[invalid] = np.nan
+    return {'slope': slope, 'intercept': intercept, 'stderr': stderr, 't': t, 'p_value': p_value, 'n': n}
+
+
+def modified_z_scores(values, axis=0):
+    """Robust z-scores (median / MAD) along axis, NaN-aware"""
+    values = np.asarray(values, dtype=float)
+    median = np.nanmedian(values, axis=axis, keepdims=True)
+    mad = np.nanmedian(np.abs(values - median), axis=axis, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 0.6745 * (values - median) / mad
+
+
+def flag_underperformers(values, threshold=OUTLIER_THRESHOLD, axis=0):
+    """True where a value sits more than threshold robust z-scores below its peers"""
+    z = modified_z_scores(values, axis=axis)
+    return np.nan_to_num(z, nan=0.0) < -threshold
+
+
+def national_rate_intervals(time_series, confidence=0.95):
+    """Sat / Registered rate with Wilson interval per year for Total, Female and Male, plus the
+    female - male gap and its two-proportion test"""
+    frame = {'Year': time_series['Year'].to_numpy()}
+    for group in ('Total', 'Female', 'Male'):
+        rate, lower, upper = wilson_interval(time_series[f'{group}_Sat'], time_series[f'{group}_Registered'],
+                                             confidence)
+        frame[f'{group}_Rate'] = rate * 100
+        frame[f'{group}_Rate_Lower'] = lower * 100
+        frame[f'{group}_Rate_Upper'] = upper * 100
+    gap, p_value = two_proportion_test(time_series['Female_Sat'], time_series['Female_Registered'],
+                                       time_series['Male_Sat'], time_series['Male_Registered'])
+    frame['Gender_Gap'] = gap * 100
+    frame['Gender_Gap_P_Value'] = p_value
+    return pd.DataFrame(frame)
+
+
+def county_disparity_table(cube, confidence=0.95, alpha=0.05, threshold=OUTLIER_THRESHOLD):
+    """One row per county: latest female share with CI, parity index, candidate trend and outlier flags.
+
+    All counties are computed together from the cube's county x gender x age x year array.
+    """
+    a_all = cube._age_index[ALL]
+    female = cube.county[:, cube._gender_index['Female'], a_all, :]
+    male = cube.county[:, cube._gender_index['Male'], a_all, :]
+    total = cube.county[:, cube._gender_index[ALL], a_all, :]
+
+    # Latest year each county reports
+    reported = ~np.isnan(total)
+    last = np.where(reported.any(axis=1), reported.shape[1] - 1 - np.argmax(reported[:, ::-1], axis=1), 0)
+    rows = np.arange(total.shape[0])
+    share, lower, upper = wilson_interval(female[rows, last], total[rows, last], confidence)
+    gpi = gender_parity_index(female, male)
+
+    trend = linear_trends(total, cube.years)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative_slope = trend['slope'] / np.nanmean(total, axis=1) * 100
+    significant = trend['p_value'] < alpha
+
+    table = pd.DataFrame({
+        'county': cube.counties,
+        'latest_year': np.asarray(cube.years)[last],
+        'candidates': total[rows, last],
+        'female_share': share * 100,
+        'female_share_lower': lower * 100,
+        'female_share_upper': upper * 100,
+        'gpi': gpi[rows, last],
+        'gpi_mean': np.nanmean(gpi, axis=1),
+        'trend_per_year': trend['slope'],
+        'trend_pct_per_year': relative_slope,
+        'trend_p_value': trend['p_value'],
+        'significant_decline': significant & (trend['slope'] < 0),
+        'significant_growth': significant & (trend['slope'] > 0),
+    })
+    table['parity'] = table['gpi'].between(*PARITY_BAND)
+    table['underperforming'] = (flag_underperformers(relative_slope, threshold)
+                                | flag_underperformers(gpi[rows, last], threshold)
+                                | table['significant_decline'].to_numpy())
+    return table.set_index('county')
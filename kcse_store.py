@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+KCSE SQL Store
+Persists the cleaned tables into one embedded SQLite database for ad hoc SQL: the national
+Registered/Sat series, the long county fact table (with county_gender / county_age views over
+it) and the four reference lookups. The fact table is indexed on county, region, year, gender
+and age band, so filtered questions run in milliseconds without opening a workbook.
+
+    python kcse_cli.py analyze --only store
+    python kcse_cli.py query "SELECT region, SUM(candidates) FROM county_gender WHERE year = 2024 GROUP BY region"
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+from kcse_schema import REFERENCE_SHEETS
+from kcse_tidy import ALL
+
+# Bump when the table layout changes so old databases are rebuilt rather than misread
+STORE_VERSION = 1
+STORE_NAME = 'kcse.sqlite'
+
+INDEXES = {
+    'idx_facts_county_year': 'facts (county, year)',
+    'idx_facts_region_year': 'facts (region, year)',
+    'idx_facts_year_gender_age': 'facts (year, gender, age_band)',
+    'idx_facts_age_year': 'facts (age_band, year)',
+    'idx_national_year': 'national (Year)',
+    'idx_counties_region': 'counties (region_id)',
+}
+VIEWS = {
+    'county_gender': f"SELECT county_id, county, region, year, gender, candidates FROM facts WHERE age_band = '{ALL}'",
+    'county_age': f"SELECT county_id, county, region, year, age_band, candidates FROM facts WHERE gender = '{ALL}'",
+}
+
+
+def _sql_frame(df):
+    """Categoricals and NumPy-only dtypes as plain columns SQLite accepts"""
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) or df[col].dtype == 'string':
+            df[col] = df[col].astype(object)
+        elif df[col].dtype.kind == 'u':
+            df[col] = df[col].astype('int64')
+    return df
+
+
+def write_store(path, time_series, county_facts, reference, sources=None):
+    """Write the cleaned tables to a new SQLite database at path (replaced atomically); returns the path"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.unlink(missing_ok=True)
+
+    tables = {'national': time_series, 'facts': county_facts}
+    tables.update({name: reference[name] for name in REFERENCE_SHEETS})
+    metadata = {
+        'store_version': STORE_VERSION,
+        'built_at': datetime.now(timezone.utc).isoformat(),
+        'sources': {key: str(source) for key, source in (sources or {}).items()},
+    }
+
+    with sqlite3.connect(tmp_path) as conn:
+        for name, df in tables.items():
+            _sql_frame(df).to_sql(name, conn, index=False)
+        for name, target in INDEXES.items():
+            conn.execute(f"CREATE INDEX {name} ON {target}")
+        for name, select in VIEWS.items():
+            conn.execute(f"CREATE VIEW {name} AS {select}")
+        conn.execute("CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT)")
+        conn.executemany("INSERT INTO metadata VALUES (?, ?)",
+                         [(key, json.dumps(value)) for key, value in metadata.items()])
+        conn.execute("ANALYZE")
+    conn.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+class KCSEStore:
+    """Read-only query helper over a database written by write_store"""
+
+    def __init__(self, path=STORE_NAME):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"No KCSE store at {self.path} (run `python kcse_cli.py analyze --only store`)")
+        self.conn = sqlite3.connect(f'{self.path.resolve().as_uri()}?mode=ro', uri=True)
+        version = self.metadata().get('store_version')
+        if version != STORE_VERSION:
+            self.conn.close()
+            raise ValueError(f"{self.path} has store version {version}, expected {STORE_VERSION}; rebuild it")
+
+    def query(self, sql, params=None):
+        """Run one SQL statement and return the result as a DataFrame"""
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def metadata(self):
+        rows = self.conn.execute("SELECT key, value FROM metadata").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def tables(self):
+        """Tables and views with their row counts"""
+        names = self.conn.execute(
+            "SELECT name, type FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%' "
+            "ORDER BY type, name").fetchall()
+        return pd.DataFrame([{'name': name, 'type': kind,
+                              'rows': self.conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]}
+                             for name, kind in names])
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Run SQL against the KCSE store")
+    parser.add_argument('sql', nargs='?', help="SQL statement (omit to list tables and views)")
+    parser.add_argument('--store', default=STORE_NAME, help="Database written by the store stage")
+    parser.add_argument('--csv', action='store_true', help="Print the result as CSV instead of a table")
+    return parser
+
+
+def run_query(args):
+    try:
+        store = KCSEStore(args.store)
+    except (FileNotFoundError, ValueError) as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    with store:
+        start = time.perf_counter()
+        try:
+            result = store.query(args.sql) if args.sql else store.tables()
+        except (sqlite3.Error, pd.errors.DatabaseError) as exc:
+            print(f"SQL error: {exc}", file=sys.stderr)
+            return 1
+        elapsed = time.perf_counter() - start
+    if args.csv:
+        result.to_csv(sys.stdout, index=False)
+    else:
+        print(result.to_string(index=False))
+        print(f"\n({len(result)} rows in {elapsed * 1000:.1f} ms)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_query(build_parser().parse_args()))
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+KCSE Streaming Ingestion
+Folds candidate-level KNEC extracts (one row per candidate, per examination centre, as CSV or
+xlsx) into county x gender x age-band x year counts one fixed-size batch at a time, so memory is
+bounded by the batch size and the number of counties rather than the number of candidates.
+The running aggregates come out as the same cleaned frames the workbook loaders produce.
+"""
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from openpyxl import load_workbook
+from pathlib import Path
+
+from kcse_schema import AGE_BANDS, SchemaMismatchError
+
+DEFAULT_BATCH_SIZE = 100_000
+# Logical field -> column name in the extract; override per feed with the columns argument
+CANDIDATE_COLUMNS = {'county': 'county_code', 'gender': 'gender', 'age': 'age', 'year': 'year', 'sat': 'sat'}
+GENDERS = ['Female', 'Male']
+AGE_BAND_COLUMNS = [code for code, _ in AGE_BANDS[:-1]]
+FIRST_BAND_AGE = 16  # ages <= 16 fall in the first band, >= 22 in the last
+SAT_VALUES = {'1', '1.0', 'y', 'yes', 'true', 'sat'}
+
+
+def iter_batches(path, batch_size=DEFAULT_BATCH_SIZE, columns=None):
+    """Yield DataFrames of at most batch_size rows from a CSV or xlsx extract"""
+    path = Path(path)
+    if path.suffix.lower() in ('.xlsx', '.xlsm'):
+        yield from _iter_xlsx_batches(path, batch_size, columns)
+    else:
+        yield from pd.read_csv(path, chunksize=batch_size, usecols=columns)
+
+
+def _iter_xlsx_batches(path, batch_size, columns):
+    # read_only mode streams rows from the sheet XML instead of building the whole workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(value).strip() if value is not None else '' for value in next(rows, ())]
+        names = list(columns) if columns else header
+        missing = [name for name in names if name not in header]
+        if missing:
+            raise SchemaMismatchError(f"[{path.name}] missing candidate columns: {missing}")
+        keep = [header.index(name) for name in names]
+
+        batch = []
+        for row in rows:
+            batch.append([row[i] if i < len(row) else None for i in keep])
+            if len(batch) == batch_size:
+                yield pd.DataFrame(batch, columns=names)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=names)
+    finally:
+        wb.close()
+
+
+class CandidateAggregator:
+    """Running candidate counts per year as [county, gender, age band, sat] arrays"""
+
+    def __init__(self, counties, columns=None):
+        self.counties = counties[['county_id', 'county_name']].sort_values('county_id').reset_index(drop=True)
+        self.columns = {**CANDIDATE_COLUMNS, **(columns or {})}
+        codes = self.counties['county_id'].to_numpy()
+        self._county_index = np.full(codes.max() + 1, -1, dtype=np.int64)
+        self._county_index[codes] = np.arange(len(codes))
+        self._shape = (len(codes), len(GENDERS), len(AGE_BAND_COLUMNS), 2)
+        self.counts = {}
+        self.rows = 0
+        self.rejected = 0
+
+    def add_batch(self, batch):
+        """Fold one batch of candidate rows into the running counts"""
+        c = self.columns
+        county = pd.to_numeric(batch[c['county']], errors='coerce').to_numpy(dtype=float)
+        year = pd.to_numeric(batch[c['year']], errors='coerce').to_numpy(dtype=float)
+        age = pd.to_numeric(batch[c['age']], errors='coerce').to_numpy(dtype=float)
+        gender = (batch[c['gender']].astype(str).str.strip().str[:1].str.upper()
+                  .map({'F': 0, 'M': 1}).to_numpy(dtype=float))
+        if c['sat'] in batch.columns:
+            sat = batch[c['sat']].astype(str).str.strip().str.lower().isin(SAT_VALUES).to_numpy()
+        else:
+            sat = np.ones(len(batch), dtype=bool)
+
+        valid = ~(np.isnan(county) | np.isnan(year) | np.isnan(age) | np.isnan(gender))
+        in_range = (county >= 0) & (county < len(self._county_index))
+        valid &= in_range
+        county_idx = np.full(len(batch), -1, dtype=np.int64)
+        county_idx[valid] = self._county_index[county[valid].astype(np.int64)]
+        valid &= county_idx >= 0
+
+        band = np.clip(age[valid] - FIRST_BAND_AGE, 0, len(AGE_BAND_COLUMNS) - 1).astype(np.int64)
+        flat = np.ravel_multi_index((county_idx[valid], gender[valid].astype(np.int64), band,
+                                     sat[valid].astype(np.int64)), self._shape)
+        years = year[valid].astype(np.int64)
+        size = int(np.prod(self._shape))
+        for y in np.unique(years):
+            counts = np.bincount(flat[years == y], minlength=size).reshape(self._shape)
+            if int(y) in self.counts:
+                self.counts[int(y)] += counts
+            else:
+                self.counts[int(y)] = counts
+
+        self.rows += len(batch)
+        self.rejected += int(len(batch) - valid.sum())
+
+    def add_file(self, path, batch_size=DEFAULT_BATCH_SIZE):
+        """Stream one extract through add_batch"""
+        path = Path(path)
+        wanted = [self.columns[field] for field in ('county', 'gender', 'age', 'year')]
+        for batch in iter_batches(path, batch_size, columns=self._available_columns(path, wanted)):
+            self.add_batch(batch)
+        return self
+
+    def _available_columns(self, path, wanted):
+        # The sat flag is optional: without it every registered candidate counts as sat
+        if path.suffix.lower() in ('.xlsx', '.xlsm'):
+            wb = load_workbook(path, read_only=True)
+            try:
+                header = [str(v).strip() for v in next(wb.worksheets[0].iter_rows(max_row=1, values_only=True), ())]
+            finally:
+                wb.close()
+        else:
+            header = pd.read_csv(path, nrows=0).columns.tolist()
+        missing = [name for name in wanted if name not in header]
+        if missing:
+            raise SchemaMismatchError(f"[{path.name}] missing candidate columns: {missing}")
+        return wanted + ([self.columns['sat']] if self.columns['sat'] in header else [])
+
+    def merge(self, other):
+        """Add another aggregator's counts (e.g. from a worker process) into this one"""
+        for year, counts in other.counts.items():
+            if year in self.counts:
+                self.counts[year] += counts
+            else:
+                self.counts[year] = counts.copy()
+        self.rows += other.rows
+        self.rejected += other.rejected
+        return self
+
+    @property
+    def years(self):
+        return sorted(self.counts)
+
+    def _id_frame(self):
+        return pd.DataFrame({'County_Code': self.counties['county_id'].astype('int64'),
+                             'County': self.counties['county_name'].astype('string')})
+
+    def county_gender(self):
+        """Female/Male/Total registered candidates per county, as SCHEMAS['gender_region'] produces"""
+        columns = {}
+        for year in self.years:
+            by_gender = self.counts[year].sum(axis=(2, 3))
+            for g, gender in enumerate(GENDERS):
+                columns[f'{gender}_{year}'] = by_gender[:, g]
+            columns[f'Total_{year}'] = by_gender.sum(axis=1)
+        return pd.concat([self._id_frame(), pd.DataFrame(columns, dtype='int64')], axis=1)
+
+    def county_age(self):
+        """Registered candidates per age band per county, as SCHEMAS['age_region'] produces"""
+        columns = {}
+        for year in self.years:
+            by_band = self.counts[year].sum(axis=(1, 3))
+            for b, band in enumerate(AGE_BAND_COLUMNS):
+                columns[f'{band}_{year}'] = by_band[:, b]
+            columns[f'Total_{year}'] = by_band.sum(axis=1)
+        return pd.concat([self._id_frame(), pd.DataFrame(columns, dtype='int64')], axis=1)
+
+    def time_series(self):
+        """National Registered/Sat/Change by gender per year, as SCHEMAS['registered_vs_sat'] produces"""
+        records = []
+        for year in self.years:
+            by_gender = self.counts[year].sum(axis=(0, 2))  # [gender, sat]
+            record = {'Year': year}
+            for group, counts in [('Total', by_gender.sum(axis=0))] + list(zip(GENDERS, by_gender)):
+                record[f'{group}_Registered'] = counts.sum()
+                record[f'{group}_Sat'] = counts[1]
+            records.append(record)
+        df = pd.DataFrame(records)
+        for group in ['Total'] + GENDERS:
+            df.insert(df.columns.get_loc(f'{group}_Sat') + 1, f'{group}_Change',
+                      df[f'{group}_Sat'].diff().fillna(0))
+        return df.astype('int64')
+
+    def cleaned_frames(self):
+        """The cleaned_data entries the analyzer would otherwise load from the workbooks"""
+        return {'time_series': self.time_series(), 'county_gender': self.county_gender(),
+                'county_age': self.county_age()}
+
+
+def _aggregate_file(path, counties, columns, batch_size):
+    """Process-pool entry point: aggregate one extract"""
+    return CandidateAggregator(counties, columns).add_file(path, batch_size)
+
+
+def ingest_extracts(paths, counties, columns=None, batch_size=DEFAULT_BATCH_SIZE, workers=1):
+    """Aggregate candidate-level extracts, one file per worker process when workers > 1"""
+    paths = [Path(path) for path in paths]
+    total = CandidateAggregator(counties, columns)
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            futures = [pool.submit(_aggregate_file, path, counties, columns, batch_size) for path in paths]
+            for future in futures:
+                total.merge(future.result())
+    else:
+        for path in paths:
+            total.add_file(path, batch_size)
+    print(f"Streamed {total.rows:,} candidate rows from {len(paths)} extract(s) "
+          f"({total.rejected:,} rejected) into {len(total.years)} years of county counts")
+    return total
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+KCSE Synthetic Data
+Writes synthetic workbooks with exactly the layouts of 'Registered vs Sat.xlsx',
+'Gender + Region.xlsx', 'Age + Region.xlsx' and 'normalised data.xlsx' at a configurable
+scale, so slow paths show up before production-sized KNEC extracts arrive.
+
+Each reporting unit is a county, or a sub-county/school within one when those are > 1;
+the county sheets then simply carry more coded rows. Counts are internally consistent:
+Female + Male = Total, the age bands sum to the same total, and Sat <= Registered.
+The same counts are also available already cleaned (fact table, wide county frames, national
+series) for benchmarks of the stages after loading.
+"""
+
+import argparse
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from pathlib import Path
+
+from kcse_schema import AGE_BANDS
+from kcse_tidy import ALL, FACT_COLUMNS
+
+TITLE = 'KCSE Examination Candidature Distribution per County by gender'
+REGIONS = ['Coast', 'Central', 'Eastern', 'Nairobi', 'Rift Valley', 'Western', 'Nyanza', 'North Eastern']
+AGE_HEADERS = ['16 Yrs & below', '17 yrs', '18 yrs', '19 yrs', '20 yrs', '21 yrs', '22 + yrs']
+AGE_DESCRIPTIONS = ['16yrs and below', '17', '18', '19', '20', '21', '22yrs and above']
+AGE_WEIGHTS = np.array([0.02, 0.15, 0.29, 0.25, 0.15, 0.07, 0.07])
+
+
+class SyntheticSpec:
+    def __init__(self, years=5, counties=47, sub_counties=1, schools=1, last_year=2024, seed=0):
+        self.years = list(range(last_year - years + 1, last_year + 1))
+        self.counties = counties
+        self.sub_counties = sub_counties
+        self.schools = schools
+        self.seed = seed
+
+    @property
+    def n_units(self):
+        return self.counties * self.sub_counties * self.schools
+
+    def unit_names(self):
+        names = []
+        for c in range(1, self.counties + 1):
+            for s in range(1, self.sub_counties + 1):
+                for k in range(1, self.schools + 1):
+                    name = f'County {c}'
+                    if self.sub_counties > 1:
+                        name += f' / Sub-county {s}'
+                    if self.schools > 1:
+                        name += f' / School {k}'
+                    names.append(name)
+        return names
+
+    def __repr__(self):
+        return (f"SyntheticSpec(years={len(self.years)}, counties={self.counties}, "
+                f"sub_counties={self.sub_counties}, schools={self.schools})")
+
+
+def generate_counts(spec):
+    """Female/Male candidates per unit and year, plus age-band splits of their totals"""
+    rng = np.random.default_rng(spec.seed)
+    n_units, n_years = spec.n_units, len(spec.years)
+    scale = 20000 / (spec.sub_counties * spec.schools)
+    base = rng.uniform(0.1, 1.0, n_units)[:, None] * scale
+    growth = (1 + rng.normal(0.05, 0.03, (n_units, 1))) ** np.arange(n_years)[None, :]
+    total = np.maximum((base * growth).round().astype(np.int64), 10)
+    female = rng.binomial(total, 0.5)
+    male = total - female
+    ages = rng.multinomial(total, AGE_WEIGHTS)
+    return female, male, ages
+
+
+def write_registered_vs_sat(path, spec, female, male):
+    """Registered vs Sat.xlsx: Registered / Sat / Increase triples for Total, Female and Male"""
+    rng = np.random.default_rng(spec.seed + 1)
+    f_sat, m_sat = female.sum(axis=0), male.sum(axis=0)
+    f_reg = f_sat + rng.integers(0, f_sat // 200 + 2)
+    m_reg = m_sat + rng.integers(0, m_sat // 200 + 2)
+    t_reg, t_sat = f_reg + m_reg, f_sat + m_sat
+
+    def change(values):
+        return np.concatenate([[values[0] // 20], np.diff(values)])
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Sheet1')
+    ws.append(['Year', 'Total Candidature', None, None, 'Females', None, None, 'Males', None, None])
+    ws.append([None, 'No. Registered', 'Total No. Sat', 'Increase/ Decrease', 'No. Registered', 'No. Sat (%)',
+               'Increase/ Decrease', 'No. Registered', 'No. Sat (%)', 'Increase/ Decrease (%)'])
+    columns = [t_reg, t_sat, change(t_sat), f_reg, f_sat, change(f_sat), m_reg, m_sat, change(m_sat)]
+    # KNEC lists the most recent year first
+    for i in reversed(range(len(spec.years))):
+        ws.append([spec.years[i]] + [int(col[i]) for col in columns])
+    wb.save(path)
+
+
+def write_gender_region(path, spec, female, male):
+    """Gender + Region.xlsx: Female/Male/Total per unit for each year, plus a totals row"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Gender + Region')
+    ws.append([TITLE])
+    years_row = ['County Code & Name', None]
+    labels_row = [None, None]
+    for year in spec.years:
+        years_row += [year, None, None]
+        labels_row += ['Female', 'Male', 'Total ']
+    ws.append(years_row)
+    ws.append(labels_row)
+    for unit, name in enumerate(spec.unit_names()):
+        row = [unit + 1, name]
+        for y in range(len(spec.years)):
+            f, m = int(female[unit, y]), int(male[unit, y])
+            row += [f, m, f + m]
+        ws.append(row)
+    totals = [None, None]
+    for y in range(len(spec.years)):
+        f, m = int(female[:, y].sum()), int(male[:, y].sum())
+        totals += [f, m, f + m]
+    ws.append(totals)
+    wb.save(path)
+
+
+def write_age_region(path, spec, ages):
+    """Age + Region.xlsx: seven age bands plus Total per unit for each year"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Sheet1')
+    width = len(AGE_HEADERS) + 1
+    ws.append([TITLE])
+    years_row = ['County Code & Name', None]
+    group_row = [None, None]
+    labels_row = [None, None]
+    for year in spec.years:
+        years_row += [year] + [None] * (width - 1)
+        group_row += ['Candidates’ Age Group'] + [None] * (width - 1)
+        labels_row += AGE_HEADERS + ['Total ']
+    ws.append(years_row)
+    ws.append(group_row)
+    ws.append(labels_row)
+    for unit, name in enumerate(spec.unit_names()):
+        row = [unit + 1, name]
+        for y in range(len(spec.years)):
+            bands = [int(v) for v in ages[unit, y]]
+            row += bands + [sum(bands)]
+        ws.append(row)
+    wb.save(path)
+
+
+def write_normalised(path, spec):
+    """normalised data.xlsx lookup sheets: counties, regions, gender, age_group"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('counties')
+    ws.append(['county_id', 'county_name', 'region_id'])
+    for unit, name in enumerate(spec.unit_names()):
+        ws.append([unit + 1, name, unit % len(REGIONS) + 1])
+    ws = wb.create_sheet('regions')
+    ws.append(['region_id', 'region_name'])
+    for i, region in enumerate(REGIONS, 1):
+        ws.append([i, region])
+    ws = wb.create_sheet('gender')
+    ws.append(['gender_id', 'gender_name'])
+    ws.append([1, 'Female'])
+    ws.append([2, 'Male'])
+    ws = wb.create_sheet('age_group')
+    ws.append(['age_group_id', 'age_description'])
+    for i, description in enumerate(AGE_DESCRIPTIONS, 1):
+        ws.append([i, description])
+    wb.save(path)
+
+
+def write_candidate_extract(path, spec, sat_rate=0.995):
+    """Candidate-level CSV (one row per candidate) consistent with generate_counts(spec);
+    unit i is county_code i + 1 in the synthetic normalised workbook"""
+    female, male, _ = generate_counts(spec)
+    rng = np.random.default_rng(spec.seed + 2)
+    ages = np.arange(15, 24)
+    age_weights = np.array([0.005, 0.015, 0.15, 0.29, 0.25, 0.15, 0.07, 0.05, 0.02])
+    with open(path, 'w') as out:
+        out.write('centre_code,county_code,year,gender,age,sat\n')
+        for y, year in enumerate(spec.years):
+            for gender, counts in (('F', female[:, y]), ('M', male[:, y])):
+                county = np.repeat(np.arange(1, spec.n_units + 1), counts)
+                n = len(county)
+                frame = np.column_stack([county * 100 + rng.integers(0, 100, n), county, np.full(n, year),
+                                         rng.choice(ages, n, p=age_weights), rng.random(n) < sat_rate])
+                lines = [f"{c},{k},{yr},{gender},{a},{int(s)}" for c, k, yr, a, s in frame.tolist()]
+                out.write('\n'.join(lines) + '\n')
+    return path
+
+
+def write_synthetic_dataset(directory, spec):
+    """Write all four KCSE workbooks for spec into directory; returns the directory"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    female, male, ages = generate_counts(spec)
+    write_registered_vs_sat(directory / 'Registered vs Sat.xlsx', spec, female, male)
+    write_gender_region(directory / 'Gender + Region.xlsx', spec, female, male)
+    write_age_region(directory / 'Age + Region.xlsx', spec, ages)
+    write_normalised(directory / 'normalised data.xlsx', spec)
+    return directory
+
+
+def synthetic_fact_table(spec):
+    """county_facts-shaped table for spec: gender rows at age 'All', age rows at gender 'All'"""
+    female, male, ages = generate_counts(spec)
+    names = spec.unit_names()
+    frames = []
+    for dim, labels, counts in (('gender', ['Female', 'Male'], np.stack([female, male], axis=2)),
+                                ('age_band', AGE_DESCRIPTIONS, ages)):
+        unit, year, label = (axis.ravel() for axis in np.indices(counts.shape))
+        frames.append(pd.DataFrame({
+            'unit': unit, 'year': np.asarray(spec.years)[year],
+            'gender': np.asarray(labels)[label] if dim == 'gender' else ALL,
+            'age_band': np.asarray(labels)[label] if dim == 'age_band' else ALL,
+            'candidates': counts.ravel(),
+        }))
+    facts = pd.concat(frames, ignore_index=True)
+    unit = facts.pop('unit').to_numpy()
+    facts['county_id'] = pd.to_numeric(unit + 1, downcast='unsigned')
+    facts['county'] = pd.Categorical.from_codes(unit, names)
+    facts['region'] = pd.Categorical.from_codes(unit % len(REGIONS), REGIONS)
+    facts['year'] = facts['year'].astype('int16')
+    facts['gender'] = pd.Categorical(facts['gender'], categories=['Female', 'Male', ALL])
+    facts['age_band'] = pd.Categorical(facts['age_band'], categories=AGE_DESCRIPTIONS + [ALL], ordered=True)
+    facts['candidates'] = facts['candidates'].astype('uint32')
+    return facts[FACT_COLUMNS]
+
+
+def synthetic_cleaned_frames(spec):
+    """(national, county_gender, county_age) frames in the cleaned layouts the loaders produce"""
+    female, male, ages = generate_counts(spec)
+    codes = [code for code, _ in AGE_BANDS[:-1]]
+    ids = {'County_Code': np.arange(1, spec.n_units + 1), 'County': spec.unit_names()}
+    gender = pd.DataFrame({**ids, **{f'{m}_{y}': v[:, i] for i, y in enumerate(spec.years)
+                                     for m, v in (('Female', female), ('Male', male), ('Total', female + male))}})
+    age = pd.DataFrame({**ids, **{f'{code}_{y}': ages[:, i, b] for i, y in enumerate(spec.years)
+                                  for b, code in enumerate(codes)}})
+    for i, y in enumerate(spec.years):
+        age[f'Total_{y}'] = ages[:, i].sum(axis=1)
+    national = pd.DataFrame({'Year': spec.years, 'Female_Registered': female.sum(axis=0),
+                             'Male_Registered': male.sum(axis=0)})
+    national['Total_Registered'] = national['Female_Registered'] + national['Male_Registered']
+    for group in ('Total', 'Female', 'Male'):
+        national[f'{group}_Sat'] = national[f'{group}_Registered']
+    return national, gender, age
+
+
+def write_multi_sheet_workbook(path, spec, n_sheets=8):
+    """Write n_sheets copies of a Female/Male/Total per unit and year sheet (single-header layout)"""
+    female, male, _ = generate_counts(spec)
+    columns = ['County Code & Name', 'County'] + [
+        f'{year} {label}' for year in spec.years for label in ('Female', 'Male', 'Total')
+    ]
+    rows = np.empty((spec.n_units, 3 * len(spec.years)), dtype=np.int64)
+    rows[:, 0::3], rows[:, 1::3], rows[:, 2::3] = female, male, female + male
+    frame = pd.DataFrame(rows, columns=columns[2:])
+    frame.insert(0, 'County', spec.unit_names())
+    frame.insert(0, 'County Code & Name', np.arange(1, spec.n_units + 1))
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for sheet in range(n_sheets):
+            frame.to_excel(writer, sheet_name=f'Sheet{sheet + 1}', index=False)
+    return path
+
+
+def synthetic_panel_sources(spec, n_sources=12):
+    """(canonical panel, [(label, layout, raw sheet)]) cycling n_sources through every national layout"""
+    from kcse_panel import LAYOUTS, PANEL_COLUMNS
+    national = synthetic_cleaned_frames(spec)[0]
+    sat = national[['Female_Sat', 'Male_Sat']].to_numpy()
+    registered = sat + np.random.default_rng(spec.seed + 1).integers(0, 5_000, size=sat.shape)
+    canonical = pd.DataFrame({'Year': spec.years,
+                              'Female_Registered': registered[:, 0], 'Female_Sat': sat[:, 0],
+                              'Male_Registered': registered[:, 1], 'Male_Sat': sat[:, 1]})
+    for measure in ('Registered', 'Sat'):
+        canonical[f'Total_{measure}'] = canonical[f'Female_{measure}'] + canonical[f'Male_{measure}']
+    for group in ('Total', 'Female', 'Male'):
+        canonical[f'{group}_Change'] = canonical[f'{group}_Sat'].diff().fillna(0).astype(int)
+
+    sources = []
+    for i in range(n_sources):
+        layout = list(LAYOUTS.values())[i % len(LAYOUTS)]
+        if layout.named:
+            body = canonical[list(layout.mapping)].to_numpy(dtype=object)
+            raw = pd.DataFrame(np.vstack([[list(layout.mapping.values())], body]))
+            raw.insert(0, 'id', ['id'] + list(range(1, len(spec.years) + 1)))
+            raw.columns = range(raw.shape[1])
+        else:
+            header = np.full((2, len(PANEL_COLUMNS)), None, dtype=object)
+            header[0, :len(layout.header_tokens)] = layout.header_tokens
+            raw = pd.DataFrame(np.vstack([header, canonical[PANEL_COLUMNS].to_numpy(dtype=object)]))
+        sources.append((f'synthetic_{i}:{layout.name}', layout, raw))
+    return canonical[PANEL_COLUMNS], sources
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic KCSE-shaped workbooks")
+    parser.add_argument('directory')
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--counties', type=int, default=47)
+    parser.add_argument('--sub-counties', type=int, default=1)
+    parser.add_argument('--schools', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--candidates', action='store_true', help="Also write a candidate-level candidates.csv extract")
+    args = parser.parse_args()
+
+    spec = SyntheticSpec(args.years, args.counties, args.sub_counties, args.schools, seed=args.seed)
+    write_synthetic_dataset(args.directory, spec)
+    if args.candidates:
+        write_candidate_extract(Path(args.directory) / 'candidates.csv', spec)
+    print(f"Synthetic {spec} written to {args.directory}")
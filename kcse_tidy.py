@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+KCSE Tidy Fact Table
+Melts the wide county x gender and county x age frames into one long fact table
+(county, region, year, gender, age band -> candidates) with categorical labels and
+downcast integer counts, so every county-level question becomes a groupby.
+"""
+
+import pandas as pd
+
+from kcse_schema import AGE_BANDS
+
+ALL = 'All'
+FACT_COLUMNS = ['county_id', 'county', 'region', 'year', 'gender', 'age_band', 'candidates']
+
+
+def melt_year_columns(df, id_columns, measures, measure_name):
+    """Melt '<Measure>_<Year>' columns into (measure, year, candidates) rows"""
+    value_columns = [col for col in df.columns
+                     if col not in id_columns and col.rsplit('_', 1)[0] in measures]
+    long = df.melt(id_vars=id_columns, value_vars=value_columns, var_name='column', value_name='candidates')
+    parts = long['column'].str.extract(r'^(?P<measure>.+)_(?P<year>\d{4})$')
+    long[measure_name] = parts['measure']
+    long['year'] = parts['year'].astype('int16')
+    return long.drop(columns='column')
+
+
+def build_fact_table(county_gender, county_age, reference):
+    """Build the long county x gender x age-band x year fact table from the cleaned frames.
+
+    Gender rows carry age_band 'All' and age rows carry gender 'All', so either
+    breakdown can be summed without double counting by filtering on the other.
+    """
+    gender_names = reference['gender']['gender_name'].tolist()
+    gender_long = melt_year_columns(county_gender, ['County_Code'], gender_names, 'gender')
+    gender_long['age_band'] = ALL
+
+    # Age band columns follow the age_group reference order (Total is dropped)
+    band_labels = dict(zip([code for code, _ in AGE_BANDS[:-1]],
+                           reference['age_group'].sort_values('age_group_id')['age_description']))
+    age_long = melt_year_columns(county_age, ['County_Code'], list(band_labels), 'age_band')
+    age_long['age_band'] = age_long['age_band'].map(band_labels)
+    age_long['gender'] = ALL
+
+    counties = reference['counties'].merge(reference['regions'], on='region_id', how='left')
+    counties = counties.rename(columns={'county_name': 'county', 'region_name': 'region'})
+
+    facts = pd.concat([gender_long, age_long], ignore_index=True)
+    facts = facts.merge(counties[['county_id', 'county', 'region']],
+                        left_on='County_Code', right_on='county_id', how='left', validate='many_to_one')
+    facts = facts[FACT_COLUMNS]
+
+    facts['county_id'] = pd.to_numeric(facts['county_id'], downcast='unsigned')
+    facts['candidates'] = pd.to_numeric(facts['candidates'], downcast='unsigned')
+    facts['county'] = pd.Categorical(facts['county'], categories=counties['county'].tolist())
+    facts['region'] = pd.Categorical(facts['region'], categories=reference['regions']['region_name'].tolist())
+    facts['gender'] = pd.Categorical(facts['gender'], categories=gender_names + [ALL])
+    facts['age_band'] = pd.Categorical(facts['age_band'], categories=list(band_labels.values()) + [ALL],
+                                       ordered=True)
+    return facts.sort_values(['year', 'county_id', 'gender', 'age_band'], ignore_index=True)
+
+
+def memory_report(facts):
+    """Compare the fact table's footprint with the same rows held as object/int64 columns"""
+    compact = facts.memory_usage(deep=True).sum()
+    loose = facts.astype({col: object for col in ['county', 'region', 'gender', 'age_band']})
+    loose = loose.astype({col: 'int64' for col in ['county_id', 'year', 'candidates']})
+    baseline = loose.memory_usage(deep=True).sum()
+    print(f"\n🧮 FACT TABLE: {len(facts):,} rows")
+    print(f"Memory (categorical + downcast): {compact / 1024:.1f} KB")
+    print(f"Memory (object + int64):         {baseline / 1024:.1f} KB")
+    print(f"Footprint: {compact / baseline:.0%} of the object-dtype layout")
+    return compact, baseline
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+KCSE Data Validation
+Declarative invariants over the cleaned tables, each a vectorised column expression evaluated
+with DataFrame.eval over a whole table at once: Female + Male = Total, age bands sum to Total,
+Sat <= Registered, and reconciliation of county sums against the national Registered vs Sat
+figures. The county frames are reshaped once into (unit, year) x measure tables, so every
+check is a single pass and the whole validation costs a few milliseconds per run.
+"""
+
+import json
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from kcse_schema import AGE_BANDS
+
+VALIDATION_NAME = 'kcse_validation.json'
+VIOLATION_COLUMNS = ['check', 'dataset', 'severity', 'unit', 'year', 'lhs', 'rhs', 'difference']
+AGE_MEASURES = [code for code, _ in AGE_BANDS[:-1]]
+
+
+class Invariant:
+    """lhs <op> rhs over every row of one validation table, within an absolute/relative tolerance"""
+
+    def __init__(self, name, dataset, lhs, op, rhs, severity='error', rel_tolerance=0.0, description=''):
+        self.name = name
+        self.dataset = dataset
+        self.lhs = lhs
+        self.op = op
+        self.rhs = rhs
+        self.severity = severity
+        self.rel_tolerance = rel_tolerance
+        self.description = description or f"{lhs} {op} {rhs}"
+
+    def evaluate(self, table):
+        """(rows checked, boolean violation mask, lhs, rhs); rows with a missing side are not checked"""
+        lhs, rhs = np.broadcast_arrays(_evaluate(table, self.lhs), _evaluate(table, self.rhs))
+        checked = ~(np.isnan(lhs) | np.isnan(rhs))
+        slack = self.rel_tolerance * np.abs(rhs)
+        with np.errstate(invalid='ignore'):
+            if self.op == '==':
+                ok = np.abs(lhs - rhs) <= slack
+            elif self.op == '<=':
+                ok = lhs <= rhs + slack
+            elif self.op == '>=':
+                ok = lhs >= rhs - slack
+            else:
+                raise ValueError(f"unknown operator {self.op!r}")
+        return int(checked.sum()), checked & ~ok, lhs, rhs
+
+
+def _evaluate(table, expression):
+    """Float values of an expression; bare columns and constants skip the eval parser"""
+    if expression in table.columns:
+        return table[expression].to_numpy(dtype=float)
+    try:
+        return np.asarray(float(expression))
+    except ValueError:
+        return np.asarray(table.eval(expression), dtype=float)
+
+
+def _groups_sum(measures):
+    return ' + '.join(f'`{m}`' for m in measures)
+
+
+INVARIANTS = [
+    Invariant('national_total_registered', 'national', 'Total_Registered', '==', 'Female_Registered + Male_Registered'),
+    Invariant('national_total_sat', 'national', 'Total_Sat', '==', 'Female_Sat + Male_Sat'),
+    *[Invariant(f'national_{group.lower()}_sat_le_registered', 'national', f'{group}_Sat', '<=', f'{group}_Registered')
+      for group in ('Total', 'Female', 'Male')],
+    *[Invariant(f'national_{group.lower()}_sat_nonnegative', 'national', f'{group}_Sat', '>=', '0')
+      for group in ('Total', 'Female', 'Male')],
+    Invariant('county_gender_total', 'county_gender', 'Total', '==', 'Female + Male'),
+    *[Invariant(f'county_{measure.lower()}_nonnegative', 'county_gender', measure, '>=', '0')
+      for measure in ('Female', 'Male')],
+    Invariant('county_age_total', 'county_age', 'Total', '==', _groups_sum(AGE_MEASURES)),
+    Invariant('county_age_vs_gender_total', 'county', 'Age_Total', '==', 'Gender_Total', severity='warning',
+              description="Age + Region total matches Gender + Region total per county and year"),
+    *[Invariant(f'county_{group.lower()}_sum_vs_national', 'reconciliation', f'County_{group}', '==',
+                f'{group}_Registered', severity='warning', rel_tolerance=0.005,
+                description=f"county {group.lower()} candidates sum to national {group.lower()} registered (±0.5%)")
+      for group in ('Total', 'Female', 'Male')],
+    Invariant('county_age_sum_vs_national', 'reconciliation', 'Age_Total', '==', 'Total_Registered',
+              severity='warning', rel_tolerance=0.005,
+              description="county age-band totals sum to national total registered (±0.5%)"),
+]
+
+
+def per_year_table(df, id_columns=('County_Code', 'County')):
+    """Reshape '<Measure>_<Year>' columns into one row per (unit, year) with a column per measure"""
+    id_columns = list(id_columns)
+    value_columns = [col for col in df.columns if col not in id_columns]
+    parts = pd.Series(value_columns).str.extract(r'^(?P<measure>.+)_(?P<year>\d{4})$')
+    years = sorted(parts['year'].astype(int).unique())
+    measures = list(dict.fromkeys(parts['measure']))
+    grid = np.full((len(df), len(years), len(measures)), np.nan)
+    grid[:, np.searchsorted(years, parts['year'].astype(int)), [measures.index(m) for m in parts['measure']]] = \
+        df[value_columns].to_numpy(dtype=float)
+    table = pd.DataFrame(grid.reshape(-1, len(measures)), columns=measures)
+    table.insert(0, 'year', np.tile(years, len(df)))
+    table.insert(0, 'unit', np.repeat(df[id_columns[-1]].astype(str).to_numpy(), len(years)))
+    table.insert(0, 'code', np.repeat(df[id_columns[0]].to_numpy(dtype=np.int64), len(years)))
+    return table
+
+
+def validation_tables(time_series, county_gender=None, county_age=None):
+    """The tables the invariants run over: national, county_gender, county_age, county, reconciliation"""
+    national = time_series.assign(unit='National', year=time_series['Year'])
+    tables = {'national': national}
+    if county_gender is not None:
+        tables['county_gender'] = per_year_table(county_gender)
+    if county_age is not None:
+        tables['county_age'] = per_year_table(county_age)
+
+    sums = {}
+    if 'county_gender' in tables:
+        sums.update({f'County_{group}': tables['county_gender'].groupby('year')[group].sum(min_count=1)
+                     for group in ('Female', 'Male', 'Total')})
+    if 'county_age' in tables:
+        sums['Age_Total'] = tables['county_age'].groupby('year')['Total'].sum(min_count=1)
+    if sums:
+        reconciliation = pd.DataFrame(sums).join(time_series.set_index('Year'), how='outer')
+        tables['reconciliation'] = reconciliation.rename_axis('year').reset_index().assign(unit='All counties')
+    if 'county_gender' in tables and 'county_age' in tables:
+        gender, age = tables['county_gender'], tables['county_age']
+        county = gender[['code', 'unit', 'year']].assign(Gender_Total=gender['Total'])
+        if gender[['code', 'year']].equals(age[['code', 'year']]):
+            # Same counties and years in the same order (the usual case): no join needed
+            county['Age_Total'] = age['Total'].to_numpy()
+        else:
+            county = county.merge(age[['code', 'unit', 'year', 'Total']].rename(columns={'Total': 'Age_Total'}),
+                                  on=['code', 'year'], how='outer', suffixes=('', '_age'))
+            county['unit'] = county['unit'].fillna(county.pop('unit_age'))
+        tables['county'] = county
+    return tables
+
+
+class ValidationReport:
+    """Per-invariant results plus one row per violating (unit, year)"""
+
+    def __init__(self, summary, violations, elapsed):
+        self.summary = summary
+        self.violations = violations
+        self.elapsed = elapsed
+
+    @property
+    def errors(self):
+        return int(self.summary.loc[self.summary['severity'] == 'error', 'violations'].sum())
+
+    @property
+    def warnings(self):
+        return int(self.summary.loc[self.summary['severity'] == 'warning', 'violations'].sum())
+
+    def to_dict(self):
+        return {
+            'elapsed_ms': round(self.elapsed * 1000, 3),
+            'errors': self.errors,
+            'warnings': self.warnings,
+            'checks': json.loads(self.summary.to_json(orient='records')),
+            'violations': json.loads(self.violations.to_json(orient='records')),
+        }
+
+    def write(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2))
+        return path
+
+    def print_report(self, limit=15):
+        print("\n" + "="*60)
+        print(f"DATA VALIDATION ({len(self.summary)} checks in {self.elapsed * 1000:.1f} ms)")
+        print("="*60)
+        for row in self.summary.itertuples():
+            if row.checked == 0:
+                marker = '·'
+            elif row.violations == 0:
+                marker = '✅'
+            else:
+                marker = '❌' if row.severity == 'error' else '⚠️'
+            print(f"{marker} {row.check}: {row.violations}/{row.checked} rows violate {row.description}")
+        if len(self.violations):
+            print(f"\n🔎 VIOLATIONS (first {min(limit, len(self.violations))} of {len(self.violations)}):")
+            for row in self.violations.head(limit).itertuples():
+                print(f"  [{row.severity}] {row.check}: {row.unit} {row.year}: {row.lhs:,.0f} vs {row.rhs:,.0f} "
+                      f"({row.difference:+,.0f})")
+
+
+def validate(time_series, county_gender=None, county_age=None, invariants=INVARIANTS):
+    """Run every invariant whose table is available; returns a ValidationReport"""
+    start = time.perf_counter()
+    tables = validation_tables(time_series, county_gender, county_age)
+    summary, violations = [], []
+    for invariant in invariants:
+        table = tables.get(invariant.dataset)
+        checked, bad, lhs, rhs = invariant.evaluate(table) if table is not None else (0, None, None, None)
+        summary.append({'check': invariant.name, 'dataset': invariant.dataset, 'severity': invariant.severity,
+                        'description': invariant.description, 'checked': checked,
+                        'violations': int(bad.sum()) if bad is not None else 0})
+        if bad is not None and bad.any():
+            violations.append(pd.DataFrame({
+                'check': invariant.name, 'dataset': invariant.dataset, 'severity': invariant.severity,
+                'unit': table['unit'].to_numpy()[bad], 'year': table['year'].to_numpy()[bad].astype(int),
+                'lhs': lhs[bad], 'rhs': rhs[bad], 'difference': lhs[bad] - rhs[bad],
+            }))
+    violations = (pd.concat(violations, ignore_index=True) if violations
+                  else pd.DataFrame(columns=VIOLATION_COLUMNS))
+    return ValidationReport(pd.DataFrame(summary), violations, time.perf_counter() - start)
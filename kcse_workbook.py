@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+KCSE Workbook Loader
+Opens each Excel workbook once and parses every wanted sheet from that single handle,
+instead of calling pd.read_excel per sheet (which re-opens and re-decompresses the file
+and re-parses its shared strings table every time).
+"""
+
+import pandas as pd
+from pathlib import Path
+
+
+def read_workbook(path, sheets=None, header=0):
+    """Read the wanted sheets of a workbook in one pass and return them as a dict of DataFrames.
+
+    pandas' openpyxl engine opens the file in read-only, values-only mode, so rows are streamed
+    and the shared strings table is parsed once for all sheets.
+    """
+    with pd.ExcelFile(path, engine='openpyxl') as xl:
+        wanted = xl.sheet_names if sheets is None else list(sheets)
+        missing = [sheet for sheet in wanted if sheet not in xl.sheet_names]
+        if missing:
+            raise KeyError(f"{Path(path).name} has no sheet(s) {missing}; available: {xl.sheet_names}")
+        return {sheet: xl.parse(sheet, header=header) for sheet in wanted}
+
+
+def read_sheet(path, sheet_name=0, header=0):
+    """Read a single sheet (by name or position) through the single-pass loader"""
+    if isinstance(sheet_name, int):
+        with pd.ExcelFile(path, engine='openpyxl') as xl:
+            return xl.parse(xl.sheet_names[sheet_name], header=header)
+    return read_workbook(path, [sheet_name], header=header)[sheet_name]
@@ -0,0 +1,76 @@
+"""Tests for kcse_publish: targets, the manifest and the failure path"""
+
+import asyncio
+import hashlib
+import json
+
+import pytest
+
+from kcse_publish import (Artifact, FakeObjectStoreTarget, LocalDirectoryTarget, MANIFEST_NAME, publish_async,
+                          target_from_uri)
+
+
+def _artifacts(text='summary'):
+    return [
+        Artifact('summary.md', lambda: text.encode()),
+        Artifact('charts', lambda: {'trend.png': b'png', 'trend.svg': b'<svg/>'}),
+        Artifact('data/rates.csv', bytes, b'Year,Rate\n2024,99.6\n'),
+    ]
+
+
+def _failing():
+    raise RuntimeError('encoder failed')
+
+
+def _manifest(path):
+    return json.loads((path / MANIFEST_NAME).read_text())
+
+
+def test_local_directory_round_trip(tmp_path):
+    entries = asyncio.run(publish_async(_artifacts(), [LocalDirectoryTarget(tmp_path)]))
+
+    keys = sorted(entry['key'] for entry in entries)
+    assert keys == ['charts/trend.png', 'charts/trend.svg', 'data/rates.csv', 'summary.md']
+    for entry in _manifest(tmp_path)['files']:
+        data = (tmp_path / entry['key']).read_bytes()
+        assert entry['bytes'] == len(data)
+        assert entry['sha256'] == hashlib.sha256(data).hexdigest()
+    assert not list(tmp_path.rglob('*.tmp'))
+
+
+def test_fake_object_store_round_trip(tmp_path):
+    target = target_from_uri(f'fake-objstore://{tmp_path}')
+    assert isinstance(target, FakeObjectStoreTarget)
+    asyncio.run(publish_async(_artifacts(), [target]))
+
+    assert target.list('charts/') == ['charts/trend.png', 'charts/trend.svg']
+    assert target.get('summary.md') == b'summary'
+    assert target.objects['summary.md']['etag'] == hashlib.md5(b'summary').hexdigest()
+    assert target.objects['summary.md']['content_type'] == 'text/markdown; charset=utf-8'
+    index = json.loads((tmp_path / 'kcse.index.json').read_text())
+    assert sorted(index['objects']) == sorted(target.objects)
+    assert MANIFEST_NAME in index['objects']
+
+
+def test_failed_republish_removes_stale_manifest(tmp_path):
+    local, store = LocalDirectoryTarget(tmp_path / 'site'), FakeObjectStoreTarget(tmp_path / 'bucket')
+    asyncio.run(publish_async(_artifacts('first run'), [local, store]))
+    assert (tmp_path / 'site' / MANIFEST_NAME).exists()
+
+    with pytest.raises(RuntimeError, match='encoder failed'):
+        asyncio.run(publish_async(_artifacts('second run') + [Artifact('broken.json', _failing)], [local, store]))
+
+    # No manifest is better than one whose checksums describe the previous run
+    assert not (tmp_path / 'site' / MANIFEST_NAME).exists()
+    assert not (tmp_path / 'bucket' / 'kcse' / MANIFEST_NAME).exists()
+    assert MANIFEST_NAME not in store.objects
+    assert not list(tmp_path.rglob('*.tmp'))
+
+    asyncio.run(publish_async(_artifacts('third run'), [local]))
+    entry = next(entry for entry in _manifest(tmp_path / 'site')['files'] if entry['key'] == 'summary.md')
+    assert entry['sha256'] == hashlib.sha256(b'third run').hexdigest()
+
+
+def test_unknown_scheme():
+    with pytest.raises(ValueError, match='unknown publish target scheme'):
+        target_from_uri('s3://bucket')